@@ -0,0 +1,199 @@
+"""
+Local stand-ins for the Twitter, Mastodon, Bluesky and Google Books APIs,
+served over HTTP from a background thread, for the benchmarks
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import json
+from socketserver import ThreadingMixIn
+from threading import Lock, Thread
+from urllib.parse import parse_qs, urlsplit
+
+# A 1x1 GIF, served as the title page image
+IMAGE_BYTES = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04'
+    b'\x01\x00\x00\x00\x00,\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D'
+    b'\x01\x00;'
+    )
+
+BLUESKY_DID = 'did:plc:benchmark'
+
+STRING_PARAMETER = {'type': 'string', 'location': 'query'}
+
+
+def get_discovery_document(root_url):
+    """
+    Return a Books API discovery document with only the volumes.list method,
+    pointing at the fake service
+    """
+    return json.dumps({
+        'kind': 'discovery#restDescription',
+        'discoveryVersion': 'v1',
+        'id': 'books:v1',
+        'name': 'books',
+        'version': 'v1',
+        'rootUrl': root_url,
+        'servicePath': 'books/v1/',
+        'batchPath': 'batch/books/v1',
+        'parameters': {},
+        'schemas': {'Volumes': {'id': 'Volumes', 'type': 'object'}},
+        'resources': {
+            'volumes': {
+                'methods': {
+                    'list': {
+                        'id': 'books.volumes.list',
+                        'path': 'volumes',
+                        'httpMethod': 'GET',
+                        'parameters': {
+                            'q': dict(STRING_PARAMETER, required=True),
+                            'filter': STRING_PARAMETER,
+                            'langRestrict': STRING_PARAMETER
+                            },
+                        'parameterOrder': ['q'],
+                        'response': {'$ref': 'Volumes'}
+                        }
+                    }
+                }
+            }
+        })
+
+
+class FakeServiceHandler(BaseHTTPRequestHandler):
+    """
+    Answer the Twitter, Books and image requests that the bot makes
+    """
+
+    def log_message(self, *args):
+        """
+        Keep the benchmark output quiet
+        """
+
+    def send_body(self, body, content_type='application/json'):
+        """
+        Send a 200 response with a body
+        """
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, data):
+        """
+        Send a 200 response with a JSON body
+        """
+        self.send_body(json.dumps(data).encode('utf-8'))
+
+    def read_body(self):
+        """
+        Read and discard the request body
+        """
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+
+    def do_GET(self):
+        """
+        Serve Books API searches and title page images
+        """
+        url = urlsplit(self.path)
+
+        if url.path == '/books/v1/volumes':
+            query = parse_qs(url.query).get('q', [''])[0]
+            self.server.count('books')
+            self.send_json(self.server.get_volumes(query))
+        elif url.path == '/images/title.gif':
+            self.server.count('images')
+            self.send_body(IMAGE_BYTES, 'image/gif')
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        """
+        Serve Twitter, Mastodon and Bluesky logins, media uploads and posts
+        """
+        self.read_body()
+        url = urlsplit(self.path)
+
+        if url.path == '/1.1/media/upload.json':
+            self.server.count('uploads')
+            self.send_json({'media_id_string': '1'})
+        elif url.path == '/1.1/statuses/update.json':
+            self.send_json({'id': self.server.count('statuses')})
+        elif url.path == '/api/v2/media':
+            self.server.count('mastodon_uploads')
+            self.send_json({'id': '1'})
+        elif url.path == '/api/v1/statuses':
+            self.send_json({'id': str(self.server.count('mastodon_statuses'))})
+        elif url.path == '/xrpc/com.atproto.server.createSession':
+            self.server.count('bluesky_logins')
+            self.send_json({'did': BLUESKY_DID, 'accessJwt': 'benchmark'})
+        elif url.path == '/xrpc/com.atproto.repo.uploadBlob':
+            self.server.count('bluesky_uploads')
+            self.send_json({'blob': {'$type': 'blob', 'size': 1}})
+        elif url.path == '/xrpc/com.atproto.repo.createRecord':
+            self.send_json({'uri': 'at://{}/app.bsky.feed.post/{}'.format(
+                BLUESKY_DID, self.server.count('bluesky_posts')
+                )})
+        else:
+            self.send_error(404)
+
+
+class FakeServices(ThreadingMixIn, HTTPServer):
+    """
+    HTTP server on a free local port that stands in for api.twitter.com,
+    upload.twitter.com, a Mastodon instance, a Bluesky PDS, the Books API and
+    the Books image server, counting the requests it answers
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        """
+        Bind to a free port on the loopback interface
+        """
+        super().__init__(('127.0.0.1', 0), FakeServiceHandler)
+        self.root_url = 'http://127.0.0.1:{}/'.format(self.server_address[1])
+        self.counts = {}
+        self.counts_lock = Lock()
+        self.thread = None
+
+    def count(self, name):
+        """
+        Count a request and return the new count
+        """
+        with self.counts_lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            return self.counts[name]
+
+    def get_volumes(self, query):
+        """
+        Return a Books API search result with one volume for the query
+        """
+        return {
+            'totalItems': 1,
+            'items': [{
+                'volumeInfo': {
+                    'title': query,
+                    'previewLink': (
+                        'http://books.example.com/books?id=x&dq=query&hl=fr'
+                        ),
+                    'imageLinks': {
+                        'thumbnail': self.root_url + 'images/title.gif'
+                        }
+                    }
+                }]
+            }
+
+    def __enter__(self):
+        """
+        Start serving in a background thread
+        """
+        self.thread = Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        """
+        Stop serving and close the socket
+        """
+        self.shutdown()
+        self.server_close()
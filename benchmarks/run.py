@@ -0,0 +1,381 @@
+"""
+End-to-end benchmarks for spectacles_xix.  Each run seeds a local SQLite
+database, starts local stand-ins for Twitter, Mastodon, Bluesky and Google
+Books, times each stage of a run and the full run, and writes the results as
+JSON.  Given a baseline from an earlier run, it reports the benchmarks that got
+slower and exits with an error if any of them did by more than the threshold
+
+python -m benchmarks.run [-o RESULTS] [-b BASELINE] [-t THRESHOLD]
+    [-n PLAYS] [-r REPEAT] [BENCHMARK ...]
+"""
+from argparse import ArgumentParser
+from configparser import ConfigParser
+from contextlib import ExitStack
+from datetime import datetime
+import json
+import logging
+from pathlib import Path
+import platform
+from statistics import mean, median
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from unittest.mock import patch
+
+from googleapiclient.discovery import build_from_document
+import httplib2
+
+from benchmarks.fake_services import FakeServices, get_discovery_document
+from benchmarks.seed import BENCHMARK_DATE, seed_database
+from spectacles_xix import find_play
+from spectacles_xix.__main__ import main as spectacles_main
+from spectacles_xix.check_books import check_books_api
+from spectacles_xix.db_ops import db_cursor
+from spectacles_xix.db_pool import close_pools
+from spectacles_xix.publish import publish_play
+from spectacles_xix.transport import close_sessions, configure
+
+DEFAULT_PLAYS = 20000
+DEFAULT_REPEAT = 20
+DEFAULT_THRESHOLD = 0.2
+
+INPUT_DATE = BENCHMARK_DATE.strftime('%d-%m-%Y')
+
+RESULT_FORMAT = "{:<20} median {:>9.3f} ms  min {:>9.3f} ms  max {:>9.3f} ms"
+COMPARISON_FORMAT = "{:<20} {:>9.3f} ms -> {:>9.3f} ms  {:>5.2f}x  {}"
+
+CONFIG_TEMPLATE = """[db]
+backend: sqlite
+path: {db_path}
+
+[twitter]
+token: benchmark_token
+token_secret: benchmark_token_secret
+consumer_key: benchmark_consumer_key
+consumer_secret: benchmark_consumer_secret
+
+[path]
+google_service_account: {service_account}
+
+[books]
+cache: no
+
+[http]
+timeout: 5
+retries: 0
+"""
+
+
+def summarize(timings, number=1):
+    """
+    Given the times for a number of repetitions of `number` calls each, return
+    the statistics for a single call, in seconds
+    """
+    per_call = [timing / number for timing in timings]
+    return {
+        'repeat': len(per_call),
+        'number': number,
+        'min': min(per_call),
+        'median': median(per_call),
+        'mean': mean(per_call),
+        'max': max(per_call)
+        }
+
+
+def time_calls(func, repeat, number=1):
+    """
+    Call the function once to warm up, then time `repeat` repetitions of
+    `number` calls
+    """
+    func()
+
+    timings = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            func()
+        timings.append(perf_counter() - start)
+
+    return summarize(timings, number)
+
+
+def compare_results(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare the median of each benchmark with the baseline, and return a list
+    of (name, baseline median, median, ratio) tuples for all the benchmarks
+    in both, and a list of the names of those that are slower by more than
+    the threshold
+    """
+    comparisons = []
+    regressions = []
+
+    for name, stats in results['benchmarks'].items():
+        baseline_stats = baseline['benchmarks'].get(name)
+        if not baseline_stats or not baseline_stats['median']:
+            continue
+
+        ratio = stats['median'] / baseline_stats['median']
+        comparisons.append(
+            (name, baseline_stats['median'], stats['median'], ratio)
+            )
+        if ratio > 1 + threshold:
+            regressions.append(name)
+
+    return comparisons, regressions
+
+
+def print_results(results):
+    """
+    Print the median and spread of each benchmark
+    """
+    for name, stats in results['benchmarks'].items():
+        print(RESULT_FORMAT.format(
+            name, stats['median'] * 1000, stats['min'] * 1000,
+            stats['max'] * 1000
+            ))
+
+
+def print_comparisons(comparisons, regressions):
+    """
+    Print each benchmark's median against the baseline
+    """
+    for name, baseline_median, result_median, ratio in comparisons:
+        flag = 'REGRESSION' if name in regressions else ''
+        print(COMPARISON_FORMAT.format(
+            name, baseline_median * 1000, result_median * 1000, ratio, flag
+            ))
+
+
+class BenchmarkEnvironment:
+    """
+    Temporary database, config file, image store and fake services for a
+    benchmark run, with the bot's Twitter and Books endpoints pointed at the
+    fake services
+    """
+
+    def __init__(self, play_count):
+        """
+        Initialize the environment
+        """
+        self.play_count = play_count
+        self.stack = ExitStack()
+        self.services = None
+        self.config_path = None
+        self.config = None
+
+    def __enter__(self):
+        """
+        Seed the database, write the config and start the services
+        """
+        tmp_dir = Path(self.stack.enter_context(TemporaryDirectory()))
+        self.services = self.stack.enter_context(FakeServices())
+
+        self.config_path = Path(tmp_dir, 'benchmark.ini')
+        self.config_path.write_text(CONFIG_TEMPLATE.format(
+            db_path=Path(tmp_dir, 'spectacles.db'),
+            service_account=Path(tmp_dir, 'service_account.json')
+            ))
+        self.config = ConfigParser()
+        self.config.read(str(self.config_path))
+
+        api_url = self.services.root_url + '1.1/'
+        books_api = build_from_document(
+            get_discovery_document(self.services.root_url),
+            http=httplib2.Http()
+            )
+        for target, value in (
+                ('spectacles_xix.tweet.API_URL', api_url),
+                ('spectacles_xix.tweet.UPLOAD_URL', api_url),
+                ('spectacles_xix.check_books.get_api', lambda _: books_api),
+                ('spectacles_xix.find_play.IMAGE_CACHE',
+                 Path(tmp_dir, 'images'))
+                ):
+            self.stack.enter_context(patch(target, value))
+
+        configure(self.config)
+        self.stack.callback(close_sessions)
+        self.stack.callback(close_pools)
+
+        seed_database(self.config['db'], self.play_count)
+        return self
+
+    def __exit__(self, *args):
+        """
+        Stop the services and remove the temporary files
+        """
+        self.stack.close()
+
+
+def get_benchmarks(env):
+    """
+    Return a dict of the benchmarks, each a (function, number of calls per
+    repetition) tuple
+    """
+    config = env.config
+    local_now = find_play.get_local_now()
+    play_dict = find_play.get_play_list(
+        config['db'], None, local_now, INPUT_DATE, True
+        )[0]
+
+    with db_cursor(config['db']) as cursor:
+        play = find_play.get_play(cursor, local_now, play_dict)
+    book_result = check_books_api(True, None, play)
+    image_store = find_play.get_config_image_store(config)
+    title_image = book_result.get_image_file(image_store)
+
+    def expand_abbreviation():
+        with db_cursor(config['db']) as cursor:
+            find_play.expand_abbreviation(cursor, play_dict['genre'])
+
+    def play_repr():
+        play.set_description(None)
+        str(play)
+
+    def get_play_list():
+        find_play.get_play_list(
+            config['db'], None, local_now, INPUT_DATE, True
+            )
+
+    def get_play():
+        with db_cursor(config['db']) as cursor:
+            find_play.get_play(cursor, local_now, play_dict)
+
+    def search_books():
+        check_books_api(True, None, play)
+
+    def fetch_image():
+        book_result.get_image_file(image_store)
+
+    # Each post is recorded and the accounts that have the play are skipped,
+    # so the posts of the last call are deleted to post again every time
+    def forget_posts():
+        with db_cursor(config['db']) as cursor:
+            cursor.execute("DELETE FROM spectacle_post")
+
+    # The post to Twitter alone, the only account in the config
+    def publish_twitter():
+        forget_posts()
+        with db_cursor(config['db']) as cursor:
+            publish_play(
+                cursor, config, play_dict['id'], str(play), title_image
+                )
+
+    # The same post to Twitter, Mastodon and Bluesky at once
+    publish_config = {
+        'db': config['db'],
+        'twitter': config['twitter'],
+        'mastodon': {
+            'base_url': env.services.root_url,
+            'access_token': 'benchmark_token'
+            },
+        'bluesky': {
+            'service': env.services.root_url,
+            'handle': 'benchmark.example.com',
+            'app_password': 'benchmark_password'
+            }
+        }
+
+    def publish():
+        forget_posts()
+        with db_cursor(config['db']) as cursor:
+            publish_play(
+                cursor, publish_config, play_dict['id'], str(play),
+                title_image
+                )
+
+    def get_and_tweet():
+        forget_posts()
+        find_play.get_and_tweet(True, False, config, local_now, play_dict)
+
+    def run_main():
+        forget_posts()
+        argv = [
+            'spectacles_xix', '-b', '-f', '-t', '-d', INPUT_DATE,
+            '-c', str(env.config_path)
+            ]
+        with patch.object(sys, 'argv', argv):
+            spectacles_main()
+
+    return {
+        'expand_abbreviation': (expand_abbreviation, 100),
+        'play_repr': (play_repr, 1000),
+        'get_play_list': (get_play_list, 10),
+        'get_play': (get_play, 100),
+        'search_books': (search_books, 1),
+        'fetch_image': (fetch_image, 1),
+        'publish_twitter': (publish_twitter, 1),
+        'publish_play': (publish, 1),
+        'get_and_tweet': (get_and_tweet, 1),
+        'main': (run_main, 1)
+        }
+
+
+def run_benchmarks(play_count, repeat, names=None):
+    """
+    Set up the environment, run the benchmarks (all of them, or the named
+    ones) and return the results
+    """
+    results = {
+        'metadata': {
+            'created': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'plays': play_count,
+            'repeat': repeat
+            },
+        'benchmarks': {}
+        }
+
+    with BenchmarkEnvironment(play_count) as env:
+        for name, (func, number) in get_benchmarks(env).items():
+            if names and name not in names:
+                continue
+            results['benchmarks'][name] = time_calls(func, repeat, number)
+        results['metadata']['requests'] = dict(env.services.counts)
+
+    return results
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(description='Benchmark spectacles_xix end to end')
+    parser.add_argument('benchmarks', nargs='*')
+    parser.add_argument('-o', '--output', type=str)
+    parser.add_argument('-b', '--baseline', type=str)
+    parser.add_argument(
+        '-t', '--threshold', type=float, default=DEFAULT_THRESHOLD
+        )
+    parser.add_argument('-n', '--plays', type=int, default=DEFAULT_PLAYS)
+    parser.add_argument('-r', '--repeat', type=int, default=DEFAULT_REPEAT)
+    return parser.parse_args()
+
+
+def main():
+    """
+    Run the benchmarks, save the results and compare them with the baseline
+    """
+    args = parse_command_args()
+
+    # The bot logs at DEBUG, which would swamp the report
+    logging.disable(logging.WARNING)
+    results = run_benchmarks(args.plays, args.repeat, args.benchmarks)
+    logging.disable(logging.NOTSET)
+
+    print_results(results)
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        comparisons, regressions = compare_results(
+            results, baseline, args.threshold
+            )
+        print_comparisons(comparisons, regressions)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
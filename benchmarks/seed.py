@@ -0,0 +1,113 @@
+"""
+Seed a local SQLite database with a synthetic corpus of plays for the
+benchmarks.  The corpus is generated from a fixed random seed, so every run
+works on the same data
+"""
+from datetime import date, timedelta
+from random import Random
+
+from spectacles_xix.db_ops import db_cursor
+
+BENCHMARK_DATE = date(1818, 10, 15)
+PLAYS_ON_BENCHMARK_DATE = 5
+
+FIRST_DATE = date(1800, 1, 1)
+LAST_DATE = date(1849, 12, 31)
+
+ABBREVIATIONS = [
+    ('com', 'comédie', None, None),
+    ('vaud', 'vaudeville', None, None),
+    ('dr', 'drame', None, None),
+    ('trag', 'tragédie', None, None),
+    ('op', 'opéra', None, None),
+    ('mél', 'mélodrame', None, None),
+    ('fol', 'folie', None, None),
+    ('pant', 'pantomime', None, None)
+    ]
+
+THEATERS = [
+    ('TF', 'Théâtre Français', None, None),
+    ('OC', 'Opéra-Comique-Nationale', None, None),
+    ('Vaud', 'Théâtre du Vaudeville', None, None),
+    ('Var', 'Théâtre des Variétés', None, None),
+    ('ARM', 'Académie Royale de Musique', None, None),
+    ('Cirque', 'Cirque Olympique', None, None)
+    ]
+
+GENRES = [
+    'com.', 'vaud.', 'dr.', 'trag.', 'op.', 'mél.', 'com.-vaud.',
+    'fol.-vaud.', 'pant. dialoguée', 'dr. mêlé de chant'
+    ]
+
+WORDS = [
+    'amour', 'château', 'secret', 'voyage', 'fille', 'bal', 'diable',
+    'mariage', 'soldat', 'vengeance', 'nuit', 'auberge', 'prince', 'héritier'
+    ]
+
+AUTHORS = [
+    'Scribe', 'Dumas', 'Pixérécourt', 'Désaugiers', 'Brazier', 'Dumersan',
+    'Mélesville', 'Delavigne', 'Hugo', 'Ancelot'
+    ]
+
+COMPOSERS = ['Auber', 'Boieldieu', 'Hérold', 'Adam', None, None, None]
+
+PLAYQ = """INSERT INTO spectacle_play
+    (id, wicks, title, author, genre, acts, format, music, theater_code,
+    rev_date, greg_date)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+
+def make_play(random, play_id, greg_date):
+    """
+    Generate the row for one play
+    """
+    title = ' '.join(random.sample(WORDS, random.randint(1, 4))).capitalize()
+    authors = ' et '.join(random.sample(AUTHORS, random.randint(1, 3)))
+
+    return (
+        play_id,
+        str(10000 + play_id),
+        title,
+        authors,
+        random.choice(GENRES),
+        random.randint(1, 5),
+        random.choice(['a', 'tabl']),
+        random.choice(COMPOSERS),
+        random.choice(THEATERS)[0],
+        None,
+        greg_date.isoformat()
+        )
+
+
+def generate_plays(play_count, seed=0):
+    """
+    Generate the rows for the corpus, with a few plays on the benchmark date
+    and the rest spread over the first half of the century
+    """
+    random = Random(seed)
+    day_count = (LAST_DATE - FIRST_DATE).days
+
+    for play_id in range(1, play_count + 1):
+        if play_id <= PLAYS_ON_BENCHMARK_DATE:
+            greg_date = BENCHMARK_DATE
+        else:
+            greg_date = FIRST_DATE + timedelta(random.randint(0, day_count))
+        yield make_play(random, play_id, greg_date)
+
+
+def seed_database(config, play_count, seed=0):
+    """
+    Fill an empty database with the abbreviation and theater tables and a
+    synthetic corpus of plays
+    """
+    with db_cursor(config) as cursor:
+        cursor.executemany(
+            "INSERT INTO spectacle_abbrev VALUES (%s, %s, %s, %s)",
+            ABBREVIATIONS
+            )
+        cursor.executemany(
+            "INSERT INTO spectacle_theater VALUES (%s, %s, %s, %s)",
+            THEATERS
+            )
+        cursor.executemany(PLAYQ, generate_plays(play_count, seed))
@@ -3,19 +3,17 @@ Main module for spectacles_xix
 """
 from argparse import ArgumentParser
 from configparser import ConfigParser
-from datetime import datetime
-from locale import LC_TIME, setlocale
 from logging import basicConfig, getLogger
 
-from pytz import timezone
-
-from .find_play import get_play_list, get_and_tweet
-from .tweet import is_time_to_tweet
+from .find_play import (
+    get_local_now, get_play_list, get_planned_play_list, get_and_tweet,
+    uses_plan
+    )
+from .metrics import record_run
+from .timing import is_time_to_tweet
+from .transport import configure
 
 CONFIG_PATH = 'spectacles_xix/config'
-TIMEZONE = 'Europe/Paris'
-
-setlocale(LC_TIME, "fr_FR")
 
 basicConfig(level="DEBUG")
 LOG = getLogger(__name__)
@@ -35,6 +33,10 @@ def parse_command_args():
     parser.add_argument('-b', '--book', action='store_true')
     parser.add_argument('-t', '--tweeted', action='store_true')
     parser.add_argument('-f', '--force', action='store_true')
+    parser.add_argument('-p', '--plan', action='store_true')
+    parser.add_argument('-D', '--daemon', action='store_true')
+    parser.add_argument('-a', '--asynchronous', action='store_true')
+    parser.add_argument('-m', '--metrics', action='store_true')
     parser.add_argument('-c', '--config_file', type=str, required=True)
     return parser.parse_args()
 
@@ -48,26 +50,54 @@ def parse_config(input_path):
     return parser
 
 
+def run_once(args, config):
+    """
+    Get current date, get play list, get play, check for book link, tweet
+    """
+    local_now = get_local_now()
+
+    if uses_plan(args):
+        play_list = get_planned_play_list(
+            config['db'], local_now, args.tweeted
+            )
+        if not play_list:
+            return
+    else:
+        play_list = get_play_list(
+            config['db'], args.wicks, local_now, args.date, args.tweeted
+            )
+        if not play_list:
+            return
+
+        if not is_time_to_tweet(args, local_now.hour, len(play_list)):
+            return
+
+    tweet_function = get_and_tweet
+    if args.asynchronous:
+        # asyncio is only imported when it is needed
+        from .async_tweet import run_get_and_tweet
+        tweet_function = run_get_and_tweet
+
+    tweet_function(args.book, args.no_tweet, config, local_now, play_list[0])
+
+
 def main():
     """
-    Parse arguments, load config, get current date, get play list, get play,
-    check for book link, tweet
+    Parse arguments, load config, and run once or as a daemon, recording the
+    time taken by each stage if asked
     """
     args = parse_command_args()
-    config = parse_config(args.config_file)
 
-    local_now = timezone(TIMEZONE).localize(datetime.now())
-    play_list = get_play_list(
-        config['db'], args.wicks, local_now, args.date, args.tweeted
-        )
-
-    if not play_list:
+    if args.daemon:
+        from .daemon import run_daemon
+        run_daemon(args, lambda: parse_config(args.config_file))
         return
 
-    if not is_time_to_tweet(args, local_now.hour, len(play_list)):
-        return
+    config = parse_config(args.config_file)
+    configure(config)
 
-    get_and_tweet(args.book, args.no_tweet, config, local_now, play_list[0])
+    with record_run(args.metrics, config):
+        run_once(args, config)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+"""
+In-memory cache of the abbreviation table, used to expand abbreviated genres
+without a database round trip per word
+"""
+from logging import basicConfig, getLogger
+import re
+from threading import Lock
+from time import monotonic
+
+from .db_ops import abbreviations_db
+from .metrics import span
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+ABBREVIATION_RE = re.compile(r'(\w+)\.')
+DEFAULT_TTL = 3600
+
+
+def expand_with_table(table, phrase):
+    """
+    Replace every abbreviated word in the phrase with its expansion from the
+    table, in a single pass.  A word that is not in the table loses its
+    period, as it did when each word was looked up in the database
+    """
+    if not phrase:
+        return phrase
+
+    return ABBREVIATION_RE.sub(
+        lambda match: table.get(match.group(1).lower(), match.group(1)),
+        phrase
+        )
+
+
+class AbbreviationCache:
+    """
+    Load the abbreviation table in a single query and keep it for `ttl`
+    seconds, or until invalidate() is called
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL):
+        """
+        Initialize an empty cache
+        """
+        self.ttl = ttl
+        self.table = None
+        self.loaded_at = None
+        self.lock = Lock()
+
+    def is_stale(self, now=None):
+        """
+        Determine whether the table needs to be (re)loaded
+        """
+        if self.table is None:
+            return True
+
+        if now is None:
+            now = monotonic()
+        return now - self.loaded_at > self.ttl
+
+    def invalidate(self):
+        """
+        Drop the table, so that it is reloaded on the next lookup
+        """
+        with self.lock:
+            self.table = None
+            self.loaded_at = None
+
+    def get_table(self, cursor):
+        """
+        Return the abbreviation table, loading it with the cursor if it is
+        stale
+        """
+        with self.lock:
+            if self.is_stale():
+                with span('load_abbreviations'):
+                    table = abbreviations_db(cursor)
+                if table is None:
+                    return self.table or {}
+
+                LOG.debug("Loaded %s abbreviations", len(table))
+                self.table = table
+                self.loaded_at = monotonic()
+
+            return self.table
+
+    def expand(self, cursor, phrase):
+        """
+        Expand the abbreviations in the phrase, loading the table with the
+        cursor if necessary
+        """
+        if not phrase:
+            return phrase
+
+        table = self.get_table(cursor)
+        with span('expand_abbreviation'):
+            return expand_with_table(table, phrase)
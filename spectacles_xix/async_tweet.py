@@ -0,0 +1,162 @@
+"""
+Asynchronous variant of the get-and-tweet flow.  The message rendering (with
+its abbreviation queries) runs alongside the Books search, the image download
+and the image upload, and each stage is timed as a span of the run
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from logging import basicConfig, getLogger
+
+from .check_books import check_books_api
+from .db_ops import db_cursor
+from .find_play import (
+    get_book_cache, get_config_image_store, get_play, is_enabled
+    )
+from .metrics import span
+from .play import Play
+from .publish import (
+    get_pending_publishers, mark_published, post_all, upload_all
+    )
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+# Enough threads for every stage that can be running at the same time
+STAGE_WORKERS = 4
+
+
+class StageRunner:
+    """
+    Run blocking stages in a thread pool, each in a span of the run
+    """
+
+    def __init__(self, executor):
+        """
+        Initialize StageRunner class
+        """
+        self.executor = executor
+
+    async def run(self, name, func, *args):
+        """
+        Run a function in the thread pool, timing it as a stage of the run
+        """
+        with span(name):
+            return await asyncio.get_event_loop().run_in_executor(
+                self.executor, partial(func, *args)
+                )
+
+
+def render_play(config, local_now, play_dict):
+    """
+    Get the play, with its rendered message, on its own connection
+    """
+    with db_cursor(config['db']) as cursor:
+        return get_play(
+            cursor,
+            local_now,
+            play_dict,
+            is_enabled(config['db'], 'message_store')
+            )
+
+
+def search_books(args_book, config, play_dict):
+    """
+    Search the Books API for the play, on its own connection for the cache
+    """
+    with db_cursor(config['db']) as cursor:
+        return check_books_api(
+            args_book,
+            config['path']['google_service_account'],
+            Play.from_dict(play_dict),
+            get_book_cache(cursor, config)
+            )
+
+
+def fetch_image(config, book_result):
+    """
+    Return the title page image for a book result, or None
+    """
+    return book_result.get_image_file(get_config_image_store(config))
+
+
+def upload_title_image(config, play_id, title_image):
+    """
+    Upload the title page image to every configured account that the play has
+    not been posted to, and return the media IDs
+    """
+    with db_cursor(config['db']) as cursor:
+        publishers = get_pending_publishers(cursor, config, play_id)[0]
+    return upload_all(publishers, title_image)
+
+
+def post_tweet(config, play_id, message, media_ids):
+    """
+    Post the message to every configured account that does not have it yet,
+    and mark the play as tweeted according to the success policy
+    """
+    with db_cursor(config['db']) as cursor:
+        publishers, posted = get_pending_publishers(cursor, config, play_id)
+    results = post_all(publishers, message, media_ids)
+    with db_cursor(config['db']) as cursor:
+        mark_published(cursor, config, play_id, results, posted)
+    return results
+
+
+async def prepare_media(runner, args_book, no_tweet, config, play_dict):
+    """
+    Search for the book, then download the image and upload it to every
+    configured account.  Return the book result and the media IDs
+    """
+    book_result = await runner.run(
+        'books', search_books, args_book, config, play_dict
+        )
+    if no_tweet:
+        return book_result, None
+
+    title_image = await runner.run('image', fetch_image, config, book_result)
+    if not title_image:
+        return book_result, None
+
+    media_ids = await runner.run(
+        'upload', upload_title_image, config, play_dict['id'], title_image
+        )
+    return book_result, media_ids
+
+
+async def get_and_tweet_async(args_book, no_tweet, config, local_now,
+                              play_dict):
+    """
+    Get the play and prepare the book link and image concurrently, then post
+    the message
+    """
+    with ThreadPoolExecutor(max_workers=STAGE_WORKERS) as executor:
+        runner = StageRunner(executor)
+
+        play, (book_result, media_ids) = await asyncio.gather(
+            runner.run('render', render_play, config, local_now, play_dict),
+            prepare_media(runner, args_book, no_tweet, config, play_dict)
+            )
+
+        if not no_tweet:
+            await runner.run(
+                'status',
+                post_tweet,
+                config,
+                play_dict['id'],
+                str(play) + ' ' + book_result.get_better_book_url(),
+                media_ids
+                )
+
+
+def run_get_and_tweet(args_book, no_tweet, config, local_now, play_dict):
+    """
+    Run the asynchronous get-and-tweet flow to completion
+    """
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(get_and_tweet_async(
+            args_book, no_tweet, config, local_now, play_dict
+            ))
+    finally:
+        loop.close()
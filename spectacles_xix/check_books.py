@@ -1,41 +1,91 @@
 """
 Functions for retrieving information from the Google Books API
 """
+from datetime import datetime, timedelta
 from logging import basicConfig, getLogger
+from pathlib import Path
 import re
+from threading import local
 
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
-
-from requests import get
+from .db_ops import book_db, save_book_db
+from .image_store import DEFAULT_MAX_BYTES, get_image_store
+from .metrics import span
+from .transport import get_session
 
 SCOPES = ['https://www.googleapis.com/auth/books']
 QUERY_RE = re.compile(r'&dq=.+?(?=&)')
 
+DISCOVERY_URL = 'https://www.googleapis.com/discovery/v1/apis/books/v1/rest'
+CACHE_DIR = Path(Path.home(), '.cache', 'spectacles_xix')
+DISCOVERY_CACHE = Path(CACHE_DIR, 'books_v1_discovery.json')
+IMAGE_CACHE = Path(CACHE_DIR, 'images')
+
+DEFAULT_CACHE_DAYS = 90
+DEFAULT_NEGATIVE_CACHE_DAYS = 14
+
+# httplib2 connections are not thread-safe, so each thread gets its own client
+CLIENTS = local()
+
 basicConfig(level='DEBUG')
 LOG = getLogger()
 
 
+def load_discovery_document(cache_path=DISCOVERY_CACHE):
+    """
+    Return the Books API discovery document from the local cache file,
+    downloading and saving it first if there is none
+    """
+    if cache_path.exists():
+        return cache_path.read_text()
+
+    LOG.info("Downloading Books API discovery document")
+    response = get_session(DISCOVERY_URL).get(DISCOVERY_URL)
+    response.raise_for_status()
+    document = response.text
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(document)
+    except OSError as err:
+        LOG.warning("Could not cache discovery document: %s", err)
+
+    return document
+
+
 def get_api(config_fn):
     """
-    Given a Google API service account file, build a Google Books API client
-    and return it
+    Given a Google API service account file, return a Google Books API client,
+    building it from the cached discovery document the first time.  The client
+    keeps its credentials, which only fetch a new token when the old one
+    expires.  The Google libraries are only imported when a search is made
     """
-    credentials = Credentials.from_service_account_file(
-        config_fn,
-        scopes=SCOPES
-        )
-    return build(
-        'books', 'v1', credentials=credentials, cache_discovery=False
-        )
+    from google.oauth2.service_account import Credentials
+    from googleapiclient.discovery import build_from_document
+
+    clients = getattr(CLIENTS, 'apis', None)
+    if clients is None:
+        clients = CLIENTS.apis = {}
+
+    if config_fn not in clients:
+        credentials = Credentials.from_service_account_file(
+            config_fn,
+            scopes=SCOPES
+            )
+        clients[config_fn] = build_from_document(
+            load_discovery_document(), credentials=credentials
+            )
+
+    return clients[config_fn]
 
 
 def search_api(api, term):
     """
     Given a Google Books API client and a term, search the API for that term
-    and return the first result
+    and return the first result, an empty dict if there is none, or None if
+    the search failed
     """
+    from googleapiclient.errors import HttpError
+
     try:
         volumes = api.volumes()
         vol_list_object = volumes.list(
@@ -43,31 +93,95 @@ def search_api(api, term):
             filter='free-ebooks',
             langRestrict='fr'
             )
-        vol_list = vol_list_object.execute()
+        with span('search_api'):
+            vol_list = vol_list_object.execute()
     except HttpError as err:
         LOG.error("Error checking Books API: %s", err)
         return None
 
     if vol_list['totalItems'] > 0:
         return vol_list['items'][0]
-    return None
+    return {}
 
 
-def check_books_api(do_check, config_path, play):
+def get_search_term(play):
+    """
+    Generate the Books API search term for a play
+    """
+    return 'intitle:"{}" inauthor:"{}"'.format(play.title, play.author)
+
+
+def check_books_api(do_check, config_path, play, cache=None):
     """
     Given the path to a config file and a Play object, generate an API object
-    and search it for the play title and author
+    and search it for the play title and author, using and updating the cache
+    of search results if one is given
     """
     if not do_check:
         return BookResult()
 
+    term = get_search_term(play)
+    if cache:
+        book_result = cache.get(term)
+        if book_result is not None:
+            LOG.info("Using cached book search for %s", play.title)
+            return book_result
+
     LOG.info("Checking Google books API for %s", play.title)
     books_api = get_api(config_path)
-    book_response = search_api(
-        books_api,
-        'intitle:"{}" inauthor:"{}"'.format(play.title, play.author)
-        )
-    return BookResult.from_api_response(book_response)
+    book_response = search_api(books_api, term)
+    book_result = BookResult.from_api_response(book_response)
+
+    # Failed searches are not cached, but searches with no result are
+    if cache and book_response is not None:
+        cache.put(term, book_result)
+
+    return book_result
+
+
+class BookCache:
+    """
+    Cache of Books API search results in the database.  Results are kept for
+    `cache_days`, and searches that found nothing for `negative_cache_days`
+    """
+
+    def __init__(
+            self, cursor, cache_days=DEFAULT_CACHE_DAYS,
+            negative_cache_days=DEFAULT_NEGATIVE_CACHE_DAYS
+            ):
+        """
+        Initialize BookCache class
+        """
+        self.cursor = cursor
+        self.cache_days = cache_days
+        self.negative_cache_days = negative_cache_days
+
+    def get(self, term):
+        """
+        Return the cached BookResult for a search term, or None if there is no
+        cached result or it has expired
+        """
+        row = book_db(self.cursor, term)
+        if not row:
+            return None
+
+        book_url, image_url, checked = row
+        expiry_days = self.cache_days
+        if not book_url:
+            expiry_days = self.negative_cache_days
+
+        if datetime.now() - checked > timedelta(days=expiry_days):
+            return None
+
+        return BookResult(book_url or '', image_url or '')
+
+    def put(self, term, book_result):
+        """
+        Save a BookResult for a search term
+        """
+        save_book_db(
+            self.cursor, term, book_result.book_url, book_result.image_url
+            )
 
 
 class BookResult:
@@ -119,13 +233,16 @@ class BookResult:
         out_link = QUERY_RE.sub('', self.book_url)
         return out_link
 
-    def get_image_file(self):
+    def get_image_file(self, store=None):
         """
-        Retrieve file and return contents
+        Retrieve file and return contents, through the image store
         """
         better_link = self.get_better_image_url()
         if not better_link:
             return None
 
-        file_res = get(better_link)
-        return file_res.content
+        if store is None:
+            store = get_image_store(IMAGE_CACHE, DEFAULT_MAX_BYTES)
+
+        with span('get_image_file'):
+            return store.read(better_link)
@@ -0,0 +1,188 @@
+"""
+Daemon mode: stay resident and wake at the hours the timing algorithm picks,
+instead of being started by cron every hour
+"""
+from datetime import datetime, timedelta
+from logging import basicConfig, getLogger
+from signal import SIGHUP, SIGINT, SIGTERM, signal
+from time import sleep
+
+from .async_tweet import run_get_and_tweet
+from .db_pool import close_pools
+from .find_play import (
+    ABBREVIATIONS, get_and_tweet, get_local_now, get_play_list,
+    get_planned_play_list, uses_plan
+    )
+from .metrics import record_run
+from .transport import close_sessions, configure
+from .timing import get_next_tweet_hour, is_time_to_tweet
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+
+
+def get_hour_start(local_now, hours=0):
+    """
+    Return the (naive) start of the hour that is `hours` after the current one
+    """
+    hour_start = local_now.replace(
+        minute=0, second=0, microsecond=0, tzinfo=None
+        )
+    return hour_start + timedelta(hours=hours)
+
+
+def get_wake_time(args, local_now, play_count):
+    """
+    Given the current time and the number of plays left for the day, return
+    whether to tweet now and when to wake up next
+    """
+    if not play_count:
+        hours_to_midnight = 24 - local_now.hour
+        return False, get_hour_start(local_now, hours_to_midnight)
+
+    if is_time_to_tweet(args, local_now.hour, play_count):
+        return True, get_hour_start(local_now, 1)
+
+    next_hour = get_next_tweet_hour(local_now.hour, play_count)
+    return False, get_hour_start(local_now, next_hour - local_now.hour)
+
+
+class TweetDaemon:
+    """
+    Keep the process (with its connection pool and caches) alive, and run the
+    find-and-tweet cycle at the times chosen by the timing algorithm
+    """
+
+    def __init__(self, args, load_config):
+        """
+        Initialize the daemon with the command line arguments and a function
+        that loads the configuration
+        """
+        self.args = args
+        self.load_config = load_config
+        self.config = load_config()
+        configure(self.config)
+        self.reloading = False
+        self.stopping = False
+
+    def handle_reload(self, *_):
+        """
+        Signal handler: reload the configuration and recompute the schedule
+        """
+        self.reloading = True
+
+    def handle_stop(self, *_):
+        """
+        Signal handler: stop after the current cycle
+        """
+        self.stopping = True
+
+    def reload(self):
+        """
+        Reload the configuration and drop cached state
+        """
+        LOG.info("Reloading configuration")
+        self.reloading = False
+        self.config = self.load_config()
+        configure(self.config)
+        ABBREVIATIONS.invalidate()
+        close_pools()
+
+    def run_cycle(self):
+        """
+        Run a cycle, recording the time taken by each stage if asked, and
+        return when to wake next
+        """
+        with record_run(self.args.metrics, self.config):
+            return self.tweet_if_time()
+
+    def get_schedule(self, local_now):
+        """
+        Return the play list, whether to tweet now and when to wake next.
+        With a plan, the play planned for the current hour (if any) is tweeted
+        and the plan is checked again at the next hour
+        """
+        if uses_plan(self.args):
+            play_list = get_planned_play_list(
+                self.config['db'], local_now, self.args.tweeted
+                )
+            return play_list, bool(play_list), get_hour_start(local_now, 1)
+
+        play_list = get_play_list(
+            self.config['db'],
+            self.args.wicks,
+            local_now,
+            self.args.date,
+            self.args.tweeted
+            )
+        return (play_list,) + get_wake_time(
+            self.args, local_now, len(play_list)
+            )
+
+    def tweet_if_time(self):
+        """
+        Get the play list, tweet if it is time, and return when to wake next
+        """
+        local_now = get_local_now()
+        play_list, tweet_now, wake_at = self.get_schedule(local_now)
+        if tweet_now:
+            tweet_function = get_and_tweet
+            if self.args.asynchronous:
+                tweet_function = run_get_and_tweet
+
+            tweet_function(
+                self.args.book,
+                self.args.no_tweet,
+                self.config,
+                local_now,
+                play_list[0]
+                )
+
+        LOG.info("Next check at %s", wake_at)
+        return wake_at
+
+    def sleep_until(self, wake_at):
+        """
+        Sleep until the wake time, returning early if a signal asks us to
+        reload or stop
+        """
+        while not (self.reloading or self.stopping):
+            remaining = (wake_at - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return
+            sleep(min(remaining, POLL_INTERVAL))
+
+    def run(self):
+        """
+        Run cycles until stopped
+        """
+        while not self.stopping:
+            if self.reloading:
+                self.reload()
+
+            try:
+                wake_at = self.run_cycle()
+            except Exception as err:  # pylint: disable=broad-except
+                LOG.exception("Error in daemon cycle: %s", err)
+                wake_at = get_hour_start(get_local_now(), 1)
+
+            self.sleep_until(wake_at)
+
+        close_pools()
+        close_sessions()
+
+
+def run_daemon(args, load_config):
+    """
+    Create a daemon, install the signal handlers and run it
+    """
+    daemon = TweetDaemon(args, load_config)
+
+    signal(SIGHUP, daemon.handle_reload)
+    signal(SIGINT, daemon.handle_stop)
+    signal(SIGTERM, daemon.handle_stop)
+
+    LOG.info("Starting daemon")
+    daemon.run()
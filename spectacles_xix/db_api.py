@@ -0,0 +1,62 @@
+"""
+Backend-neutral parts of the database interface: the cursor classes that
+callers ask for, and the errors that either backend can raise.  MySQLdb is
+only imported when a MySQL connection is opened, so the SQLite backend works
+without mysqlclient installed
+"""
+import sqlite3
+import sys
+
+
+class Cursor:
+    """
+    Cursor that returns rows as tuples
+    """
+
+
+class DictCursor(Cursor):
+    """
+    Cursor that returns rows as dicts keyed by column name
+    """
+
+
+class SSDictCursor(DictCursor):
+    """
+    Cursor that returns rows as dicts, streamed from the server instead of
+    fetched all at once
+    """
+
+
+def get_mysql_cursorclass(cursorclass):
+    """
+    Return the MySQLdb cursor class with the same name as a cursor class
+    """
+    from MySQLdb import cursors
+
+    return getattr(cursors, cursorclass.__name__)
+
+
+def get_errors(name):
+    """
+    Return the exception classes with a DB-API name in sqlite3 and, if it has
+    been loaded, MySQLdb.  Nothing can raise the MySQL errors before then
+    """
+    mysqldb = sys.modules.get('MySQLdb')
+    if mysqldb is None:
+        return (getattr(sqlite3, name),)
+    return (getattr(sqlite3, name), getattr(mysqldb, name))
+
+
+def db_errors():
+    """
+    Return the exception classes for a failed query on either backend
+    """
+    return get_errors('DatabaseError')
+
+
+def connection_errors():
+    """
+    Return the exception classes for any error on a connection of either
+    backend
+    """
+    return get_errors('Error')
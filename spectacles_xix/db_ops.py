@@ -5,9 +5,12 @@ from contextlib import contextmanager
 from datetime import datetime
 from logging import basicConfig, getLogger
 
-from MySQLdb import connect
-from MySQLdb.cursors import Cursor, DictCursor
-from _mysql_exceptions import DatabaseError
+from .db_api import (
+    Cursor, DictCursor, connection_errors, db_errors, get_mysql_cursorclass
+    )
+from .db_pool import close_connection, get_pool
+from .metrics import span
+from .sqlite_db import connect_sqlite
 
 basicConfig(level="DEBUG")
 LOG = getLogger(__name__)
@@ -19,85 +22,195 @@ PLAY_SELECT = """SELECT id, wicks, title, author, genre, acts, format,
 
 NOT_TWEETED_CONDITION = 'AND last_tweeted IS NULL'
 
+MESSAGE_SELECT = """SELECT message FROM spectacle_message
+    WHERE play_id = %s AND ce_jour_la = %s
+    """
 
-@contextmanager
-def db_cursor(config, cursorclass=Cursor):
+BOOK_SELECT = """SELECT book_url, image_url, checked FROM spectacle_book
+    WHERE query = %s
+    """
+
+PLAN_SELECT = "SELECT play_id FROM spectacle_plan WHERE plan_slot = %s"
+
+POST_SELECT = "SELECT account, post_id FROM spectacle_post WHERE play_id = %s"
+
+MISSED_PLAN_SELECT = """SELECT play_id FROM spectacle_plan
+    JOIN spectacle_play ON spectacle_play.id = spectacle_plan.play_id
+    WHERE plan_slot >= %s AND plan_slot < %s AND last_tweeted IS NULL
+    ORDER BY plan_slot LIMIT 1
+    """
+
+
+def connect_db(config):
     """
-    Create db cursor and yield it
+    Open a new database connection: a SQLite one if the config says so, or a
+    MySQL one with its character set.  MySQLdb is only imported for MySQL
     """
-    with connect(
+    with span('db_connect'):
+        if config.get('backend') == 'sqlite':
+            return connect_sqlite(config)
+
+        from MySQLdb import connect
+
+        connection = connect(
             config['host'],
             config['user'],
             config['password'],
             config['db'],
-            charset='utf8',
-            cursorclass=cursorclass
-            ) as cursor:
+            charset='utf8'
+            )
 
+        cursor = connection.cursor()
         cursor.execute('SET NAMES utf8;')
         cursor.execute('SET CHARACTER SET utf8;')
         cursor.execute('SET character_set_connection=utf8;')
+        cursor.close()
+
+    return connection
+
+
+def get_cursorclass(config, cursorclass):
+    """
+    Return the class of cursor to open for the backend: the backend-neutral
+    class for SQLite, or the MySQLdb class of the same name
+    """
+    if config.get('backend') == 'sqlite':
+        return cursorclass
+    return get_mysql_cursorclass(cursorclass)
+
+
+@contextmanager
+def db_cursor(config, cursorclass=Cursor):
+    """
+    Check out a pooled connection, yield a cursor on it, then commit (or roll
+    back) and return the connection to the pool.  A connection that failed,
+    or could not be rolled back, is closed instead, and the original error is
+    raised
+    """
+    pool = get_pool(config, lambda: connect_db(config))
+    with span('db_checkout'):
+        connection = pool.checkout()
+    cursor = connection.cursor(get_cursorclass(config, cursorclass))
+    healthy = True
+
+    try:
         yield cursor
+        connection.commit()
+    except BaseException as err:
+        healthy = not isinstance(err, connection_errors())
+        try:
+            connection.rollback()
+        except connection_errors() as rollback_err:
+            LOG.warning("Error rolling back: %s", rollback_err)
+            healthy = False
+        raise
+    finally:
+        if healthy:
+            cursor.close()
+            pool.checkin(connection)
+        else:
+            close_connection(connection)
+
+
+def get_tweeted_condition(tweeted=False):
+    """
+    Return the condition that leaves out plays that have been tweeted, unless
+    tweeted plays are wanted
+    """
+    if tweeted:
+        return ''
+    return NOT_TWEETED_CONDITION
 
 
-def query_by_wicks_id(config, wicks, tweeted=False):
+def get_wicks_query(tweeted=False):
     """
-    Search for a play based on the Wicks ID
+    Build the query for a play by Wicks ID
+    """
+    return '\n'.join(
+        (PLAY_SELECT, "WHERE wicks = %s", get_tweeted_condition(tweeted))
+        )
+
+
+def get_id_query(tweeted=False):
+    """
+    Build the query for a play by database ID
     """
-    wicks_condition = "WHERE wicks = %s"
-    tweeted_condition = ''
-    if not tweeted:
-        tweeted_condition = NOT_TWEETED_CONDITION
+    return '\n'.join(
+        (PLAY_SELECT, "WHERE id = %s", get_tweeted_condition(tweeted))
+        )
+
 
-    query_string = '\n'.join((PLAY_SELECT, wicks_condition, tweeted_condition))
+def get_date_fallback_query(tweeted=False):
+    """
+    Build the query for the plays on a Gregorian date together with one play
+    from another date (the first of the month), to fall back on if there are
+    none on the first date
+    """
+    tweeted_condition = get_tweeted_condition(tweeted)
 
-    return query_play(config, query_string, wicks)
+    return '\n'.join((
+        PLAY_SELECT,
+        "WHERE (greg_date = %s OR id = (",
+        "SELECT id FROM spectacle_play WHERE greg_date = %s",
+        tweeted_condition,
+        "LIMIT 1))",
+        tweeted_condition
+        ))
 
 
-def query_by_date(config, greg_date, tweeted=False, limit=None):
+def query_by_wicks_id(config, wicks, tweeted=False):
     """
-    Search for a play based on the Gregorian date
+    Search for a play based on the Wicks ID
     """
-    date_condition = "WHERE greg_date = %s"
+    return query_play(config, get_wicks_query(tweeted), wicks)
 
-    tweeted_condition = ''
-    if not tweeted:
-        tweeted_condition = NOT_TWEETED_CONDITION
 
-    limit_string = ''
-    if limit:
-        limit_string = "LIMIT 1"
+def query_by_id(config, play_id, tweeted=False):
+    """
+    Search for a play based on its database ID
+    """
+    return query_play(config, get_id_query(tweeted), play_id)
+
 
-    query_string = '\n'.join(
-        (PLAY_SELECT, date_condition, tweeted_condition, limit_string)
+def query_by_date_with_fallback(config, greg_date, tweeted=False):
+    """
+    Search for the plays on a Gregorian date and one play from the first of
+    the month, in a single query
+    """
+    return query_play(
+        config,
+        get_date_fallback_query(tweeted),
+        greg_date.isoformat(),
+        greg_date.replace(day=1).isoformat()
         )
-    return query_play(config, query_string, greg_date.isoformat())
 
 
-def query_play(config, query_string, lookup_term):
+def query_play(config, query_string, *lookup_terms):
     """
-    Given a database configuration, a query string and a lookup term, search
-    for plays and return a list
+    Given a database configuration, a query string and the lookup terms,
+    search for plays and return a list
     """
     with db_cursor(config, cursorclass=DictCursor) as cursor:
-        play_list = play_db(cursor, query_string, lookup_term)
+        with span('query_play'):
+            play_list = play_db(cursor, query_string, *lookup_terms)
 
     return play_list
 
 
-def play_db(cursor, query_string, lookup_term):
+def play_db(cursor, query_string, *lookup_terms):
     """
-    Given a query string and a term, retrieve the list of plays associated with
-    that term
+    Given a query string and the terms, retrieve the list of plays associated
+    with those terms
     """
     play_list = []
+    terms_string = ', '.join(str(term) for term in lookup_terms)
 
     try:
-        cursor.execute(query_string, [lookup_term])
+        cursor.execute(query_string, list(lookup_terms))
         play_res = cursor.fetchall()
-    except DatabaseError as err:
+    except db_errors() as err:
         LOG.error(
-            "Error retrieving plays for %s: %s", lookup_term, err
+            "Error retrieving plays for %s: %s", terms_string, err
             )
         return play_list
 
@@ -105,34 +218,219 @@ def play_db(cursor, query_string, lookup_term):
         play_list.append(row)
 
     if not play_list:
-        LOG.info("No plays for %s", lookup_term)
+        LOG.info("No plays for %s", terms_string)
     return play_list
 
 
-def abbreviation_db(cursor, word):
+def abbreviations_db(cursor):
     """
-    Look up abbreviation expansion in the database
+    Load the whole abbreviation table from the database and return it as a
+    dict, or None if it could not be read
     """
-    abbrevq = "SELECT expansion FROM spectacle_abbrev WHERE abbrev = %s"
+    abbrevq = "SELECT abbrev, expansion FROM spectacle_abbrev"
 
-    if word:
-        try:
-            cursor.execute(abbrevq, [word])
+    try:
+        cursor.execute(abbrevq)
+    except db_errors() as err:
+        LOG.error("Error retrieving abbreviations: %s", err)
+        return None
+
+    return {
+        abbrev.lower(): expansion
+        for (abbrev, expansion) in cursor.fetchall()
+        }
+
+
+def message_db(cursor, play_id, ce_jour_la):
+    """
+    Look up the pre-rendered message for a play, with or without #CeJourLà
+    """
+    try:
+        cursor.execute(MESSAGE_SELECT, [play_id, int(ce_jour_la)])
+    except db_errors() as err:
+        LOG.error("Error retrieving message for %s: %s", play_id, err)
+        return None
+
+    res = cursor.fetchone()
+    if res:
+        return res[0]
+    return None
+
+
+def save_message_db(cursor, play_id, ce_jour_la, message):
+    """
+    Save the rendered message for a play, with or without #CeJourLà
+    """
+    messageq = """REPLACE INTO spectacle_message (play_id, ce_jour_la, message)
+    VALUES (%s, %s, %s)
+    """
+    try:
+        cursor.execute(messageq, [play_id, int(ce_jour_la), message])
+    except db_errors() as err:
+        LOG.error("Error saving message for %s: %s", play_id, err)
+
+
+def save_messages_db(cursor, messages):
+    """
+    Save a batch of rendered messages, given as a list of (play ID, ce_jour_la,
+    message) tuples
+    """
+    messageq = """REPLACE INTO spectacle_message (play_id, ce_jour_la, message)
+    VALUES (%s, %s, %s)
+    """
+    try:
+        cursor.executemany(
+            messageq,
+            [(play_id, int(ce_jour_la), message)
+             for (play_id, ce_jour_la, message) in messages]
+            )
+    except db_errors() as err:
+        LOG.error("Error saving %s messages: %s", len(messages), err)
+
+
+def stream_plays_db(cursor, batch_size):
+    """
+    Given a (server-side) cursor, run PLAY_SELECT for the whole corpus and
+    yield the rows in batches
+    """
+    try:
+        cursor.execute(PLAY_SELECT)
+    except db_errors() as err:
+        LOG.error("Error retrieving plays: %s", err)
+        return
+
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def book_db(cursor, query):
+    """
+    Look up a cached Books API search, returning a tuple of the book URL, the
+    image URL and the time it was checked, or None
+    """
+    try:
+        cursor.execute(BOOK_SELECT, [query])
+    except db_errors() as err:
+        LOG.error("Error retrieving cached book for %s: %s", query, err)
+        return None
+
+    return cursor.fetchone()
+
+
+def save_book_db(cursor, query, book_url, image_url):
+    """
+    Save the result of a Books API search; a search with no result is saved
+    with empty URLs
+    """
+    bookq = """REPLACE INTO spectacle_book (query, book_url, image_url, checked)
+    VALUES (%s, %s, %s, %s)
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        cursor.execute(bookq, [query, book_url, image_url, timestamp])
+    except db_errors() as err:
+        LOG.error("Error saving cached book for %s: %s", query, err)
+
+
+def plan_slot_db(cursor, plan_slot):
+    """
+    Look up the planned play for an hour of the tweet plan.  Return None if
+    there is no plan for that hour, or a tuple of the play ID (which is None
+    if nothing is to be tweeted that hour)
+    """
+    try:
+        cursor.execute(PLAN_SELECT, [plan_slot.isoformat(sep=' ')])
+    except db_errors() as err:
+        LOG.error("Error retrieving plan for %s: %s", plan_slot, err)
+        return None
+
+    return cursor.fetchone()
+
+
+def missed_plan_db(cursor, plan_slot):
+    """
+    Look up the first play planned for an earlier hour of the same day that
+    has not been tweeted, because the run for that hour was missed or failed.
+    Return None if there is none, or a tuple of the play ID
+    """
+    day_start = plan_slot.replace(hour=0)
+    try:
+        cursor.execute(
+            MISSED_PLAN_SELECT,
+            [day_start.isoformat(sep=' '), plan_slot.isoformat(sep=' ')]
+            )
+    except db_errors() as err:
+        LOG.error("Error retrieving missed plan for %s: %s", plan_slot, err)
+        return None
+
+    return cursor.fetchone()
+
+
+def prune_plan_db(cursor, plan_slot):
+    """
+    Delete the tweet plans of the days before the day of a plan slot
+    """
+    pruneq = "DELETE FROM spectacle_plan WHERE plan_slot < %s"
+    day_start = plan_slot.replace(hour=0)
+    try:
+        cursor.execute(pruneq, [day_start.isoformat(sep=' ')])
+    except db_errors() as err:
+        LOG.error("Error pruning tweet plan: %s", err)
+
+
+def plan_db(cursor, plan):
+    """
+    Save a tweet plan, given as a list of (plan slot, play ID) tuples
+    """
+    planq = """REPLACE INTO spectacle_plan (plan_slot, play_id)
+    VALUES (%s, %s)
+    """
+    try:
+        cursor.executemany(
+            planq,
+            [(plan_slot.isoformat(sep=' '), play_id)
+             for (plan_slot, play_id) in plan]
+            )
+    except db_errors() as err:
+        LOG.error("Error saving tweet plan: %s", err)
 
-        except DatabaseError as err:
-            LOG.error(
-                "Error retrieving expansion for word %s: %s",
-                word,
-                err
-                )
-            return word
 
-        res = cursor.fetchone()
+def posts_db(cursor, play_id):
+    """
+    Return a dict of the IDs of the posts already made for a play, by account
+    """
+    try:
+        cursor.execute(POST_SELECT, [play_id])
+    except db_errors() as err:
+        LOG.error("Error retrieving posts for %s: %s", play_id, err)
+        return {}
+
+    return dict(cursor.fetchall())
 
-        if res:
-            word = res[0]
 
-    return word
+def save_posts_db(cursor, play_id, results):
+    """
+    Save the ID of each post made for a play, given as a dict of the post ID
+    (or None, if the post failed) by account
+    """
+    postq = """REPLACE INTO spectacle_post (play_id, account, post_id, posted)
+    VALUES (%s, %s, %s, %s)
+    """
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rows = [
+        (play_id, account, str(post_id), timestamp)
+        for (account, post_id) in results.items() if post_id
+        ]
+    if not rows:
+        return
+
+    try:
+        cursor.executemany(postq, rows)
+    except db_errors() as err:
+        LOG.error("Error saving posts for %s: %s", play_id, err)
 
 
 def tweet_db(cursor, play_id):
@@ -147,9 +445,27 @@ def tweet_db(cursor, play_id):
     try:
         cursor.execute(tweetq, [timestamp, play_id])
         LOG.debug("Marked play %s as tweeted on %s", play_id, timestamp)
-    except DatabaseError as err:
+    except db_errors() as err:
         LOG.error(
             "Error updating tweeted timestamp for %s: %s",
             play_id,
             err
             )
+
+
+def tweeted_ids_db(cursor, play_ids):
+    """
+    Given a list of play IDs, return the set of those that have been tweeted,
+    or None if it could not be read
+    """
+    tweetedq = """SELECT id FROM spectacle_play
+    WHERE last_tweeted IS NOT NULL AND id IN ({})
+    """.format(', '.join(['%s'] * len(play_ids)))
+
+    try:
+        cursor.execute(tweetedq, list(play_ids))
+    except db_errors() as err:
+        LOG.error("Error retrieving tweet status: %s", err)
+        return None
+
+    return {row[0] for row in cursor.fetchall()}
@@ -0,0 +1,152 @@
+"""
+Process-wide pool of database connections, so that a run (or a long-lived
+process) reuses physical connections instead of reconnecting for every cursor
+"""
+from collections import deque
+from logging import basicConfig, getLogger
+from threading import Lock
+from time import monotonic
+
+from .db_api import connection_errors
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_IDLE_TIMEOUT = 300
+
+
+class ConnectionPool:
+    """
+    Keep up to `size` idle connections, check their health on checkout and
+    close the ones that have been idle for longer than `idle_timeout` seconds
+    """
+
+    def __init__(
+            self, connect, size=DEFAULT_POOL_SIZE,
+            idle_timeout=DEFAULT_IDLE_TIMEOUT
+            ):
+        """
+        Initialize the pool with a function that opens a new connection
+        """
+        self.connect = connect
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.idle = deque()
+        self.lock = Lock()
+
+    def evict_idle(self, now=None):
+        """
+        Close any connections that have been idle for too long
+        """
+        if now is None:
+            now = monotonic()
+
+        with self.lock:
+            expired = [
+                connection for (connection, last_used) in self.idle
+                if now - last_used > self.idle_timeout
+                ]
+            self.idle = deque(
+                (connection, last_used) for (connection, last_used)
+                in self.idle if now - last_used <= self.idle_timeout
+                )
+
+        for connection in expired:
+            LOG.debug("Closing idle connection %s", id(connection))
+            close_connection(connection)
+
+    def checkout(self):
+        """
+        Return a healthy idle connection, or open a new one
+        """
+        self.evict_idle()
+
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                connection, _ = self.idle.pop()
+
+            try:
+                connection.ping()
+                return connection
+            except connection_errors() as err:
+                LOG.warning("Discarding dead connection: %s", err)
+                close_connection(connection)
+
+        LOG.debug("Opening new database connection")
+        return self.connect()
+
+    def checkin(self, connection):
+        """
+        Return a connection to the pool, or close it if the pool is full
+        """
+        with self.lock:
+            if len(self.idle) < self.size:
+                self.idle.append((connection, monotonic()))
+                return
+
+        close_connection(connection)
+
+    def close(self):
+        """
+        Close all idle connections
+        """
+        with self.lock:
+            idle = self.idle
+            self.idle = deque()
+
+        for connection, _ in idle:
+            close_connection(connection)
+
+
+def close_connection(connection):
+    """
+    Close a connection, ignoring errors from connections that are already dead
+    """
+    try:
+        connection.close()
+    except connection_errors() as err:
+        LOG.debug("Error closing connection: %s", err)
+
+
+POOLS = {}
+POOLS_LOCK = Lock()
+
+
+def get_pool(config, connect):
+    """
+    Given a database config and a function to open a connection with it, return
+    the pool for that database, creating it if necessary
+    """
+    key = (
+        config.get('backend'),
+        config.get('host'),
+        config.get('user'),
+        config.get('db'),
+        config.get('path')
+        )
+
+    with POOLS_LOCK:
+        if key not in POOLS:
+            POOLS[key] = ConnectionPool(
+                connect,
+                size=int(config.get('pool_size', DEFAULT_POOL_SIZE)),
+                idle_timeout=float(
+                    config.get('pool_idle_timeout', DEFAULT_IDLE_TIMEOUT)
+                    )
+                )
+        return POOLS[key]
+
+
+def close_pools():
+    """
+    Close every idle connection in every pool
+    """
+    with POOLS_LOCK:
+        pools = list(POOLS.values())
+        POOLS.clear()
+
+    for pool in pools:
+        pool.close()
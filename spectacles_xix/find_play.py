@@ -4,21 +4,50 @@ tweeted), find a play.
 """
 from datetime import datetime
 from logging import basicConfig, getLogger
-from re import finditer
 
-from dateutil import relativedelta
+from pytz import timezone
 
-from .check_books import check_books_api
+from .abbreviations import AbbreviationCache
+from .check_books import (
+    DEFAULT_CACHE_DAYS, DEFAULT_NEGATIVE_CACHE_DAYS, IMAGE_CACHE, BookCache,
+    check_books_api
+    )
 from .db_ops import (
-    abbreviation_db, db_cursor, query_by_date, query_by_wicks_id
+    db_cursor, message_db, missed_plan_db, plan_db, plan_slot_db,
+    prune_plan_db, query_by_date_with_fallback, query_by_id, query_by_wicks_id,
+    save_message_db
     )
+from .image_store import DEFAULT_MAX_BYTES, get_image_store
 from .play import Play
-from .tweet import send_tweet
+from .publish import publish_play
+from .snapshot import (
+    get_snapshot, snapshot_by_date_with_fallback, snapshot_by_wicks_id
+    )
+from .timing import plan_tweet_hours
 
 basicConfig(level="DEBUG")
 LOG = getLogger(__name__)
 
 INPUT_DATE_FORMAT = "%d-%m-%Y"
+TIMEZONE = 'Europe/Paris'
+
+TRUE_STRINGS = ('1', 'yes', 'true', 'on')
+
+ABBREVIATIONS = AbbreviationCache()
+
+
+def is_enabled(config, option):
+    """
+    Determine whether a yes/no option is switched on in a config section
+    """
+    return str(config.get(option, '')).lower() in TRUE_STRINGS
+
+
+def get_local_now():
+    """
+    Return the current time in the time zone for Western Europe
+    """
+    return timezone(TIMEZONE).localize(datetime.now())
 
 
 def get_date_object(date_string):
@@ -32,111 +61,216 @@ def get_200_years_ago(local_now):
     """
     Generate a date object in the nineteenth century
     """
-    return local_now.date() + relativedelta.relativedelta(years=-200)
+    today = local_now.date()
+    try:
+        return today.replace(year=today.year - 200)
+    except ValueError:
+        # 29 February, and the year 200 years ago was not a leap year
+        return today.replace(year=today.year - 200, day=28)
 
 
 def check_by_date(config, local_now, args_date, tweeted):
     """
     Given a config dict, a date and whether to search already tweeted plays,
-    check for plays with the given date.  If there are non, check from the
-    first of the month.
+    check for plays with the given date.  If there are non, use one from the
+    first of the month, which is fetched by the same query.  The plays are
+    read from the snapshot if the config names one.
     """
     if args_date:
         today_date = get_date_object(args_date)
     else:
         today_date = get_200_years_ago(local_now)
 
-    play_list = query_by_date(config, today_date, tweeted)
+    snapshot = get_snapshot(config)
+    if snapshot:
+        play_list = snapshot_by_date_with_fallback(
+            config, snapshot, today_date, tweeted
+            )
+    else:
+        play_list = query_by_date_with_fallback(config, today_date, tweeted)
 
-    if not play_list:
-        # Look for one play from the first of the month
-        first_of_the_month = today_date.replace(day=1)
-        LOG.info("Checking for plays on %s", first_of_the_month)
-        play_list = query_by_date(config, first_of_the_month, tweeted, limit=1)
+    today_list = [
+        play_dict for play_dict in play_list
+        if play_dict['greg_date'] == today_date
+        ]
+    if today_list or not play_list:
+        return today_list
 
-    return play_list
+    LOG.info("Using a play from %s", play_list[0]['greg_date'])
+    return play_list[:1]
 
 
-def get_replacements(cursor, abbrev_match):
+def expand_abbreviation(cursor, phrase):
     """
-    Given a db cursor and a set of possible abbreviations, return any matches
-    found in the database
+    Expand abbreviations using the cached abbreviation table
     """
-    replacements = set()
+    return ABBREVIATIONS.expand(cursor, phrase)
 
-    for match_object in abbrev_match:
-        abbreviation = match_object.group(1)
 
-        expansion = abbreviation_db(cursor, abbreviation)
-        if expansion:
-            replacements.add((abbreviation, expansion))
+def get_play_list(config, wicks, local_now, args_date, tweeted):
+    """
+    Depending on the arguments, check by Wicks ID or date
+    """
+    if wicks:
+        snapshot = get_snapshot(config)
+        if snapshot:
+            play_list = snapshot_by_wicks_id(config, snapshot, wicks, tweeted)
+        else:
+            play_list = query_by_wicks_id(config, wicks, tweeted)
+    else:
+        play_list = check_by_date(config, local_now, args_date, tweeted)
 
-    return replacements
+    return play_list
 
 
-def expand_abbreviation(cursor, phrase):
+def make_plan(plan_slot, play_list):
     """
-    Look up abbreviation expansion in the database
+    Given the slot for the current hour and the day's plays, assign the plays
+    to the hours chosen by the timing algorithm, and return a list of
+    (plan slot, play ID) tuples for every remaining hour of the day
     """
-    # Find abbreviated words and iterate through them
-    abbrev_match = finditer(r'(\w+)\.', phrase)
-    if not abbrev_match:
-        return phrase
+    tweet_hours = plan_tweet_hours(plan_slot.hour, len(play_list))
+    play_ids = dict(zip(tweet_hours, (play['id'] for play in play_list)))
 
-    replacements = get_replacements(cursor, abbrev_match)
+    return [
+        (plan_slot.replace(hour=hour), play_ids.get(hour))
+        for hour in range(plan_slot.hour, 24)
+        ]
 
-    for (abbreviation, expansion) in replacements:
-        phrase = phrase.replace(abbreviation + '.', expansion)
 
-    return phrase
+def uses_plan(args):
+    """
+    Return whether to tweet the play planned for the current hour: asked for
+    with -p, unless -w, -d or -f chooses the play instead
+    """
+    return bool(args.plan and not (args.wicks or args.date or args.force))
 
 
-def get_play_list(config, wicks, local_now, args_date, tweeted):
+def get_planned_play_list(config, local_now, tweeted):
     """
-    Depending on the arguments, check by Wicks ID or date
+    Look up the play planned for the current hour, making the plan for the
+    rest of the day (and dropping the plans of earlier days) if there is none
+    yet.  A play planned for an earlier hour of the day that has not been
+    tweeted is taken first, and the current hour's play is left for later
     """
-    if wicks:
-        play_list = query_by_wicks_id(config, wicks, tweeted)
+    plan_slot = local_now.replace(
+        minute=0, second=0, microsecond=0, tzinfo=None
+        )
+
+    with db_cursor(config) as cursor:
+        plan_row = plan_slot_db(cursor, plan_slot)
+        missed_row = None
+        if plan_row and not tweeted:
+            missed_row = missed_plan_db(cursor, plan_slot)
+
+    if missed_row:
+        play_id = missed_row[0]
+        LOG.info("Retrying play %s, planned for an earlier hour", play_id)
+    elif plan_row:
+        play_id = plan_row[0]
     else:
-        play_list = check_by_date(config, local_now, args_date, tweeted)
+        play_list = check_by_date(config, local_now, None, tweeted)
+        plan = make_plan(plan_slot, play_list)
+        LOG.info("Planning %s plays for %s", len(play_list), plan_slot.date())
 
-    return play_list
+        with db_cursor(config) as cursor:
+            prune_plan_db(cursor, plan_slot)
+            plan_db(cursor, plan)
+        play_id = plan[0][1]
 
+    if play_id is None:
+        return []
 
-def get_play(cursor, local_now, play_dict):
+    return query_by_id(config, play_id, tweeted)
+
+
+def get_play(cursor, local_now, play_dict, use_store=False):
     """
     Given a database cursor, the current time and a dict of play info, return
-    a play object
+    a play object.  If use_store is set, use the pre-rendered message from the
+    message store, rendering and saving it if there is none yet
     """
     old_date = get_200_years_ago(local_now)
-    expanded_genre = expand_abbreviation(cursor, play_dict['genre'])
 
     play = Play.from_dict(play_dict)
     play.set_today(old_date)
-    play.set_expanded_genre(expanded_genre)
+
+    message = None
+    if use_store:
+        message = message_db(cursor, play.play_id, bool(play.ce_jour_la))
+
+    if message:
+        play.set_description(message)
+    else:
+        expanded_genre = expand_abbreviation(cursor, play_dict['genre'])
+        play.set_expanded_genre(expanded_genre)
+
+        if use_store:
+            save_message_db(
+                cursor, play.play_id, bool(play.ce_jour_la), str(play)
+                )
 
     LOG.info(play)
     return play
 
 
+def get_book_cache(cursor, config):
+    """
+    Return a cache of Books API search results if it is switched on in the
+    [books] section of the config, or None
+    """
+    if 'books' not in config or not is_enabled(config['books'], 'cache'):
+        return None
+
+    books_config = config['books']
+    return BookCache(
+        cursor,
+        int(books_config.get('cache_days', DEFAULT_CACHE_DAYS)),
+        int(books_config.get(
+            'negative_cache_days', DEFAULT_NEGATIVE_CACHE_DAYS
+            ))
+        )
+
+
+def get_config_image_store(config):
+    """
+    Return the image store, with the size limit from the [books] section of
+    the config if there is one
+    """
+    max_bytes = DEFAULT_MAX_BYTES
+    if 'books' in config and 'image_cache_mb' in config['books']:
+        max_bytes = int(config['books']['image_cache_mb']) * 1024 * 1024
+
+    return get_image_store(IMAGE_CACHE, max_bytes)
+
+
 def get_and_tweet(args_book, no_tweet, config, local_now, play_dict):
     """
-    Get a cursor, get the play, check for books, send the tweet
+    Get a cursor, get the play, check for books, post the message to every
+    configured account
     """
     with db_cursor(config['db']) as cursor:
-        play = get_play(cursor, local_now, play_dict)
+        play = get_play(
+            cursor,
+            local_now,
+            play_dict,
+            is_enabled(config['db'], 'message_store')
+            )
 
         book_result = check_books_api(
-            args_book, config['path']['google_service_account'], play
+            args_book,
+            config['path']['google_service_account'],
+            play,
+            get_book_cache(cursor, config)
             )
 
         if no_tweet:
             return
 
-        send_tweet(
+        publish_play(
             cursor,
-            config['twitter'],
+            config,
             play_dict['id'],
             str(play) + ' ' + book_result.get_better_book_url(),
-            book_result.get_image_file()
+            book_result.get_image_file(get_config_image_store(config))
             )
@@ -0,0 +1,76 @@
+"""
+French date formatting for play descriptions, without the fr_FR locale.
+Dates in the years covered by the corpus are formatted once per year and kept
+in tables, so rendering a description is a lookup
+"""
+from datetime import date
+from threading import Lock
+
+WEEKDAYS = (
+    'lundi', 'mardi', 'mercredi', 'jeudi', 'vendredi', 'samedi', 'dimanche'
+    )
+
+MONTHS = (
+    'janvier', 'février', 'mars', 'avril', 'mai', 'juin', 'juillet', 'août',
+    'septembre', 'octobre', 'novembre', 'décembre'
+    )
+
+DATE_TEMPLATE = '{weekday} le {day:02d} {month} {year}'
+
+# The years covered by Wicks, The Parisian Stage
+FIRST_YEAR = 1800
+LAST_YEAR = 1875
+
+YEAR_TABLES = {}
+YEAR_TABLES_LOCK = Lock()
+
+
+def format_date_uncached(greg_date):
+    """
+    Format a date the way strftime("%A le %d %B %Y") does in the fr_FR locale
+    """
+    return DATE_TEMPLATE.format(
+        weekday=WEEKDAYS[greg_date.weekday()],
+        day=greg_date.day,
+        month=MONTHS[greg_date.month - 1],
+        year=greg_date.year
+        )
+
+
+def build_year_table(year):
+    """
+    Return a tuple of the formatted dates of a year, indexed by the day of the
+    year starting from zero
+    """
+    first_ordinal = date(year, 1, 1).toordinal()
+    last_ordinal = date(year, 12, 31).toordinal()
+    return tuple(
+        format_date_uncached(date.fromordinal(ordinal))
+        for ordinal in range(first_ordinal, last_ordinal + 1)
+        )
+
+
+def get_year_table(year):
+    """
+    Return the table of formatted dates for a year, building it the first time
+    """
+    table = YEAR_TABLES.get(year)
+    if table is None:
+        with YEAR_TABLES_LOCK:
+            table = YEAR_TABLES.get(year)
+            if table is None:
+                table = build_year_table(year)
+                YEAR_TABLES[year] = table
+    return table
+
+
+def format_date(greg_date):
+    """
+    Return the French form of a date, e.g. 'jeudi le 15 octobre 1818', from
+    the tables for years in the corpus and directly for any other year
+    """
+    if not FIRST_YEAR <= greg_date.year <= LAST_YEAR:
+        return format_date_uncached(greg_date)
+
+    table = get_year_table(greg_date.year)
+    return table[greg_date.timetuple().tm_yday - 1]
@@ -0,0 +1,41 @@
+"""
+Keep-alive HTTP session with retries and a default timeout, for the shared
+transport
+"""
+from requests import Session
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from .transport import (
+    BACKOFF_FACTOR, DEFAULT_RETRIES, DEFAULT_TIMEOUT, RETRY_STATUSES
+    )
+
+
+class TransportSession(Session):
+    """
+    Session that retries failed connections (and idempotent requests that
+    get a server error), and applies a default timeout to every request
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        """
+        Initialize the session and mount the retrying adapter
+        """
+        super().__init__()
+        self.timeout = timeout
+
+        adapter = HTTPAdapter(max_retries=Retry(
+            total=retries,
+            backoff_factor=BACKOFF_FACTOR,
+            status_forcelist=RETRY_STATUSES,
+            raise_on_status=False
+            ))
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, *args, **kwargs):
+        """
+        Send a request, with the default timeout unless one is given
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, *args, **kwargs)
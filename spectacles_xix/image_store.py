@@ -0,0 +1,252 @@
+"""
+Disk-backed store of title page images.  Images are streamed to disk, stored
+under the SHA-256 hash of their contents (so that editions shared between
+plays are only stored once), revalidated with conditional requests, and
+evicted least recently used first when the store grows too large
+"""
+from collections import Counter
+from hashlib import sha256
+import json
+from logging import basicConfig, getLogger
+from os import replace, utime
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from time import time
+
+from .transport import get_session
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+REVALIDATE_SECONDS = 30 * 24 * 60 * 60
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageStore:
+    """
+    Content-addressed, size-bounded image cache in a directory
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Initialize the store, loading the URL index if there is one
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.index_path = Path(self.directory, 'index.json')
+        self.lock = Lock()
+        self.index = {}
+        self.pinned = Counter()
+
+        if self.index_path.exists():
+            try:
+                self.index = json.loads(self.index_path.read_text())
+            except ValueError as err:
+                LOG.warning("Ignoring damaged image index: %s", err)
+
+    def get_object_path(self, digest):
+        """
+        Return the path where the image with the given hash is stored
+        """
+        return Path(self.directory, 'objects', digest[:2], digest)
+
+    def save_index(self):
+        """
+        Write the URL index to disk atomically
+        """
+        with NamedTemporaryFile(
+                'w', dir=str(self.directory), delete=False
+                ) as index_file:
+            json.dump(self.index, index_file)
+        replace(index_file.name, str(self.index_path))
+
+    def get_headers(self, entry):
+        """
+        Return the headers for a conditional request for an index entry
+        """
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def download(self, url, headers):
+        """
+        Stream the image at the URL to a temporary file, hashing it as it is
+        written.  Return the response and the hash and path of the file, or
+        None for both if the server says the image has not changed
+        """
+        with get_session(url).get(
+                url, headers=headers, stream=True
+                ) as response:
+            if response.status_code == 304:
+                return response, None, None
+
+            response.raise_for_status()
+
+            digest = sha256()
+            with NamedTemporaryFile(
+                    dir=str(self.directory), delete=False
+                    ) as image_file:
+                try:
+                    for chunk in response.iter_content(CHUNK_SIZE):
+                        digest.update(chunk)
+                        image_file.write(chunk)
+                except BaseException:
+                    Path(image_file.name).unlink()
+                    raise
+
+        return response, digest.hexdigest(), Path(image_file.name)
+
+    def unpin(self, object_path):
+        """
+        Unpin a stored image.  The caller holds the lock
+        """
+        self.pinned[object_path.name] -= 1
+        if not self.pinned[object_path.name]:
+            del self.pinned[object_path.name]
+
+    def release(self, object_path):
+        """
+        Let a stored image be evicted again once it has been read
+        """
+        with self.lock:
+            self.unpin(object_path)
+
+    def fetch(self, url):
+        """
+        Return the path of the stored image for a URL, downloading it if it
+        is not in the store, or revalidating it if it was checked too long ago.
+        The image is pinned, so that it is not evicted, until it is released
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        with self.lock:
+            entry = dict(self.index.get(url, {}))
+
+            object_path = None
+            if entry:
+                object_path = self.get_object_path(entry['hash'])
+                if object_path.exists():
+                    self.pinned[object_path.name] += 1
+                else:
+                    entry, object_path = {}, None
+
+            if object_path and time() - entry['checked'] < REVALIDATE_SECONDS:
+                utime(str(object_path))
+                return object_path
+
+        try:
+            response, digest, temp_path = self.download(
+                url, self.get_headers(entry)
+                )
+        except BaseException:
+            if object_path:
+                self.release(object_path)
+            raise
+
+        with self.lock:
+            if digest:
+                new_path = self.get_object_path(digest)
+                if new_path.exists():
+                    LOG.debug("Image %s is already stored as %s", url, digest)
+                    temp_path.unlink()
+                else:
+                    new_path.parent.mkdir(parents=True, exist_ok=True)
+                    replace(str(temp_path), str(new_path))
+
+                self.pinned[new_path.name] += 1
+                if object_path:
+                    self.unpin(object_path)
+                object_path = new_path
+
+                entry = {
+                    'hash': digest,
+                    'etag': response.headers.get('ETag'),
+                    'last_modified': response.headers.get('Last-Modified')
+                    }
+
+            entry['checked'] = time()
+            utime(str(object_path))
+
+            self.index[url] = entry
+            self.save_index()
+
+        return object_path
+
+    def read(self, url):
+        """
+        Return the contents of the image for a URL, or None if it could not be
+        downloaded
+        """
+        from requests import RequestException
+
+        try:
+            object_path = self.fetch(url)
+        except RequestException as err:
+            LOG.error("Error fetching image %s: %s", url, err)
+            return None
+
+        try:
+            return object_path.read_bytes()
+        finally:
+            self.release(object_path)
+            self.evict()
+
+    def evict(self):
+        """
+        Remove the least recently used images until the store fits in
+        max_bytes, and drop the index entries that point to them.  Images
+        that are being read are kept
+        """
+        with self.lock:
+            objects = []
+            for path in Path(self.directory, 'objects').glob('*/*'):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                objects.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for (_, size, _) in objects)
+            if total <= self.max_bytes:
+                return
+
+            removed = set()
+            for _, size, path in sorted(objects):
+                if total <= self.max_bytes:
+                    break
+                if path.name in self.pinned:
+                    continue
+                LOG.debug("Evicting image %s", path.name)
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                removed.add(path.name)
+                total -= size
+
+            self.index = {
+                url: entry for (url, entry) in self.index.items()
+                if entry['hash'] not in removed
+                }
+            self.save_index()
+
+
+STORES = {}
+STORES_LOCK = Lock()
+
+
+def get_image_store(directory, max_bytes=DEFAULT_MAX_BYTES):
+    """
+    Return the shared image store for a directory, creating it if necessary
+    """
+    key = str(directory)
+    with STORES_LOCK:
+        if key not in STORES:
+            STORES[key] = ImageStore(directory, max_bytes)
+        STORES[key].max_bytes = max_bytes
+        return STORES[key]
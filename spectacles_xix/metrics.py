@@ -0,0 +1,203 @@
+"""
+Per-stage timing for a bot run.  The stages are wrapped in spans, which do
+nothing unless a run is being recorded; a recorded run is logged as a timing
+record and can be written as Prometheus text-format metrics for
+node_exporter's textfile collector
+"""
+from contextlib import contextmanager
+from datetime import datetime
+import json
+from logging import basicConfig, getLogger
+from os import getpid, replace
+from threading import Lock
+from time import perf_counter, time
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+METRIC_PREFIX = 'spectacles_xix'
+
+# The recorder for the current run, or None when spans are switched off
+RECORDER = None
+
+
+class NullSpan:
+    """
+    Span that records nothing, used when no run is being recorded
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+    """
+    Time the code in a with block and add it to a stage of the run
+    """
+
+    def __init__(self, recorder, name):
+        """
+        Initialize the span for a stage
+        """
+        self.recorder = recorder
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.recorder.add(self.name, perf_counter() - self.start)
+        return False
+
+
+class RunRecorder:
+    """
+    Keep the number of calls and the total time of each stage of a run.
+    Stages can run in several threads at once
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty record
+        """
+        self.started = datetime.now()
+        self.start = perf_counter()
+        self.elapsed = None
+        self.stages = {}
+        self.lock = Lock()
+
+    def add(self, name, elapsed):
+        """
+        Add a call to a stage
+        """
+        with self.lock:
+            calls, seconds = self.stages.get(name, (0, 0.0))
+            self.stages[name] = (calls + 1, seconds + elapsed)
+
+    def finish(self):
+        """
+        Record the time taken by the whole run
+        """
+        self.elapsed = perf_counter() - self.start
+
+    def get_record(self):
+        """
+        Return the timing record for the run as a dict
+        """
+        with self.lock:
+            stages = {
+                name: {'calls': calls, 'seconds': round(seconds, 6)}
+                for (name, (calls, seconds)) in sorted(self.stages.items())
+                }
+
+        return {
+            'started': self.started.isoformat(),
+            'seconds': round(self.elapsed or 0.0, 6),
+            'stages': stages
+            }
+
+
+def span(name):
+    """
+    Return a context manager that times a stage of the current run, or one
+    that does nothing if no run is being recorded
+    """
+    recorder = RECORDER
+    if recorder is None:
+        return NULL_SPAN
+    return Span(recorder, name)
+
+
+def format_prometheus(record, timestamp=None):
+    """
+    Format a timing record as Prometheus text-format metrics
+    """
+    if timestamp is None:
+        timestamp = time()
+
+    lines = [
+        '# HELP {}_run_seconds Time taken by the last run'.format(
+            METRIC_PREFIX
+            ),
+        '# TYPE {}_run_seconds gauge'.format(METRIC_PREFIX),
+        '{}_run_seconds {}'.format(METRIC_PREFIX, record['seconds']),
+        '# HELP {}_last_run_timestamp_seconds Time the last run finished'
+        .format(METRIC_PREFIX),
+        '# TYPE {}_last_run_timestamp_seconds gauge'.format(METRIC_PREFIX),
+        '{}_last_run_timestamp_seconds {:.3f}'.format(METRIC_PREFIX, timestamp)
+        ]
+
+    for metric, field, help_text in (
+            ('stage_seconds', 'seconds', 'Time spent in each stage'),
+            ('stage_calls', 'calls', 'Number of calls to each stage')
+            ):
+        lines.append('# HELP {}_{} {} in the last run'.format(
+            METRIC_PREFIX, metric, help_text
+            ))
+        lines.append('# TYPE {}_{} gauge'.format(METRIC_PREFIX, metric))
+        for name, stage in record['stages'].items():
+            lines.append('{}_{}{{stage="{}"}} {}'.format(
+                METRIC_PREFIX, metric, name, stage[field]
+                ))
+
+    return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path, record):
+    """
+    Write the metrics for a run to a file for the textfile collector,
+    replacing it in one step so that the collector never reads half a file
+    """
+    tmp_path = '{}.{}'.format(path, getpid())
+    try:
+        with open(tmp_path, 'w') as textfile:
+            textfile.write(format_prometheus(record))
+        replace(tmp_path, path)
+    except OSError as err:
+        LOG.error("Error writing metrics to %s: %s", path, err)
+
+
+def get_textfile_path(config):
+    """
+    Return the path of the metrics file from the optional [metrics] section of
+    the config, or None
+    """
+    if 'metrics' not in config:
+        return None
+    return config['metrics'].get('textfile')
+
+
+@contextmanager
+def record_run(enabled, config):
+    """
+    Record the spans of a run if enabled, then log the timing record and
+    write the metrics file if the config names one
+    """
+    global RECORDER
+
+    if not enabled:
+        yield None
+        return
+
+    recorder = RunRecorder()
+    RECORDER = recorder
+    try:
+        yield recorder
+    finally:
+        RECORDER = None
+        recorder.finish()
+
+        record = recorder.get_record()
+        LOG.info("Run timings: %s", json.dumps(record))
+
+        textfile_path = get_textfile_path(config)
+        if textfile_path:
+            write_textfile(textfile_path, record)
@@ -1,9 +1,10 @@
 """
 Play - class for storing information about plays
 """
-from locale import LC_TIME, setlocale
 from logging import basicConfig, getLogger
 
+from .french_date import format_date
+
 EXPAND_FORMAT = {
     'singular': {'a': 'acte', 'tabl': 'tableau'},
     'plural': {'a': 'actes', 'tabl': 'tableaux'}
@@ -17,9 +18,9 @@ SHORTER_TEMPLATE = '{title}, {author}{ce_jour_la} {date_string} {theater_code}.\
 GENRE_TEMPLATE = " {},"
 GENRE_ACT_FORMAT_TEMPLATE = " {} en {} {},"
 
+MAX_LENGTH = 280
+
 TIMEZONE = 'Europe/Paris'
-DATE_FORMAT = "%A le %d %B %Y"
-setlocale(LC_TIME, "fr_FR")
 
 basicConfig(level="DEBUG")
 LOG = getLogger(__name__)
@@ -97,6 +98,7 @@ class Play:
         self.theater_code = ''
         self.ce_jour_la = ''
         self.greg_date = None
+        self.description = None
 
     @classmethod
     def from_dict(cls, row):
@@ -123,6 +125,7 @@ class Play:
         Set the genre
         """
         self.expanded_genre = expanded_genre
+        self.description = None
 
     def set_today(self, today):
         """
@@ -132,6 +135,14 @@ class Play:
         self.ce_jour_la = ''
         if self.greg_date == today:
             self.ce_jour_la = ' #CeJourLà'
+        self.description = None
+
+    def set_description(self, description):
+        """
+        Use a description that has already been rendered, for example one
+        loaded from the message store
+        """
+        self.description = description
 
     def get_expanded_genre_phrase(self):
         """
@@ -185,19 +196,19 @@ class Play:
             'genre_phrase': self.get_expanded_genre_phrase(),
             'music_string': musique_de(self.music),
             'ce_jour_la': self.ce_jour_la,
-            'date_string': self.greg_date.strftime(DATE_FORMAT),
+            'date_string': format_date(self.greg_date),
             'theater_string': self.get_theater_string(),
             'wicks': self.wicks
             }
         return play_dict
 
-    def __repr__(self):
+    def render(self):
         """
         Generate description for tweet
         """
         play_dict = self.get_dict()
         description = BASIC_TEMPLATE.format(**play_dict)
-        if len(description) > 280:
+        if len(description) > MAX_LENGTH:
             LOG.warning(
                 "Description for play %s is too long (%s characters)",
                 self.play_id,
@@ -206,7 +217,7 @@ class Play:
             play_dict['genre_phrase'] = self.get_genre_phrase()
             description = BASIC_TEMPLATE.format(**play_dict)
 
-            if len(description) > 280:
+            if len(description) > MAX_LENGTH:
                 LOG.warning(
                     "Description for play %s is STILL too long (%s chars)",
                     self.play_id,
@@ -217,3 +228,13 @@ class Play:
                 description = SHORTER_TEMPLATE.format(**play_dict)
 
         return description
+
+    def __repr__(self):
+        """
+        Return the description for the tweet, rendering it only once until the
+        genre or the date changes
+        """
+        if self.description is None:
+            self.description = self.render()
+
+        return self.description
@@ -0,0 +1,165 @@
+"""
+Search the Google Books API ahead of time for the plays of the coming days,
+so that the bot never has to wait for Google when it tweets
+
+python -m spectacles_xix.prefetch -c /path/to/config/file.ini -n 7
+"""
+from argparse import ArgumentParser
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from configparser import ConfigParser
+from datetime import timedelta
+from logging import basicConfig, getLogger
+from threading import Lock
+from time import monotonic, sleep
+
+from .check_books import check_books_api, get_search_term
+from .db_ops import db_cursor
+from .find_play import (
+    check_by_date, get_book_cache, get_config_image_store, get_local_now,
+    is_enabled
+    )
+from .play import Play
+from .transport import configure
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_DAYS = 7
+DEFAULT_WORKERS = 4
+DEFAULT_RATE = 2.0
+
+
+class RateLimiter:
+    """
+    Allow at most `rate` calls per second, shared between threads
+    """
+
+    def __init__(self, rate):
+        """
+        Initialize RateLimiter class
+        """
+        self.interval = 1.0 / rate
+        self.next_time = monotonic()
+        self.lock = Lock()
+
+    def wait(self):
+        """
+        Sleep until the next call is allowed
+        """
+        with self.lock:
+            now = monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+
+        if wait_time > 0:
+            sleep(wait_time)
+
+
+def get_upcoming_plays(config, local_now, days):
+    """
+    Return the untweeted plays for each of the next `days` days (200 years
+    ago), including the first-of-the-month fallback
+    """
+    play_list = []
+    seen = set()
+
+    for day in range(days):
+        for play_dict in check_by_date(
+                config, local_now + timedelta(days=day), None, False
+                ):
+            if play_dict['id'] not in seen:
+                seen.add(play_dict['id'])
+                play_list.append(play_dict)
+
+    return play_list
+
+
+def prefetch_play(config, limiter, play_dict):
+    """
+    Search the Books API for a play unless the result is already cached, and
+    download its title page image.  Return what was done, for the summary
+    """
+    play = Play.from_dict(play_dict)
+
+    with db_cursor(config['db']) as cursor:
+        cache = get_book_cache(cursor, config)
+        if cache.get(get_search_term(play)) is not None:
+            return 'cached'
+
+        limiter.wait()
+        book_result = check_books_api(
+            True, config['path']['google_service_account'], play, cache
+            )
+
+    if not book_result.book_url:
+        return 'not found'
+
+    book_result.get_image_file(get_config_image_store(config))
+    return 'found'
+
+
+def try_prefetch_play(config, limiter, play_dict):
+    """
+    Prefetch a play, logging any error instead of raising it, so that one
+    play cannot stop the others from being prefetched
+    """
+    try:
+        return prefetch_play(config, limiter, play_dict)
+    except Exception as err:  # pylint: disable=broad-except
+        LOG.error("Error prefetching play %s: %s", play_dict.get('id'), err)
+        return 'error'
+
+
+def prefetch(config, days=DEFAULT_DAYS, workers=DEFAULT_WORKERS,
+             rate=DEFAULT_RATE):
+    """
+    Search the Books API for the plays of the next `days` days with a bounded
+    pool of threads, and return a count of the outcomes
+    """
+    play_list = get_upcoming_plays(config['db'], get_local_now(), days)
+    LOG.info("Prefetching books for %s plays", len(play_list))
+
+    limiter = RateLimiter(rate)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        outcomes = Counter(executor.map(
+            lambda play_dict: try_prefetch_play(config, limiter, play_dict),
+            play_list
+            ))
+
+    LOG.info("Prefetch results: %s", dict(outcomes))
+    return outcomes
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(
+        description='Search Google Books for the plays of the coming days'
+        )
+    parser.add_argument('-c', '--config_file', type=str, required=True)
+    parser.add_argument('-n', '--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS)
+    parser.add_argument('-r', '--rate', type=float, default=DEFAULT_RATE)
+    return parser.parse_args()
+
+
+def main():
+    """
+    Parse arguments, load config and prefetch
+    """
+    args = parse_command_args()
+    config = ConfigParser()
+    config.read(args.config_file)
+
+    if 'books' not in config or not is_enabled(config['books'], 'cache'):
+        LOG.error("Prefetching needs the book cache ([books] cache: yes)")
+        return
+
+    configure(config)
+    prefetch(config, args.days, args.workers, args.rate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""
+Render the messages for every play in the corpus ahead of time and save them
+to the message store, so that the bot only has to read a finished message
+
+python -m spectacles_xix.prerender -c /path/to/config/file.ini
+"""
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from configparser import ConfigParser
+from logging import basicConfig, getLogger
+from os import cpu_count
+
+from .abbreviations import expand_with_table
+from .db_api import SSDictCursor
+from .db_ops import (
+    abbreviations_db, db_cursor, save_messages_db, stream_plays_db
+    )
+from .play import MAX_LENGTH, Play
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def render_variants(table, play_dict):
+    """
+    Given an abbreviation table and a dict of play info, return a list of
+    (play ID, ce_jour_la, message) tuples for the messages with and without
+    #CeJourLà
+    """
+    play = Play.from_dict(play_dict)
+    play.set_expanded_genre(expand_with_table(table, play_dict['genre']))
+
+    messages = []
+    for today in (None, play.greg_date):
+        play.set_today(today)
+        messages.append((play.play_id, bool(play.ce_jour_la), str(play)))
+
+    return messages
+
+
+def render_batch(table, rows):
+    """
+    Render every variant of the message for a batch of rows.  The abbreviation
+    table travels with each batch: ProcessPoolExecutor has no initializer on
+    Python 3.6
+    """
+    messages = []
+    for row in rows:
+        messages.extend(render_variants(table, row))
+    return messages
+
+
+class PrerenderStats:
+    """
+    Keep count of the messages rendered and of those that are too long
+    """
+
+    def __init__(self):
+        """
+        Initialize the counts
+        """
+        self.message_count = 0
+        self.too_long = []
+
+    def add(self, messages):
+        """
+        Count a batch of rendered messages
+        """
+        self.message_count += len(messages)
+        self.too_long.extend(
+            (play_id, len(message)) for (play_id, _, message) in messages
+            if len(message) > MAX_LENGTH
+            )
+
+    def report(self):
+        """
+        Log the counts
+        """
+        LOG.info("Rendered %s messages", self.message_count)
+        for play_id, length in self.too_long:
+            LOG.warning(
+                "Message for play %s is %s characters long", play_id, length
+                )
+
+
+def save_batch(config, stats, messages):
+    """
+    Save a batch of messages in its own transaction and count them
+    """
+    with db_cursor(config) as cursor:
+        save_messages_db(cursor, messages)
+    stats.add(messages)
+
+
+def prerender(config, workers=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Stream every play from the database, render the messages in a pool of
+    worker processes and save them in batches
+    """
+    with db_cursor(config) as cursor:
+        table = abbreviations_db(cursor) or {}
+
+    stats = PrerenderStats()
+    workers = workers or cpu_count() or 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded number of batches in flight, so that memory does not
+        # grow with the size of the corpus
+        max_pending = 2 * workers
+        pending = deque()
+
+        with db_cursor(config, cursorclass=SSDictCursor) as stream_cursor:
+            for rows in stream_plays_db(stream_cursor, batch_size):
+                pending.append(executor.submit(render_batch, table, rows))
+                if len(pending) >= max_pending:
+                    save_batch(config, stats, pending.popleft().result())
+
+        while pending:
+            save_batch(config, stats, pending.popleft().result())
+
+    stats.report()
+    return stats
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(
+        description='Render the messages for every play in the corpus'
+        )
+    parser.add_argument('-c', '--config_file', type=str, required=True)
+    parser.add_argument('-j', '--workers', type=int)
+    parser.add_argument(
+        '-s', '--batch_size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+    return parser.parse_args()
+
+
+def main():
+    """
+    Parse arguments, load config, render and save every message
+    """
+    args = parse_command_args()
+    config = ConfigParser()
+    config.read(args.config_file)
+
+    prerender(config['db'], args.workers, args.batch_size)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,572 @@
+"""
+Post the message for a play, with its title page image, to every configured
+account (Twitter, Mastodon and Bluesky) at the same time, and mark the play as
+tweeted if the posts satisfy the success policy in the [publish] section of
+the config.  Each post is recorded, so a play that is posted again after a
+partial failure is only posted to the accounts that do not have it yet
+"""
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from logging import basicConfig, getLogger
+import re
+from threading import Lock
+from time import monotonic, sleep
+
+from .db_ops import posts_db, save_posts_db, tweet_db
+from .metrics import span
+from .transport import get_session
+from .tweet import get_json, get_oauth, update_status, upload_image
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_POLICY = 'any'
+
+ALT_TEXT = 'Page de titre'
+LANGUAGE = 'fr'
+
+DEFAULT_VISIBILITY = 'public'
+MEDIA_POLL_ATTEMPTS = 5
+MEDIA_POLL_SECONDS = 0.5
+
+BLUESKY_SERVICE = 'https://bsky.social/'
+# Bluesky access tokens last about two hours; log in again well before that
+BLUESKY_LOGIN_SECONDS = 3600
+BLUESKY_LOGINS = {}
+BLUESKY_LOGINS_LOCK = Lock()
+
+LINK_PATTERN = re.compile(r'https?://\S+')
+LINK_DISPLAY_LENGTH = 30
+
+IMAGE_TYPES = (
+    (b'\x89PNG', 'image/png'),
+    (b'GIF8', 'image/gif'),
+    (b'\xff\xd8', 'image/jpeg')
+    )
+
+
+def get_image_type(title_image):
+    """
+    Return the MIME type of an image from its first bytes
+    """
+    for magic, image_type in IMAGE_TYPES:
+        if title_image.startswith(magic):
+            return image_type
+    return 'application/octet-stream'
+
+
+class Publisher(ABC):
+    """
+    Post messages to one account.  Subclasses upload the image and post the
+    message, and return None if either fails
+    """
+    name = None
+
+    @abstractmethod
+    def upload(self, title_image):
+        """
+        Upload the image and return its media ID
+        """
+
+    @abstractmethod
+    def post(self, message, media_id=None):
+        """
+        Post the message, with the uploaded image if there is one, and return
+        the ID of the post
+        """
+
+    def safe_upload(self, title_image):
+        """
+        Upload the image, logging a connection error instead of raising it
+        """
+        try:
+            return self.upload(title_image)
+        except OSError as err:
+            LOG.error("Error uploading image to %s: %s", self.name, err)
+            return None
+
+    def safe_post(self, message, media_id=None):
+        """
+        Post the message, logging a connection error instead of raising it
+        """
+        try:
+            post_id = self.post(message, media_id)
+        except OSError as err:
+            LOG.error("Error posting to %s: %s", self.name, err)
+            return None
+
+        if post_id:
+            LOG.info("Posted to %s: %s", self.name, post_id)
+        return post_id
+
+    def publish(self, message, title_image):
+        """
+        Upload the image if there is one, then post the message, without the
+        image if the upload failed
+        """
+        media_id = None
+        if title_image:
+            media_id = self.safe_upload(title_image)
+        return self.safe_post(message, media_id)
+
+
+class TwitterPublisher(Publisher):
+    """
+    Post tweets through the Twitter API
+    """
+    name = 'twitter'
+
+    def __init__(self, config):
+        """
+        Initialize the publisher with the [twitter] section of the config
+        """
+        self.oauth = get_oauth(config)
+
+    def upload(self, title_image):
+        """
+        Upload the image to the Twitter upload service
+        """
+        return upload_image(self.oauth, title_image)
+
+    def post(self, message, media_id=None):
+        """
+        Post the tweet
+        """
+        status = update_status(self.oauth, message, media_id)
+        if 'id' not in status:
+            LOG.error(status)
+            return None
+        return status['id']
+
+
+class MastodonPublisher(Publisher):
+    """
+    Post statuses to a Mastodon account
+    """
+    name = 'mastodon'
+
+    def __init__(self, config):
+        """
+        Initialize the publisher with the [mastodon] section of the config
+        """
+        self.base_url = config['base_url'].rstrip('/') + '/'
+        self.headers = {'Authorization': 'Bearer ' + config['access_token']}
+        self.visibility = config.get('visibility', DEFAULT_VISIBILITY)
+
+    def wait_for_media(self, media_id):
+        """
+        Wait for the server to finish processing an upload, and return whether
+        it did
+        """
+        url = self.base_url + 'api/v1/media/' + media_id
+        for _ in range(MEDIA_POLL_ATTEMPTS):
+            sleep(MEDIA_POLL_SECONDS)
+            response = get_session(url).get(url, headers=self.headers)
+            if response.status_code == 200:
+                return True
+        return False
+
+    def upload(self, title_image):
+        """
+        Upload the image with its description
+        """
+        url = self.base_url + 'api/v2/media'
+        with span('mastodon_upload'):
+            response = get_session(url).post(
+                url,
+                headers=self.headers,
+                data={'description': ALT_TEXT},
+                files={'file': (
+                    'title', title_image, get_image_type(title_image)
+                    )}
+                )
+
+        media = get_json(response)
+        if not response.ok or 'id' not in media:
+            LOG.error("Error uploading image to Mastodon: %s", media)
+            return None
+
+        # A 202 means that the image is still being processed, and a status
+        # that refers to it would be refused
+        if response.status_code == 202 and not self.wait_for_media(
+                media['id']
+                ):
+            LOG.error("Mastodon is still processing image %s", media['id'])
+            return None
+
+        return media['id']
+
+    def post(self, message, media_id=None):
+        """
+        Post the status
+        """
+        data = {
+            'status': message,
+            'visibility': self.visibility,
+            'language': LANGUAGE
+            }
+        if media_id:
+            data['media_ids[]'] = media_id
+
+        url = self.base_url + 'api/v1/statuses'
+        with span('mastodon_status'):
+            response = get_session(url).post(
+                url, headers=self.headers, data=data
+                )
+
+        status = get_json(response)
+        if not response.ok or 'id' not in status:
+            LOG.error("Error posting to Mastodon: %s", status)
+            return None
+        return status['id']
+
+
+def shorten_link(url):
+    """
+    Return the text to show for a link: the URL without its scheme, cut short
+    if it is long
+    """
+    display = url.split('://', 1)[-1]
+    if len(display) > LINK_DISPLAY_LENGTH:
+        display = display[:LINK_DISPLAY_LENGTH - 1] + '…'
+    return display
+
+
+def get_link_text(message):
+    """
+    Return the text of a Bluesky post, with the URLs in the message shortened
+    to fit in its length limit, and the facets that link the shortened text to
+    the full URLs.  Facets are located by UTF-8 byte offsets
+    """
+    parts = []
+    facets = []
+    position = 0
+
+    for match in LINK_PATTERN.finditer(message):
+        parts.append(message[position:match.start()])
+        display = shorten_link(match.group())
+        start = len(''.join(parts).encode('utf-8'))
+        parts.append(display)
+        facets.append({
+            'index': {
+                'byteStart': start,
+                'byteEnd': start + len(display.encode('utf-8'))
+                },
+            'features': [{
+                '$type': 'app.bsky.richtext.facet#link',
+                'uri': match.group()
+                }]
+            })
+        position = match.end()
+
+    parts.append(message[position:])
+    return ''.join(parts), facets
+
+
+class BlueskyPublisher(Publisher):
+    """
+    Post to a Bluesky account through its PDS
+    """
+    name = 'bluesky'
+
+    def __init__(self, config):
+        """
+        Initialize the publisher with the [bluesky] section of the config
+        """
+        self.service = config.get('service', BLUESKY_SERVICE)
+        self.service = self.service.rstrip('/') + '/'
+        self.handle = config['handle']
+        self.app_password = config['app_password']
+
+    def call(self, method, **kwargs):
+        """
+        Send a request to an XRPC procedure and return the response
+        """
+        url = self.service + 'xrpc/' + method
+        return get_session(url).post(url, **kwargs)
+
+    def login(self):
+        """
+        Return the DID and access token for the account, logging in again if
+        the last login is too old.  Logins are shared by the whole process
+        """
+        key = (self.service, self.handle)
+        with BLUESKY_LOGINS_LOCK:
+            login = BLUESKY_LOGINS.get(key)
+            if login and monotonic() - login[2] < BLUESKY_LOGIN_SECONDS:
+                return login[:2]
+
+            with span('bluesky_login'):
+                response = self.call(
+                    'com.atproto.server.createSession',
+                    json={
+                        'identifier': self.handle,
+                        'password': self.app_password
+                        }
+                    )
+
+            session = get_json(response)
+            if not response.ok or 'accessJwt' not in session:
+                LOG.error("Error logging in to Bluesky: %s", session)
+                return None, None
+
+            BLUESKY_LOGINS[key] = (
+                session['did'], session['accessJwt'], monotonic()
+                )
+            return session['did'], session['accessJwt']
+
+    def get_headers(self):
+        """
+        Return the authorization header, or None if the login failed
+        """
+        access_token = self.login()[1]
+        if not access_token:
+            return None
+        return {'Authorization': 'Bearer ' + access_token}
+
+    def upload(self, title_image):
+        """
+        Upload the image as a blob, and return the blob to embed in the post
+        """
+        headers = self.get_headers()
+        if not headers:
+            return None
+
+        headers['Content-Type'] = get_image_type(title_image)
+        with span('bluesky_upload'):
+            response = self.call(
+                'com.atproto.repo.uploadBlob',
+                headers=headers,
+                data=title_image
+                )
+
+        blob = get_json(response)
+        if not response.ok or 'blob' not in blob:
+            LOG.error("Error uploading image to Bluesky: %s", blob)
+            return None
+        return blob['blob']
+
+    def post(self, message, media_id=None):
+        """
+        Create the post record, with its links and image
+        """
+        did, access_token = self.login()
+        if not access_token:
+            return None
+
+        text, facets = get_link_text(message)
+        record = {
+            '$type': 'app.bsky.feed.post',
+            'text': text,
+            'createdAt': datetime.now(timezone.utc).strftime(
+                '%Y-%m-%dT%H:%M:%S.%fZ'
+                ),
+            'langs': [LANGUAGE]
+            }
+        if facets:
+            record['facets'] = facets
+        if media_id:
+            record['embed'] = {
+                '$type': 'app.bsky.embed.images',
+                'images': [{'alt': ALT_TEXT, 'image': media_id}]
+                }
+
+        with span('bluesky_post'):
+            response = self.call(
+                'com.atproto.repo.createRecord',
+                headers={'Authorization': 'Bearer ' + access_token},
+                json={
+                    'repo': did,
+                    'collection': 'app.bsky.feed.post',
+                    'record': record
+                    }
+                )
+
+        created = get_json(response)
+        if not response.ok or 'uri' not in created:
+            LOG.error("Error posting to Bluesky: %s", created)
+            return None
+        return created['uri']
+
+
+PUBLISHERS = (
+    ('twitter', TwitterPublisher),
+    ('mastodon', MastodonPublisher),
+    ('bluesky', BlueskyPublisher)
+    )
+
+
+def get_publishers(config):
+    """
+    Return a publisher for each account section in the config
+    """
+    return [
+        publisher_class(config[section])
+        for (section, publisher_class) in PUBLISHERS
+        if section in config
+        ]
+
+
+def get_pending_publishers(cursor, config, play_id):
+    """
+    Return the publishers for the accounts that the play has not been posted
+    to yet, and a dict of the IDs of the posts already made, by account
+    """
+    posted = posts_db(cursor, play_id)
+    publishers = [
+        publisher for publisher in get_publishers(config)
+        if publisher.name not in posted
+        ]
+    return publishers, posted
+
+
+def get_required(policy):
+    """
+    Return the set of account names in a comma-separated policy
+    """
+    return {name.strip() for name in policy.split(',') if name.strip()}
+
+
+def get_policy(config):
+    """
+    Return the success policy from the optional [publish] section of the
+    config: 'any', 'all' or a comma-separated list of the accounts that must
+    be posted to.  A list that names no account, or an account that is not
+    configured, could never be satisfied and would leave the play to be
+    posted again on every run, so it is logged and 'any' is used instead
+    """
+    if 'publish' not in config:
+        return DEFAULT_POLICY
+
+    policy = config['publish'].get('require', DEFAULT_POLICY).strip().lower()
+    if policy in ('any', 'all'):
+        return policy
+
+    required = get_required(policy)
+    configured = {section for (section, _) in PUBLISHERS if section in config}
+    if not required or not required <= configured:
+        LOG.error(
+            "Policy '%s' requires accounts that are not configured: %s; "
+            "using '%s'",
+            policy,
+            ', '.join(sorted(required - configured)),
+            DEFAULT_POLICY
+            )
+        return DEFAULT_POLICY
+
+    return policy
+
+
+def is_published(policy, results):
+    """
+    Given a policy and a dict of the post ID (or None) for each account,
+    return whether the play counts as tweeted
+    """
+    succeeded = {name for (name, post_id) in results.items() if post_id}
+
+    if policy == 'any':
+        return bool(succeeded)
+    if policy == 'all':
+        return bool(results) and succeeded == set(results)
+
+    required = get_required(policy)
+    return bool(required) and required <= succeeded
+
+
+def get_result(name, future):
+    """
+    Return the result of a publisher's call, or None if it raised, so that
+    an unexpected error on one account cannot lose the results of the others
+    """
+    try:
+        return future.result()
+    except Exception as err:  # pylint: disable=broad-except
+        LOG.exception("Error in %s: %s", name, err)
+        return None
+
+
+def run_all(publishers, func):
+    """
+    Call a function with each publisher in its own thread, and return a dict
+    of the results by publisher name
+    """
+    if not publishers:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=len(publishers)) as executor:
+        futures = [
+            (publisher.name, executor.submit(func, publisher))
+            for publisher in publishers
+            ]
+        return {name: get_result(name, future) for (name, future) in futures}
+
+
+def upload_all(publishers, title_image):
+    """
+    Upload the image to every account at the same time, and return a dict of
+    the media IDs by publisher name
+    """
+    return run_all(
+        publishers, lambda publisher: publisher.safe_upload(title_image)
+        )
+
+
+def post_all(publishers, message, media_ids=None):
+    """
+    Post the message to every account at the same time, with the media
+    already uploaded to it if there is any, and return a dict of the post IDs
+    by publisher name
+    """
+    media_ids = media_ids or {}
+    return run_all(publishers, lambda publisher: publisher.safe_post(
+        message, media_ids.get(publisher.name)
+        ))
+
+
+def publish_all(publishers, message, title_image):
+    """
+    Upload the image to and post the message on every account at the same
+    time, and return a dict of the post IDs by publisher name
+    """
+    return run_all(
+        publishers, lambda publisher: publisher.publish(message, title_image)
+        )
+
+
+def mark_published(cursor, config, play_id, results, posted=None):
+    """
+    Save the new posts, and mark the play as tweeted if they and the posts
+    made on earlier runs satisfy the success policy
+    """
+    save_posts_db(cursor, play_id, results)
+    results = dict(posted or {}, **results)
+
+    policy = get_policy(config)
+    if is_published(policy, results):
+        tweet_db(cursor, play_id)
+        return True
+
+    LOG.error(
+        "Play %s not marked as tweeted: posts %s do not satisfy policy '%s'",
+        play_id,
+        results,
+        policy
+        )
+    return False
+
+
+def publish_play(cursor, config, play_id, message, title_image):
+    """
+    Post the message and image to every configured account that does not
+    have it yet, mark the play as tweeted according to the success policy,
+    and return the post IDs
+    """
+    publishers, posted = get_pending_publishers(cursor, config, play_id)
+    if not publishers and not posted:
+        LOG.error("No accounts configured to post play %s", play_id)
+        return {}
+
+    results = publish_all(publishers, message, title_image)
+    mark_published(cursor, config, play_id, results, posted)
+    return dict(posted, **results)
@@ -0,0 +1,159 @@
+"""
+Database schema for spectacles_xix: the MySQL tables and the versioned
+migrations applied by util/db_tables, and the equivalent SQLite schema at the
+latest version
+"""
+
+# create tables
+TABLE_SQL = {
+    'theater': """CREATE TABLE spectacle_theater (
+        theater_code varchar(10) NOT NULL,
+        theater_name varchar(40) NOT NULL,
+        notes text,
+        PRIMARY KEY (theater_code)
+    )""",
+    'abbrev': """CREATE TABLE spectacle_abbrev (
+        abbrev varchar(20) NOT NULL,
+        expansion varchar(100) NOT NULL,
+        notes text,
+        PRIMARY KEY (abbrev)
+    )""",
+    'play': """CREATE TABLE spectacle_play (
+        id int(10) NOT NULL,
+        wicks varchar(10) NOT NULL,
+        title varchar(100) NOT NULL,
+        author varchar(100),
+        genre varchar(40),
+        acts int(3) NOT NULL,
+        format varchar(10),
+        music varchar(100),
+        theater_code varchar(40),
+        rev_date varchar(20),
+        greg_date date NOT NULL,
+        notes text,
+        last_tweeted date,
+        PRIMARY KEY (id),
+        KEY greg_date (greg_date)
+    )""",
+    'plan': """CREATE TABLE spectacle_plan (
+        plan_slot datetime NOT NULL,
+        play_id int(10),
+        PRIMARY KEY (plan_slot)
+    )""",
+    'message': """CREATE TABLE spectacle_message (
+        play_id int(10) NOT NULL,
+        ce_jour_la tinyint(1) NOT NULL,
+        message text NOT NULL,
+        PRIMARY KEY (play_id, ce_jour_la)
+    )""",
+    'book': """CREATE TABLE spectacle_book (
+        query varchar(255) NOT NULL,
+        book_url varchar(255),
+        image_url varchar(255),
+        checked datetime NOT NULL,
+        PRIMARY KEY (query)
+    )""",
+    'post': """CREATE TABLE spectacle_post (
+        play_id int(10) NOT NULL,
+        account varchar(20) NOT NULL,
+        post_id varchar(255) NOT NULL,
+        posted datetime NOT NULL,
+        PRIMARY KEY (play_id, account)
+    )"""
+}
+
+VERSION_SQL = """CREATE TABLE IF NOT EXISTS spectacle_schema_version (
+        version int(10) NOT NULL,
+        description varchar(100) NOT NULL,
+        applied datetime NOT NULL,
+        PRIMARY KEY (version)
+    )"""
+
+# Each migration is a version number, a description and a list of statements
+MIGRATIONS = [
+    (1, 'Create base tables', [
+        TABLE_SQL['theater'], TABLE_SQL['abbrev'], TABLE_SQL['play']
+        ]),
+    (2, 'Create tweet plan table', [TABLE_SQL['plan']]),
+    (3, 'Create message store table', [TABLE_SQL['message']]),
+    (4, 'Create book cache table', [TABLE_SQL['book']]),
+    (5, 'Add row hashes for incremental imports', [
+        "ALTER TABLE spectacle_theater ADD COLUMN row_hash char(64)",
+        "ALTER TABLE spectacle_abbrev ADD COLUMN row_hash char(64)",
+        "ALTER TABLE spectacle_play ADD COLUMN row_hash char(64)"
+        ]),
+    (6, 'Index plays by date and tweet status, and by Wicks ID', [
+        """ALTER TABLE spectacle_play
+        ADD KEY greg_date_tweeted (greg_date, last_tweeted)""",
+        "ALTER TABLE spectacle_play DROP KEY greg_date",
+        "ALTER TABLE spectacle_play ADD KEY wicks (wicks)"
+        ]),
+    (7, 'Create post table', [TABLE_SQL['post']])
+    ]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# The SQLite schema is created in one step at the latest version, so it has
+# the columns and indexes that the MySQL migrations add.  Every statement can
+# be run again, which adds the new tables to a database at an older version
+SQLITE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS spectacle_theater (
+        theater_code varchar(10) NOT NULL,
+        theater_name varchar(40) NOT NULL,
+        notes text,
+        row_hash char(64),
+        PRIMARY KEY (theater_code)
+    )""",
+    """CREATE TABLE IF NOT EXISTS spectacle_abbrev (
+        abbrev varchar(20) NOT NULL,
+        expansion varchar(100) NOT NULL,
+        notes text,
+        row_hash char(64),
+        PRIMARY KEY (abbrev)
+    )""",
+    """CREATE TABLE IF NOT EXISTS spectacle_play (
+        id int(10) NOT NULL,
+        wicks varchar(10) NOT NULL,
+        title varchar(100) NOT NULL,
+        author varchar(100),
+        genre varchar(40),
+        acts int(3) NOT NULL,
+        format varchar(10),
+        music varchar(100),
+        theater_code varchar(40),
+        rev_date varchar(20),
+        greg_date date NOT NULL,
+        notes text,
+        last_tweeted date,
+        row_hash char(64),
+        PRIMARY KEY (id)
+    )""",
+    """CREATE INDEX IF NOT EXISTS greg_date_tweeted
+        ON spectacle_play (greg_date, last_tweeted)""",
+    "CREATE INDEX IF NOT EXISTS wicks ON spectacle_play (wicks)",
+    """CREATE TABLE IF NOT EXISTS spectacle_plan (
+        plan_slot datetime NOT NULL,
+        play_id int(10),
+        PRIMARY KEY (plan_slot)
+    )""",
+    """CREATE TABLE IF NOT EXISTS spectacle_message (
+        play_id int(10) NOT NULL,
+        ce_jour_la tinyint(1) NOT NULL,
+        message text NOT NULL,
+        PRIMARY KEY (play_id, ce_jour_la)
+    )""",
+    """CREATE TABLE IF NOT EXISTS spectacle_book (
+        query varchar(255) NOT NULL,
+        book_url varchar(255),
+        image_url varchar(255),
+        checked datetime NOT NULL,
+        PRIMARY KEY (query)
+    )""",
+    """CREATE TABLE IF NOT EXISTS spectacle_post (
+        play_id int(10) NOT NULL,
+        account varchar(20) NOT NULL,
+        post_id varchar(255) NOT NULL,
+        posted datetime NOT NULL,
+        PRIMARY KEY (play_id, account)
+    )"""
+    ]
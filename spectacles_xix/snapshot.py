@@ -0,0 +1,345 @@
+"""
+Read-only snapshot of the play corpus: the plays, joined with their theaters,
+in a file that is memory-mapped and binary-searched by date or by Wicks ID.
+Only the tweet status is still read from the database
+
+python -m spectacles_xix.snapshot -c /path/to/config/file.ini [-o SNAPSHOT]
+
+The file is laid out as a header, a date index, a Wicks index and the records:
+
+    header      magic, number of plays
+    date index  (date ordinal, record offset, record length) for each play,
+                sorted by date and ID
+    wicks index (Wicks ID, position in the date index) for each play, sorted
+                by Wicks ID
+    records     the UTF-8 JSON of each play, in the order of the date index
+"""
+from argparse import ArgumentParser
+from configparser import ConfigParser
+from datetime import datetime
+import json
+from logging import basicConfig, getLogger
+from mmap import ACCESS_READ, mmap
+from os import replace, stat
+from struct import Struct, error as StructError
+from threading import Lock
+
+from .db_api import SSDictCursor
+from .db_ops import db_cursor, stream_plays_db, tweeted_ids_db
+from .metrics import span
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+MAGIC = b'SPXIXS01'
+WICKS_WIDTH = 16
+
+HEADER = Struct('<8sI')
+DATE_ENTRY = Struct('<III')
+WICKS_ENTRY = Struct('<{}sI'.format(WICKS_WIDTH))
+
+EXPORT_BATCH_SIZE = 1000
+
+SNAPSHOTS = {}
+SNAPSHOTS_LOCK = Lock()
+
+
+def get_wicks_key(wicks):
+    """
+    Encode a Wicks ID as a fixed-width index key
+    """
+    key = str(wicks).encode('utf-8')
+    if len(key) > WICKS_WIDTH:
+        raise ValueError("Wicks ID too long for a snapshot: {}".format(wicks))
+    return key.ljust(WICKS_WIDTH, b'\0')
+
+
+def encode_record(row):
+    """
+    Encode a row of PLAY_SELECT as UTF-8 JSON
+    """
+    return json.dumps(
+        dict(row, greg_date=row['greg_date'].isoformat()), ensure_ascii=False
+        ).encode('utf-8')
+
+
+def decode_record(record):
+    """
+    Decode a record into a dict of play info like the one from PLAY_SELECT
+    """
+    play_dict = json.loads(record.decode('utf-8'))
+    play_dict['greg_date'] = datetime.strptime(
+        play_dict['greg_date'], '%Y-%m-%d'
+        ).date()
+    return play_dict
+
+
+def write_snapshot(path, rows):
+    """
+    Write the rows of PLAY_SELECT to a snapshot file, replacing any existing
+    snapshot in one step so that readers see either the old or the new one.
+    Return the number of plays written
+    """
+    plays = sorted(
+        (row['greg_date'].toordinal(), row['id'], get_wicks_key(row['wicks']),
+         encode_record(row))
+        for row in rows
+        )
+    wicks_index = sorted(
+        (wicks_key, position)
+        for position, (_, _, wicks_key, _) in enumerate(plays)
+        )
+
+    tmp_path = str(path) + '.tmp'
+    with open(tmp_path, 'wb') as snapshot_file:
+        snapshot_file.write(HEADER.pack(MAGIC, len(plays)))
+
+        offset = 0
+        for ordinal, _, _, record in plays:
+            snapshot_file.write(DATE_ENTRY.pack(ordinal, offset, len(record)))
+            offset += len(record)
+
+        for wicks_key, position in wicks_index:
+            snapshot_file.write(WICKS_ENTRY.pack(wicks_key, position))
+
+        for _, _, _, record in plays:
+            snapshot_file.write(record)
+
+    replace(tmp_path, path)
+    return len(plays)
+
+
+def lower_bound(count, key_at, key):
+    """
+    Return the first position from 0 to count whose key is not less than the
+    given key, using a function that returns the key at a position
+    """
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        if key_at(middle) < key:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class Snapshot:
+    """
+    Memory-mapped snapshot of the play corpus
+    """
+
+    def __init__(self, path):
+        """
+        Map the snapshot file and check its header
+        """
+        with open(path, 'rb') as snapshot_file:
+            self.data = mmap(snapshot_file.fileno(), 0, access=ACCESS_READ)
+
+        magic, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.data.close()
+            raise ValueError("Not a play snapshot: {}".format(path))
+
+        self.date_start = HEADER.size
+        self.wicks_start = self.date_start + self.count * DATE_ENTRY.size
+        self.records_start = self.wicks_start + self.count * WICKS_ENTRY.size
+
+    def date_entry(self, position):
+        """
+        Return the (date ordinal, offset, length) entry at a position in the
+        date index
+        """
+        return DATE_ENTRY.unpack_from(
+            self.data, self.date_start + position * DATE_ENTRY.size
+            )
+
+    def wicks_entry(self, position):
+        """
+        Return the (Wicks key, date index position) entry at a position in the
+        Wicks index
+        """
+        return WICKS_ENTRY.unpack_from(
+            self.data, self.wicks_start + position * WICKS_ENTRY.size
+            )
+
+    def record(self, position):
+        """
+        Decode the play at a position in the date index
+        """
+        _, offset, length = self.date_entry(position)
+        start = self.records_start + offset
+        return decode_record(self.data[start:start + length])
+
+    def plays_by_date(self, greg_date):
+        """
+        Return the plays on a Gregorian date, in order of ID
+        """
+        ordinal = greg_date.toordinal()
+        position = lower_bound(
+            self.count, lambda pos: self.date_entry(pos)[0], ordinal
+            )
+
+        play_list = []
+        while position < self.count:
+            if self.date_entry(position)[0] != ordinal:
+                break
+            play_list.append(self.record(position))
+            position += 1
+        return play_list
+
+    def plays_by_wicks(self, wicks):
+        """
+        Return the plays with a Wicks ID
+        """
+        key = get_wicks_key(wicks)
+        position = lower_bound(
+            self.count, lambda pos: self.wicks_entry(pos)[0], key
+            )
+
+        play_list = []
+        while position < self.count:
+            wicks_key, date_position = self.wicks_entry(position)
+            if wicks_key != key:
+                break
+            play_list.append(self.record(date_position))
+            position += 1
+        return play_list
+
+    def close(self):
+        """
+        Unmap the file
+        """
+        self.data.close()
+
+
+def get_snapshot(config):
+    """
+    Return the snapshot named in the [db] section of the config, mapping it
+    again if the file has been replaced, or None if there is no usable one
+    """
+    path = config.get('snapshot')
+    if not path:
+        return None
+
+    try:
+        mtime = stat(path).st_mtime_ns
+        with SNAPSHOTS_LOCK:
+            cached = SNAPSHOTS.get(path)
+            if cached and cached[0] == mtime:
+                return cached[1]
+
+            snapshot = Snapshot(path)
+            SNAPSHOTS[path] = (mtime, snapshot)
+    except (OSError, ValueError, StructError) as err:
+        LOG.error("Cannot use snapshot %s: %s", path, err)
+        return None
+
+    LOG.debug("Mapped snapshot %s with %s plays", path, snapshot.count)
+    return snapshot
+
+
+def filter_tweeted(config, play_list, tweeted=False):
+    """
+    Leave out the plays that have been tweeted, unless tweeted plays are
+    wanted, with one database query for the whole list
+    """
+    if tweeted or not play_list:
+        return play_list
+
+    with db_cursor(config) as cursor:
+        tweeted_ids = tweeted_ids_db(
+            cursor, [play_dict['id'] for play_dict in play_list]
+            )
+
+    if tweeted_ids is None:
+        return []
+
+    return [
+        play_dict for play_dict in play_list
+        if play_dict['id'] not in tweeted_ids
+        ]
+
+
+def snapshot_by_wicks_id(config, snapshot, wicks, tweeted=False):
+    """
+    Search the snapshot for a play based on the Wicks ID.  An ID too long for
+    the index cannot be in the snapshot, or in the database it was exported
+    from
+    """
+    with span('snapshot_lookup'):
+        try:
+            play_list = snapshot.plays_by_wicks(wicks)
+        except ValueError as err:
+            LOG.warning(err)
+            return []
+    return filter_tweeted(config, play_list, tweeted)
+
+
+def snapshot_by_date_with_fallback(config, snapshot, greg_date, tweeted=False):
+    """
+    Search the snapshot for the plays on a Gregorian date and one play from
+    the first of the month, like query_by_date_with_fallback
+    """
+    with span('snapshot_lookup'):
+        play_list = snapshot.plays_by_date(greg_date)
+        first_date = greg_date.replace(day=1)
+        if first_date != greg_date:
+            play_list += snapshot.plays_by_date(first_date)
+
+    play_list = filter_tweeted(config, play_list, tweeted)
+
+    today_list = [
+        play_dict for play_dict in play_list
+        if play_dict['greg_date'] == greg_date
+        ]
+    first_list = [
+        play_dict for play_dict in play_list
+        if play_dict['greg_date'] != greg_date
+        ]
+    return today_list + first_list[:1]
+
+
+def export_snapshot(config, path):
+    """
+    Stream every play from the database and write the snapshot
+    """
+    rows = []
+    with db_cursor(config, cursorclass=SSDictCursor) as cursor:
+        for batch in stream_plays_db(cursor, EXPORT_BATCH_SIZE):
+            rows.extend(batch)
+
+    play_count = write_snapshot(path, rows)
+    LOG.info("Wrote %s plays to %s", play_count, path)
+    return play_count
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(
+        description='Export the play corpus to a snapshot file'
+        )
+    parser.add_argument('-c', '--config_file', type=str, required=True)
+    parser.add_argument('-o', '--output', type=str)
+    return parser, parser.parse_args()
+
+
+def main():
+    """
+    Parse arguments, load config, export the snapshot
+    """
+    parser, args = parse_command_args()
+    config = ConfigParser()
+    config.read(args.config_file)
+
+    path = args.output or config['db'].get('snapshot')
+    if not path:
+        parser.error('no snapshot path in the config or on the command line')
+
+    export_snapshot(config['db'], path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,202 @@
+"""
+Embedded SQLite backend for spectacles_xix, with connection and cursor
+wrappers that accept the same queries as MySQLdb and the backend-neutral
+cursor classes
+"""
+from datetime import datetime
+from logging import basicConfig, getLogger
+import sqlite3
+
+from .db_api import DictCursor, SSDictCursor
+from .schema import SCHEMA_VERSION, SQLITE_SCHEMA
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_CACHED_STATEMENTS = 256
+DICT_CURSORS = (DictCursor, SSDictCursor)
+
+DATE_FORMAT = '%Y-%m-%d'
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def convert_date(value):
+    """
+    Convert a date stored by the sqlite3 adapter back to a date object
+    """
+    return datetime.strptime(value.decode(), DATE_FORMAT).date()
+
+
+def convert_datetime(value):
+    """
+    Convert a datetime stored by the sqlite3 adapter, which adds microseconds
+    only if there are any, back to a datetime object
+    """
+    text = value.decode()
+    if '.' in text:
+        return datetime.strptime(text, DATETIME_FORMAT + '.%f')
+    return datetime.strptime(text, DATETIME_FORMAT)
+
+
+# Convert the columns declared as date or datetime back to Python objects
+sqlite3.register_converter('date', convert_date)
+sqlite3.register_converter('datetime', convert_datetime)
+
+
+class SQLiteCursor:
+    """
+    Cursor that takes MySQLdb-style %s placeholders, and returns rows as dicts
+    if it was opened with a dict cursor class
+    """
+
+    def __init__(self, cursor, dict_rows=False):
+        """
+        Initialize the cursor wrapper
+        """
+        self.cursor = cursor
+        self.dict_rows = dict_rows
+        self.queries = {}
+
+    def translate(self, query):
+        """
+        Return the query with SQLite placeholders, translating each query once
+        """
+        if query not in self.queries:
+            self.queries[query] = query.replace('%s', '?')
+        return self.queries[query]
+
+    def execute(self, query, args=()):
+        """
+        Execute a query
+        """
+        self.cursor.execute(self.translate(query), args or ())
+
+    def executemany(self, query, args):
+        """
+        Execute a query for each set of arguments
+        """
+        self.cursor.executemany(self.translate(query), args)
+
+    def make_row(self, row):
+        """
+        Return a row as a dict keyed by column name, or as a tuple
+        """
+        if row is None or not self.dict_rows:
+            return row
+        return {
+            column[0]: value
+            for (column, value) in zip(self.cursor.description, row)
+            }
+
+    def fetchone(self):
+        """
+        Return the next row, or None
+        """
+        return self.make_row(self.cursor.fetchone())
+
+    def fetchmany(self, size):
+        """
+        Return up to `size` rows
+        """
+        return [self.make_row(row) for row in self.cursor.fetchmany(size)]
+
+    def fetchall(self):
+        """
+        Return the remaining rows
+        """
+        return [self.make_row(row) for row in self.cursor.fetchall()]
+
+    def close(self):
+        """
+        Close the cursor
+        """
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    """
+    Connection wrapper with the parts of the MySQLdb connection interface used
+    by db_ops and the connection pool
+    """
+
+    def __init__(self, connection):
+        """
+        Initialize the connection wrapper
+        """
+        self.connection = connection
+
+    def cursor(self, cursorclass=None):
+        """
+        Open a cursor, with dict rows for the dict cursor classes
+        """
+        return SQLiteCursor(
+            self.connection.cursor(), cursorclass in DICT_CURSORS
+            )
+
+    def commit(self):
+        """
+        Commit the current transaction
+        """
+        self.connection.commit()
+
+    def rollback(self):
+        """
+        Roll back the current transaction
+        """
+        self.connection.rollback()
+
+    def ping(self):
+        """
+        Check that the connection is usable
+        """
+        self.connection.execute('SELECT 1')
+
+    def close(self):
+        """
+        Close the connection
+        """
+        self.connection.close()
+
+
+def create_schema(connection):
+    """
+    Create the tables and indexes if the database does not have them yet, or
+    add the ones that are newer than its schema version
+    """
+    version = connection.execute('PRAGMA user_version').fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
+
+    if version:
+        LOG.info(
+            "Updating SQLite schema from version %s to %s",
+            version,
+            SCHEMA_VERSION
+            )
+    else:
+        LOG.info("Creating SQLite schema version %s", SCHEMA_VERSION)
+    for statement in SQLITE_SCHEMA:
+        connection.execute(statement)
+    connection.execute('PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+    connection.commit()
+
+
+def connect_sqlite(config):
+    """
+    Open the SQLite database at the path in the config, in WAL mode so that
+    readers do not block the writer, and create its schema if necessary
+    """
+    connection = sqlite3.connect(
+        config['path'],
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        cached_statements=int(
+            config.get('cached_statements', DEFAULT_CACHED_STATEMENTS)
+            ),
+        # The pool hands a connection to one thread at a time
+        check_same_thread=False
+        )
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.execute('PRAGMA synchronous=NORMAL')
+    create_schema(connection)
+
+    return SQLiteConnection(connection)
@@ -0,0 +1,88 @@
+"""
+Timing algorithm: decide from the current hour and the number of plays left
+to tweet whether it is time to tweet, and plan the hours for the day
+"""
+from logging import basicConfig, getLogger
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+
+def get_hours_per_tweet(this_hour, play_count):
+    """
+    Given the current hour and the number of plays left to tweet, determine the
+    hours remaning
+    """
+    hours_remaining = 23 - this_hour
+    hours_per_tweet = hours_remaining / play_count
+    LOG.info(
+        "%s hours remaining / %s plays = %s",
+        hours_remaining,
+        play_count,
+        hours_per_tweet
+        )
+    return hours_per_tweet
+
+
+def is_good_time(this_hour, hours_per_tweet):
+    """
+    Apply the timing rules to the current hour and the hours per tweet
+    """
+    good_time = False
+    # if we have 1 or less hours per tweet, then just tweet
+    if hours_per_tweet <= 1:
+        good_time = True
+
+    # if it's after noon (6AM New York time) and we have a play every two hours
+    if this_hour > 12 and hours_per_tweet <= 2:
+        good_time = True
+
+    # if it's after 3PM (9AM New York time) and we have a play every three
+    # hours
+    if this_hour > 15 and hours_per_tweet <= 3:
+        good_time = True
+
+    return good_time
+
+
+def is_time_to_tweet(args, this_hour, play_count):
+    """
+    Determine whether this is a good time to tweet
+    """
+    hours_per_tweet = get_hours_per_tweet(this_hour, play_count)
+
+    if is_good_time(this_hour, hours_per_tweet) or args.no_tweet or args.force:
+        return True
+
+    return False
+
+
+def get_next_tweet_hour(this_hour, play_count):
+    """
+    Given the current hour and the number of plays left to tweet, return the
+    first hour (starting with this one) at which the timing rules say to tweet
+    """
+    hour = this_hour
+    # at 2300 there are no hours remaining, so there is always a good time
+    while not is_good_time(hour, (23 - hour) / play_count):
+        hour += 1
+
+    return hour
+
+
+def plan_tweet_hours(this_hour, play_count):
+    """
+    Given the current hour and the number of plays to tweet today, return the
+    hours at which the timing rules will tweet them, one per hour
+    """
+    tweet_hours = []
+
+    for hour in range(this_hour, 24):
+        remaining = play_count - len(tweet_hours)
+        if not remaining:
+            break
+
+        if is_good_time(hour, (23 - hour) / remaining):
+            tweet_hours.append(hour)
+
+    return tweet_hours
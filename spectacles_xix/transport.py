@@ -0,0 +1,61 @@
+"""
+Shared HTTP transport: one pooled, keep-alive session per host, with default
+timeouts and retries, used for the Twitter, Books and image traffic.  The
+sessions (and the requests library) are only loaded when a request is made
+"""
+from logging import basicConfig, getLogger
+from threading import Lock
+from urllib.parse import urlsplit
+
+basicConfig(level="DEBUG")
+LOG = getLogger(__name__)
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (500, 502, 503, 504)
+
+SETTINGS = {'timeout': DEFAULT_TIMEOUT, 'retries': DEFAULT_RETRIES}
+
+SESSIONS = {}
+SESSIONS_LOCK = Lock()
+
+
+def get_session(url):
+    """
+    Return the shared session for the host of a URL
+    """
+    from .http_session import TransportSession
+
+    host = urlsplit(url).netloc
+
+    with SESSIONS_LOCK:
+        if host not in SESSIONS:
+            LOG.debug("Creating HTTP session for %s", host)
+            SESSIONS[host] = TransportSession(
+                SETTINGS['timeout'], SETTINGS['retries']
+                )
+        return SESSIONS[host]
+
+
+def close_sessions():
+    """
+    Close every shared session
+    """
+    with SESSIONS_LOCK:
+        sessions = list(SESSIONS.values())
+        SESSIONS.clear()
+
+    for session in sessions:
+        session.close()
+
+
+def configure(config):
+    """
+    Set the timeout and number of retries from the optional [http] section of
+    the config, and drop the existing sessions so that new ones use them
+    """
+    section = config['http'] if 'http' in config else {}
+    SETTINGS['timeout'] = float(section.get('timeout', DEFAULT_TIMEOUT))
+    SETTINGS['retries'] = int(section.get('retries', DEFAULT_RETRIES))
+    close_sessions()
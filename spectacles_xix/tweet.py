@@ -4,59 +4,23 @@ theaters from 200 years ago
 """
 from logging import basicConfig, getLogger
 
-from twitter import Twitter, OAuth
-
-from .db_ops import tweet_db
+from .metrics import span
+from .transport import get_session
 
 basicConfig(level="DEBUG")
 LOG = getLogger(__name__)
 
-
-def get_hours_per_tweet(this_hour, play_count):
-    """
-    Given the current hour and the number of plays left to tweet, determine the
-    hours remaning
-    """
-    hours_remaining = 23 - this_hour
-    hours_per_tweet = hours_remaining / play_count
-    LOG.info(
-        "%s hours remaining / %s plays = %s",
-        hours_remaining,
-        play_count,
-        hours_per_tweet
-        )
-    return hours_per_tweet
-
-
-def is_time_to_tweet(args, this_hour, play_count):
-    """
-    Determine whether this is a good time to tweet
-    """
-    hours_per_tweet = get_hours_per_tweet(this_hour, play_count)
-    good_time = False
-    # if we have 1 or less hours per tweet, then just tweet
-    if hours_per_tweet <= 1:
-        good_time = True
-
-    # if it's after noon (6AM New York time) and we have a play every two hours
-    if this_hour > 12 and hours_per_tweet <= 2:
-        good_time = True
-
-    # if it's after 3PM (9AM New York time) and we have a play every three
-    # hours
-    if this_hour > 15 and hours_per_tweet <= 3:
-        good_time = True
-
-    if good_time or args.no_tweet or args.force:
-        return True
-
-    return False
+API_URL = 'https://api.twitter.com/1.1/'
+UPLOAD_URL = 'https://upload.twitter.com/1.1/'
 
 
 def get_oauth(config):
     """
-    Retrieve an OAuth object based on the token, key and secrets in the config
+    Retrieve an OAuth object based on the token, key and secrets in the config.
+    The Twitter library is only imported when a tweet is sent
     """
+    from twitter import OAuth
+
     return OAuth(
         config['token'],
         config['token_secret'],
@@ -65,36 +29,54 @@ def get_oauth(config):
         )
 
 
+def get_json(response):
+    """
+    Return the decoded JSON body of a response, or an empty dict if it has none
+    """
+    try:
+        return response.json()
+    except ValueError:
+        LOG.error("Non-JSON response from %s: %s", response.url, response.text)
+        return {}
+
+
 def upload_image(oauth, title_image):
     """
-    Given a config and an image object, connect to the Twitter upload service,
-    upload the image and return the image ID if successful
+    Given an OAuth object and an image object, upload the image to the Twitter
+    upload service and return the image ID if successful
     """
-    image_id = None
+    url = UPLOAD_URL + 'media/upload.json'
+    # the signature for a multipart upload covers only the OAuth parameters
+    signed_url = url + '?' + oauth.encode_params(url, 'POST', {})
 
-    twupload = Twitter(domain='upload.twitter.com', auth=oauth)
+    with span('upload_image'):
+        response = get_session(url).post(
+            signed_url, files={'media': title_image}
+            )
+    image_response = get_json(response)
+    if not response.ok:
+        LOG.error("Error uploading image: %s", image_response)
+        return None
 
-    image_response = twupload.media.upload(media=title_image)
-    if image_response:
-        image_id = image_response.get('media_id_string')
-    return image_id
+    return image_response.get('media_id_string')
 
 
-def send_tweet(cursor, config, play_id, message, title_image):
+def update_status(oauth, message, image_id=None):
     """
-    Send the tweet
+    Post the status, with the uploaded image if there is one, and return the
+    decoded response
     """
-    oauth = get_oauth(config)
-    twapi = Twitter(auth=oauth)
-
-    image_id = ''
-    if title_image:
-        image_id = upload_image(oauth, title_image)
-
-    status = twapi.statuses.update(status=message, media_ids=image_id)
-    if 'id' in status:
-        LOG.info("Sent tweet ID# %s", status['id'])
-        tweet_db(cursor, play_id)
-    else:
-        LOG.error(status)
-    return status
+    params = {'status': message}
+    if image_id:
+        params['media_ids'] = image_id
+
+    url = API_URL + 'statuses/update.json'
+    with span('statuses_update'):
+        response = get_session(url).post(
+            url,
+            data=oauth.encode_params(url, 'POST', params),
+            headers={'Content-Type': 'application/x-www-form-urlencoded'}
+            )
+
+    return get_json(response)
+
@@ -0,0 +1,83 @@
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.abbreviations import AbbreviationCache
+
+
+class TestAbbreviationCache(TestCase):
+
+    def setUp(self):
+        self.table = {'op': 'opéra', 'com': 'comique', 'vaud': 'vaudeville'}
+        self.cache = AbbreviationCache(ttl=60)
+        self.mock_cursor = Mock()
+
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_expand(self, mock_db):
+        mock_db.return_value = self.table
+
+        test_expansion = self.cache.expand(self.mock_cursor, 'op.-com.')
+
+        self.assertEqual(test_expansion, 'opéra-comique')
+        mock_db.assert_called_once_with(self.mock_cursor)
+
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_expand_unknown(self, mock_db):
+        mock_db.return_value = self.table
+
+        test_expansion = self.cache.expand(self.mock_cursor, 'Com. en 1 a.')
+
+        self.assertEqual(test_expansion, 'comique en 1 a')
+
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_expand_blank(self, mock_db):
+        test_expansion = self.cache.expand(self.mock_cursor, None)
+
+        self.assertIsNone(test_expansion)
+        mock_db.assert_not_called()
+
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_expand_cached(self, mock_db):
+        mock_db.return_value = self.table
+
+        self.cache.expand(self.mock_cursor, 'op.')
+        test_expansion = self.cache.expand(self.mock_cursor, 'vaud.')
+
+        self.assertEqual(test_expansion, 'vaudeville')
+        mock_db.assert_called_once_with(self.mock_cursor)
+
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_invalidate(self, mock_db):
+        mock_db.return_value = self.table
+
+        self.cache.expand(self.mock_cursor, 'op.')
+        self.cache.invalidate()
+        self.cache.expand(self.mock_cursor, 'op.')
+
+        self.assertEqual(mock_db.call_count, 2)
+
+    @patch('spectacles_xix.abbreviations.monotonic')
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_ttl(self, mock_db, mock_monotonic):
+        mock_db.return_value = self.table
+
+        mock_monotonic.return_value = 1000
+        self.cache.expand(self.mock_cursor, 'op.')
+        mock_monotonic.return_value = 1030
+        self.cache.expand(self.mock_cursor, 'op.')
+        mock_monotonic.return_value = 1070
+        self.cache.expand(self.mock_cursor, 'op.')
+
+        self.assertEqual(mock_db.call_count, 2)
+
+    @patch('spectacles_xix.abbreviations.abbreviations_db')
+    def test_expand_error(self, mock_db):
+        mock_db.return_value = None
+
+        test_expansion = self.cache.expand(self.mock_cursor, 'op.')
+
+        self.assertEqual(test_expansion, 'op')
+        self.assertIsNone(self.cache.table)
+
+
+if __name__ == '__main__':
+    main()
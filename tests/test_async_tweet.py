@@ -0,0 +1,126 @@
+from threading import Barrier
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.async_tweet import run_get_and_tweet
+from spectacles_xix.check_books import BookResult
+from spectacles_xix.metrics import record_run
+
+
+class TestAsyncTweet(TestCase):
+
+    def setUp(self):
+        self.config = {
+            'db': {'test': 'db'},
+            'path': {'google_service_account': '/path/to/account.json'},
+            'twitter': {'token': 'test token'}
+            }
+        self.local_now = Mock()
+        self.play_dict = {'id': 888}
+        self.book_result = BookResult(
+            'https://books.example.com/book?id=1', 'https://example.com/x.png'
+            )
+
+    @patch('spectacles_xix.async_tweet.post_tweet')
+    @patch('spectacles_xix.async_tweet.upload_title_image')
+    @patch('spectacles_xix.async_tweet.fetch_image')
+    @patch('spectacles_xix.async_tweet.search_books')
+    @patch('spectacles_xix.async_tweet.render_play')
+    def test_run_get_and_tweet(
+            self, mock_render, mock_search, mock_fetch, mock_upload, mock_post
+            ):
+        mock_render.return_value = 'test message'
+        mock_search.return_value = self.book_result
+        mock_fetch.return_value = b'image'
+        mock_upload.return_value = 'image id'
+
+        with self.assertLogs(level="INFO"):
+            with record_run(True, self.config) as recorder:
+                run_get_and_tweet(
+                    True, False, self.config, self.local_now, self.play_dict
+                    )
+
+        self.assertEqual(
+            set(recorder.get_record()['stages']),
+            {'render', 'books', 'image', 'upload', 'status'}
+            )
+        mock_render.assert_called_once_with(
+            self.config, self.local_now, self.play_dict
+            )
+        mock_search.assert_called_once_with(True, self.config, self.play_dict)
+        mock_fetch.assert_called_once_with(self.config, self.book_result)
+        mock_upload.assert_called_once_with(self.config, 888, b'image')
+        mock_post.assert_called_once_with(
+            self.config,
+            888,
+            'test message https://books.example.com/book?id=1',
+            'image id'
+            )
+
+    @patch('spectacles_xix.async_tweet.post_tweet')
+    @patch('spectacles_xix.async_tweet.upload_title_image')
+    @patch('spectacles_xix.async_tweet.fetch_image')
+    @patch('spectacles_xix.async_tweet.search_books')
+    @patch('spectacles_xix.async_tweet.render_play')
+    def test_run_get_and_tweet_no_image(
+            self, mock_render, mock_search, mock_fetch, mock_upload, mock_post
+            ):
+        mock_render.return_value = 'test message'
+        mock_search.return_value = BookResult()
+        mock_fetch.return_value = None
+
+        run_get_and_tweet(
+            False, False, self.config, self.local_now, self.play_dict
+            )
+
+        mock_upload.assert_not_called()
+        mock_post.assert_called_once_with(
+            self.config, 888, 'test message ', None
+            )
+
+    @patch('spectacles_xix.async_tweet.post_tweet')
+    @patch('spectacles_xix.async_tweet.fetch_image')
+    @patch('spectacles_xix.async_tweet.search_books')
+    @patch('spectacles_xix.async_tweet.render_play')
+    def test_run_get_and_tweet_no_tweet(
+            self, mock_render, mock_search, mock_fetch, mock_post
+            ):
+        mock_search.return_value = self.book_result
+
+        with self.assertLogs(level="INFO"):
+            with record_run(True, self.config) as recorder:
+                run_get_and_tweet(
+                    True, True, self.config, self.local_now, self.play_dict
+                    )
+
+        self.assertEqual(
+            set(recorder.get_record()['stages']), {'render', 'books'}
+            )
+        mock_fetch.assert_not_called()
+        mock_post.assert_not_called()
+
+    @patch('spectacles_xix.async_tweet.search_books')
+    @patch('spectacles_xix.async_tweet.render_play')
+    def test_stages_overlap(self, mock_render, mock_search):
+        # Each stage waits for the other, so this only finishes if the
+        # rendering and the Books search run at the same time
+        barrier = Barrier(2, timeout=5)
+
+        def render(*_):
+            barrier.wait()
+            return 'test message'
+
+        def search(*_):
+            barrier.wait()
+            return self.book_result
+
+        mock_render.side_effect = render
+        mock_search.side_effect = search
+
+        run_get_and_tweet(
+            True, True, self.config, self.local_now, self.play_dict
+            )
+
+
+if __name__ == '__main__':
+    main()
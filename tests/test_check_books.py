@@ -2,36 +2,69 @@
 Tests for check_books, functions and class to retrieve and process Google Books
 data
 """
+from datetime import datetime, timedelta
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase, main
 from unittest.mock import Mock, patch
 
+from googleapiclient.errors import HttpError
+
 from spectacles_xix.check_books import(
-    SCOPES, check_books_api, get_api, search_api, BookResult, HttpError
+    CLIENTS, DEFAULT_MAX_BYTES, DISCOVERY_URL, IMAGE_CACHE, SCOPES,
+    check_books_api, get_api,
+    load_discovery_document, search_api, BookCache, BookResult
     )
 
 
 class TestApi(TestCase):
 
-    @patch('spectacles_xix.check_books.build')
-    @patch('spectacles_xix.check_books.Credentials')
-    def test_get_api(self, mock_cred_class, mock_build):
+    def tearDown(self):
+        CLIENTS.apis = {}
+
+    @patch('spectacles_xix.check_books.load_discovery_document')
+    @patch('googleapiclient.discovery.build_from_document')
+    @patch('google.oauth2.service_account.Credentials')
+    def test_get_api(self, mock_cred_class, mock_build, mock_load):
         test_file_name = '/path/to/test_file.ini'
         mock_credentials = Mock()
         mock_api = Mock()
+        mock_document = '{"test": "document"}'
 
         mock_cred_class.from_service_account_file.return_value = mock_credentials
         mock_build.return_value = mock_api
+        mock_load.return_value = mock_document
 
         test_api = get_api(test_file_name)
         self.assertEqual(test_api, mock_api)
+        self.assertEqual(get_api(test_file_name), mock_api)
 
         mock_cred_class.from_service_account_file.assert_called_once_with(
             test_file_name, scopes=SCOPES
             )
         mock_build.assert_called_once_with(
-            'books', 'v1', credentials=mock_credentials, cache_discovery=False
+            mock_document, credentials=mock_credentials
             )
 
+    @patch('spectacles_xix.check_books.get_session')
+    def test_load_discovery_document(self, mock_session):
+        mock_get = mock_session.return_value.get
+        test_document = '{"test": "document"}'
+        mock_get.return_value = Mock(text=test_document)
+
+        with TemporaryDirectory() as tmp_dir:
+            test_path = Path(tmp_dir, 'cache', 'discovery.json')
+
+            with self.assertLogs(level="INFO"):
+                self.assertEqual(
+                    load_discovery_document(test_path), test_document
+                    )
+            self.assertEqual(load_discovery_document(test_path), test_document)
+            self.assertEqual(test_path.read_text(), test_document)
+
+        mock_session.assert_called_once_with(DISCOVERY_URL)
+        mock_get.assert_called_once_with(DISCOVERY_URL)
+
     def test_search_api(self):
         mock_api = Mock()
         test_term = 'test term'
@@ -104,7 +137,7 @@ class TestApi(TestCase):
         mock_volumes.list.return_value.execute.return_value = test_vol_list
 
         mock_api.volumes.return_value = mock_volumes
-        target_output = None
+        target_output = {}
 
         test_output = search_api(mock_api, test_term)
 
@@ -175,6 +208,125 @@ class TestApi(TestCase):
         mock_search.assert_not_called()
 
 
+    @patch('spectacles_xix.check_books.search_api')
+    @patch('spectacles_xix.check_books.get_api')
+    def test_check_books_api_cached(self, mock_get, mock_search):
+        mock_play = Mock(title='test title', author='test author')
+        target_search = 'intitle:"test title" inauthor:"test author"'
+
+        mock_cache = Mock()
+        mock_result = Mock()
+        mock_cache.get.return_value = mock_result
+
+        with self.assertLogs(level="INFO"):
+            test_result = check_books_api(
+                True, '/path/to/config/file.json', mock_play, mock_cache
+                )
+        self.assertEqual(test_result, mock_result)
+
+        mock_cache.get.assert_called_once_with(target_search)
+        mock_get.assert_not_called()
+        mock_search.assert_not_called()
+
+    @patch('spectacles_xix.check_books.search_api')
+    @patch('spectacles_xix.check_books.get_api')
+    def test_check_books_api_not_cached(self, mock_get, mock_search):
+        mock_play = Mock(title='test title', author='test author')
+        target_search = 'intitle:"test title" inauthor:"test author"'
+
+        mock_cache = Mock()
+        mock_cache.get.return_value = None
+        mock_search.return_value = {}
+
+        with self.assertLogs(level="INFO"):
+            test_result = check_books_api(
+                True, '/path/to/config/file.json', mock_play, mock_cache
+                )
+        self.assertEqual(test_result.book_url, '')
+
+        mock_cache.put.assert_called_once_with(target_search, test_result)
+
+    @patch('spectacles_xix.check_books.search_api')
+    @patch('spectacles_xix.check_books.get_api')
+    def test_check_books_api_error_not_cached(self, mock_get, mock_search):
+        mock_play = Mock(title='test title', author='test author')
+
+        mock_cache = Mock()
+        mock_cache.get.return_value = None
+        mock_search.return_value = None
+
+        with self.assertLogs(level="INFO"):
+            check_books_api(
+                True, '/path/to/config/file.json', mock_play, mock_cache
+                )
+
+        mock_cache.put.assert_not_called()
+
+
+class TestBookCache(TestCase):
+
+    def setUp(self):
+        self.mock_cursor = Mock()
+        self.cache = BookCache(
+            self.mock_cursor, cache_days=30, negative_cache_days=7
+            )
+        self.term = 'intitle:"test title" inauthor:"test author"'
+
+    @patch('spectacles_xix.check_books.book_db')
+    def test_get(self, mock_book_db):
+        mock_book_db.return_value = (
+            'http://example.com/book', 'http://example.com/image',
+            datetime.now() - timedelta(days=20)
+            )
+
+        test_result = self.cache.get(self.term)
+
+        self.assertEqual(test_result.book_url, 'http://example.com/book')
+        self.assertEqual(test_result.image_url, 'http://example.com/image')
+        mock_book_db.assert_called_once_with(self.mock_cursor, self.term)
+
+    @patch('spectacles_xix.check_books.book_db')
+    def test_get_missing(self, mock_book_db):
+        mock_book_db.return_value = None
+        self.assertIsNone(self.cache.get(self.term))
+
+    @patch('spectacles_xix.check_books.book_db')
+    def test_get_expired(self, mock_book_db):
+        mock_book_db.return_value = (
+            'http://example.com/book', 'http://example.com/image',
+            datetime.now() - timedelta(days=31)
+            )
+        self.assertIsNone(self.cache.get(self.term))
+
+    @patch('spectacles_xix.check_books.book_db')
+    def test_get_negative(self, mock_book_db):
+        mock_book_db.return_value = (
+            '', '', datetime.now() - timedelta(days=6)
+            )
+
+        test_result = self.cache.get(self.term)
+
+        self.assertEqual(test_result.book_url, '')
+        self.assertEqual(test_result.image_url, '')
+
+    @patch('spectacles_xix.check_books.book_db')
+    def test_get_negative_expired(self, mock_book_db):
+        mock_book_db.return_value = (
+            None, None, datetime.now() - timedelta(days=8)
+            )
+        self.assertIsNone(self.cache.get(self.term))
+
+    @patch('spectacles_xix.check_books.save_book_db')
+    def test_put(self, mock_save):
+        test_result = BookResult('http://example.com/book', '')
+
+        self.cache.put(self.term, test_result)
+
+        mock_save.assert_called_once_with(
+            self.mock_cursor, self.term, 'http://example.com/book', ''
+            )
+
+
 class TestBookResult(TestCase):
 
     def setUp(self):
@@ -231,31 +383,42 @@ class TestBookResult(TestCase):
         test_url = self.result.get_better_book_url()
         self.assertEqual(test_url, target_url)
 
-    @patch('spectacles_xix.check_books.get')
     @patch('spectacles_xix.check_books.BookResult.get_better_image_url')
-    def test_get_image_file(self, mock_image, mock_get):
+    def test_get_image_file(self, mock_image):
         mock_image.return_value = self.target_image_url
-        mock_content = 'test content'
+        mock_content = b'test content'
 
-        mock_result = Mock(content=mock_content)
-        mock_get.return_value = mock_result
+        mock_store = Mock()
+        mock_store.read.return_value = mock_content
 
-        test_content = self.result.get_image_file()
+        test_content = self.result.get_image_file(mock_store)
         self.assertEqual(test_content, mock_content)
 
         mock_image.assert_called_once_with()
-        mock_get.assert_called_once_with(self.target_image_url)
+        mock_store.read.assert_called_once_with(self.target_image_url)
+
+    @patch('spectacles_xix.check_books.get_image_store')
+    @patch('spectacles_xix.check_books.BookResult.get_better_image_url')
+    def test_get_image_file_default_store(self, mock_image, mock_get_store):
+        mock_image.return_value = self.target_image_url
+
+        self.result.get_image_file()
+
+        mock_get_store.assert_called_once_with(IMAGE_CACHE, DEFAULT_MAX_BYTES)
+        mock_get_store.return_value.read.assert_called_once_with(
+            self.target_image_url
+            )
 
-    @patch('spectacles_xix.check_books.get')
     @patch('spectacles_xix.check_books.BookResult.get_better_image_url')
-    def test_get_image_file_empty(self, mock_image, mock_get):
+    def test_get_image_file_empty(self, mock_image):
         mock_image.return_value = ''
+        mock_store = Mock()
 
-        test_content = self.result.get_image_file()
+        test_content = self.result.get_image_file(mock_store)
         self.assertIsNone(test_content)
 
         mock_image.assert_called_once_with()
-        mock_get.assert_not_called()
+        mock_store.read.assert_not_called()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,196 @@
+from datetime import datetime
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.daemon import(
+    TweetDaemon, get_hour_start, get_wake_time
+    )
+
+
+class TestWakeTime(TestCase):
+
+    def setUp(self):
+        self.args = Mock(no_tweet=False, force=False)
+
+    def test_get_hour_start(self):
+        test_now = datetime(2018, 10, 17, 14, 35, 12)
+        target_start = datetime(2018, 10, 17, 16)
+
+        test_start = get_hour_start(test_now, 2)
+        self.assertEqual(test_start, target_start)
+
+    def test_get_wake_time_empty(self):
+        test_now = datetime(2018, 10, 17, 14, 35)
+        target_wake = datetime(2018, 10, 18)
+
+        test_tweet, test_wake = get_wake_time(self.args, test_now, 0)
+        self.assertFalse(test_tweet)
+        self.assertEqual(test_wake, target_wake)
+
+    def test_get_wake_time_now(self):
+        test_now = datetime(2018, 10, 17, 14, 35)
+        target_wake = datetime(2018, 10, 17, 15)
+
+        with self.assertLogs(level="INFO"):
+            test_tweet, test_wake = get_wake_time(self.args, test_now, 5)
+        self.assertTrue(test_tweet)
+        self.assertEqual(test_wake, target_wake)
+
+    def test_get_wake_time_later(self):
+        test_now = datetime(2018, 10, 17, 9, 5)
+        target_wake = datetime(2018, 10, 17, 17)
+
+        with self.assertLogs(level="INFO"):
+            test_tweet, test_wake = get_wake_time(self.args, test_now, 2)
+        self.assertFalse(test_tweet)
+        self.assertEqual(test_wake, target_wake)
+
+
+class TestTweetDaemon(TestCase):
+
+    def setUp(self):
+        self.args = Mock(
+            wicks=None, date=None, tweeted=False, book=True, no_tweet=False,
+            force=False, plan=False, asynchronous=False, metrics=False
+            )
+        self.config = {'db': {'test': 'db'}}
+        self.load_config = Mock(return_value=self.config)
+        self.daemon = TweetDaemon(self.args, self.load_config)
+
+    @patch('spectacles_xix.daemon.get_and_tweet')
+    @patch('spectacles_xix.daemon.get_wake_time')
+    @patch('spectacles_xix.daemon.get_play_list')
+    @patch('spectacles_xix.daemon.get_local_now')
+    def test_run_cycle(self, mock_now, mock_list, mock_wake, mock_tweet):
+        mock_list.return_value = ['play 1', 'play 2']
+        mock_wake_at = Mock()
+        mock_wake.return_value = (True, mock_wake_at)
+
+        with self.assertLogs(level="INFO"):
+            test_wake_at = self.daemon.run_cycle()
+
+        self.assertEqual(test_wake_at, mock_wake_at)
+        mock_list.assert_called_once_with(
+            self.config['db'], None, mock_now.return_value, None, False
+            )
+        mock_wake.assert_called_once_with(
+            self.args, mock_now.return_value, 2
+            )
+        mock_tweet.assert_called_once_with(
+            True, False, self.config, mock_now.return_value, 'play 1'
+            )
+
+    @patch('spectacles_xix.daemon.run_get_and_tweet')
+    @patch('spectacles_xix.daemon.get_and_tweet')
+    @patch('spectacles_xix.daemon.get_wake_time')
+    @patch('spectacles_xix.daemon.get_play_list')
+    @patch('spectacles_xix.daemon.get_local_now')
+    def test_run_cycle_async(
+            self, mock_now, mock_list, mock_wake, mock_tweet, mock_async
+            ):
+        self.args.asynchronous = True
+        mock_list.return_value = ['play 1']
+        mock_wake.return_value = (True, Mock())
+
+        with self.assertLogs(level="INFO"):
+            self.daemon.run_cycle()
+
+        mock_tweet.assert_not_called()
+        mock_async.assert_called_once_with(
+            True, False, self.config, mock_now.return_value, 'play 1'
+            )
+
+    @patch('spectacles_xix.daemon.get_and_tweet')
+    @patch('spectacles_xix.daemon.get_wake_time')
+    @patch('spectacles_xix.daemon.get_play_list')
+    @patch('spectacles_xix.daemon.get_local_now')
+    def test_run_cycle_wait(self, mock_now, mock_list, mock_wake, mock_tweet):
+        mock_list.return_value = ['play 1', 'play 2']
+        mock_wake.return_value = (False, Mock())
+
+        with self.assertLogs(level="INFO"):
+            self.daemon.run_cycle()
+
+        mock_tweet.assert_not_called()
+
+    @patch('spectacles_xix.daemon.get_and_tweet')
+    @patch('spectacles_xix.daemon.get_wake_time')
+    @patch('spectacles_xix.daemon.get_play_list')
+    @patch('spectacles_xix.daemon.get_planned_play_list')
+    @patch('spectacles_xix.daemon.get_local_now')
+    def test_run_cycle_plan(
+            self, mock_now, mock_planned, mock_list, mock_wake, mock_tweet
+            ):
+        self.args.plan = True
+        mock_now.return_value = datetime(1818, 10, 15, 13, 20)
+        mock_planned.return_value = ['play 1']
+
+        with self.assertLogs(level="INFO"):
+            test_wake_at = self.daemon.run_cycle()
+
+        self.assertEqual(test_wake_at, datetime(1818, 10, 15, 14))
+        mock_planned.assert_called_once_with(
+            self.config['db'], mock_now.return_value, False
+            )
+        mock_list.assert_not_called()
+        mock_wake.assert_not_called()
+        mock_tweet.assert_called_once_with(
+            True, False, self.config, mock_now.return_value, 'play 1'
+            )
+
+    @patch('spectacles_xix.daemon.get_and_tweet')
+    @patch('spectacles_xix.daemon.get_planned_play_list')
+    @patch('spectacles_xix.daemon.get_local_now')
+    def test_run_cycle_plan_empty(self, mock_now, mock_planned, mock_tweet):
+        self.args.plan = True
+        mock_now.return_value = datetime(1818, 10, 15, 23, 20)
+        mock_planned.return_value = []
+
+        with self.assertLogs(level="INFO"):
+            test_wake_at = self.daemon.run_cycle()
+
+        self.assertEqual(test_wake_at, datetime(1818, 10, 16))
+        mock_tweet.assert_not_called()
+
+    @patch('spectacles_xix.daemon.close_pools')
+    @patch('spectacles_xix.daemon.ABBREVIATIONS')
+    def test_reload(self, mock_abbreviations, mock_close):
+        self.daemon.handle_reload()
+
+        with self.assertLogs(level="INFO"):
+            self.daemon.reload()
+
+        self.assertFalse(self.daemon.reloading)
+        self.assertEqual(self.load_config.call_count, 2)
+        mock_abbreviations.invalidate.assert_called_once_with()
+        mock_close.assert_called_once_with()
+
+    @patch('spectacles_xix.daemon.sleep')
+    def test_sleep_until_reload(self, mock_sleep):
+        self.daemon.handle_reload()
+
+        self.daemon.sleep_until(datetime(3000, 1, 1))
+        mock_sleep.assert_not_called()
+
+    @patch('spectacles_xix.daemon.sleep')
+    def test_sleep_until_past(self, mock_sleep):
+        self.daemon.sleep_until(datetime(2000, 1, 1))
+        mock_sleep.assert_not_called()
+
+    @patch('spectacles_xix.daemon.close_pools')
+    @patch('spectacles_xix.daemon.TweetDaemon.sleep_until')
+    @patch('spectacles_xix.daemon.TweetDaemon.run_cycle')
+    def test_run(self, mock_cycle, mock_sleep, mock_close):
+        mock_wake_at = Mock()
+        mock_cycle.return_value = mock_wake_at
+        mock_sleep.side_effect = lambda wake_at: self.daemon.handle_stop()
+
+        self.daemon.run()
+
+        mock_cycle.assert_called_once_with()
+        mock_sleep.assert_called_once_with(mock_wake_at)
+        mock_close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    main()
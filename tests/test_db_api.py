@@ -0,0 +1,52 @@
+import sqlite3
+import sys
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.db_api import (
+    DictCursor,
+    SSDictCursor,
+    connection_errors,
+    db_errors,
+    get_mysql_cursorclass
+    )
+
+
+class TestDbApi(TestCase):
+
+    @patch.dict('sys.modules')
+    def test_db_errors_sqlite(self):
+        sys.modules.pop('MySQLdb', None)
+
+        self.assertTupleEqual(db_errors(), (sqlite3.DatabaseError,))
+        self.assertTupleEqual(connection_errors(), (sqlite3.Error,))
+
+    def test_db_errors_mysql(self):
+        mock_mysqldb = Mock()
+
+        with patch.dict('sys.modules', {'MySQLdb': mock_mysqldb}):
+            self.assertTupleEqual(
+                db_errors(),
+                (sqlite3.DatabaseError, mock_mysqldb.DatabaseError)
+                )
+            self.assertTupleEqual(
+                connection_errors(), (sqlite3.Error, mock_mysqldb.Error)
+                )
+
+    def test_get_mysql_cursorclass(self):
+        mock_cursors = Mock()
+        mock_mysqldb = Mock(cursors=mock_cursors)
+
+        with patch.dict('sys.modules', {
+                'MySQLdb': mock_mysqldb, 'MySQLdb.cursors': mock_cursors
+                }):
+            self.assertEqual(
+                get_mysql_cursorclass(SSDictCursor), mock_cursors.SSDictCursor
+                )
+            self.assertEqual(
+                get_mysql_cursorclass(DictCursor), mock_cursors.DictCursor
+                )
+
+
+if __name__ == '__main__':
+    main()
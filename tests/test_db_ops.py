@@ -1,19 +1,39 @@
-from datetime import datetime
+from datetime import date, datetime
+from sqlite3 import DatabaseError, OperationalError
+import sys
 from unittest import TestCase, main
 from unittest.mock import Mock, patch
 
-from dateutil import relativedelta
-from MySQLdb import DatabaseError
-
+from spectacles_xix.db_api import DictCursor
 from spectacles_xix.db_ops import(
     NOT_TWEETED_CONDITION,
     PLAY_SELECT,
-    abbreviation_db,
+    abbreviations_db,
+    book_db,
+    connect_db,
+    db_cursor,
+    get_cursorclass,
+    get_date_fallback_query,
+    get_tweeted_condition,
+    get_wicks_query,
+    message_db,
+    missed_plan_db,
+    plan_db,
+    plan_slot_db,
+    prune_plan_db,
     play_db,
+    posts_db,
+    query_by_id,
     query_by_wicks_id,
-    query_by_date,
+    query_by_date_with_fallback,
     query_play,
-    tweet_db
+    save_book_db,
+    save_message_db,
+    save_messages_db,
+    save_posts_db,
+    stream_plays_db,
+    tweet_db,
+    tweeted_ids_db
     )
 
 class TestQuery(TestCase):
@@ -24,9 +44,7 @@ class TestQuery(TestCase):
             ('test 1a', 'test 2a', 'test 3a', 5)
             ]
         self.config = {'test 1': 'test 2'}
-        self.date = datetime.now().date() + relativedelta.relativedelta(
-            years=-200
-            )
+        self.date = date(1818, 10, 15)
 
 
     def test_tweet_db(self):
@@ -48,61 +66,206 @@ class TestQuery(TestCase):
 
         self.assertEqual(mock_cursor.mock_calls[0][1][1][1], test_play_id)
 
-    def test_abbreviation_db(self):
-        test_abbreviation = 'tst'
-        mock_expansion = 'test'
+    def test_posts_db(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = [
+            ('twitter', '1'), ('bluesky', '2')
+            ]
+
+        test_posts = posts_db(mock_cursor, 888)
+
+        self.assertDictEqual(test_posts, {'twitter': '1', 'bluesky': '2'})
+        self.assertEqual(mock_cursor.execute.call_args[0][1], [888])
+
+    def test_posts_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            self.assertDictEqual(posts_db(mock_cursor, 888), {})
+
+    def test_save_posts_db(self):
+        mock_cursor = Mock()
+
+        save_posts_db(mock_cursor, 888, {'twitter': 1, 'mastodon': None})
+
+        test_rows = mock_cursor.executemany.call_args[0][1]
+        self.assertEqual(len(test_rows), 1)
+        self.assertEqual(test_rows[0][:3], (888, 'twitter', '1'))
+
+    def test_save_posts_db_none(self):
+        mock_cursor = Mock()
+
+        save_posts_db(mock_cursor, 888, {'twitter': None})
+
+        mock_cursor.executemany.assert_not_called()
+
+    def test_save_posts_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.executemany.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            save_posts_db(mock_cursor, 888, {'twitter': 1})
+
+    def test_tweeted_ids_db(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = [(1,), (3,)]
+
+        test_ids = tweeted_ids_db(mock_cursor, [1, 2, 3])
+
+        self.assertSetEqual(test_ids, {1, 3})
+        self.assertIn('IN (%s, %s, %s)', mock_cursor.execute.call_args[0][0])
+        self.assertEqual(mock_cursor.execute.call_args[0][1], [1, 2, 3])
+
+    def test_tweeted_ids_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(tweeted_ids_db(mock_cursor, [1]))
+
+    def test_abbreviations_db(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = [
+            ('Op', 'opéra'), ('com', 'comique')
+            ]
+        target_table = {'op': 'opéra', 'com': 'comique'}
+
+        test_table = abbreviations_db(mock_cursor)
+
+        self.assertDictEqual(test_table, target_table)
+        mock_cursor.execute.assert_called_once()
+        mock_cursor.fetchall.assert_called_once_with()
+
+    def test_abbreviations_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            test_table = abbreviations_db(mock_cursor)
+
+        self.assertIsNone(test_table)
+        mock_cursor.fetchall.assert_not_called()
+
+    def test_message_db(self):
+        test_play_id = 888
+        mock_message = 'test message'
 
         mock_cursor = Mock()
-        mock_cursor.fetchone.return_value = (mock_expansion,)
+        mock_cursor.fetchone.return_value = (mock_message,)
 
-        test_expansion = abbreviation_db(mock_cursor, test_abbreviation)
+        test_message = message_db(mock_cursor, test_play_id, True)
 
-        self.assertEqual(test_expansion, mock_expansion)
+        self.assertEqual(test_message, mock_message)
         self.assertEqual(
-            mock_cursor.execute.mock_calls[0][1][1], [test_abbreviation]
+            mock_cursor.execute.mock_calls[0][1][1], [test_play_id, 1]
             )
-        mock_cursor.fetchone.assert_called_once()
 
-    def test_abbreviation_db_empty(self):
-        test_abbreviation = ''
-        mock_expansion = ''
+    def test_message_db_none(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchone.return_value = None
+
+        test_message = message_db(mock_cursor, 888, False)
+
+        self.assertIsNone(test_message)
 
+    def test_message_db_error(self):
         mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
 
-        test_expansion = abbreviation_db(mock_cursor, test_abbreviation)
+        with self.assertLogs(level="ERROR"):
+            test_message = message_db(mock_cursor, 888, False)
 
-        self.assertEqual(test_expansion, mock_expansion)
-        mock_cursor.execute.assert_not_called()
+        self.assertIsNone(test_message)
         mock_cursor.fetchone.assert_not_called()
 
-    def test_abbreviation_db_no_result(self):
-        test_abbreviation = 'tst'
+    def test_save_message_db(self):
+        test_play_id = 888
+        test_message = 'test message'
+
+        mock_cursor = Mock()
+        save_message_db(mock_cursor, test_play_id, False, test_message)
+
+        self.assertEqual(
+            mock_cursor.execute.mock_calls[0][1][1],
+            [test_play_id, 0, test_message]
+            )
 
+    def test_save_message_db_error(self):
         mock_cursor = Mock()
-        mock_cursor.fetchone.return_value = []
+        mock_cursor.execute.side_effect = DatabaseError()
 
-        test_expansion = abbreviation_db(mock_cursor, test_abbreviation)
+        with self.assertLogs(level="ERROR"):
+            save_message_db(mock_cursor, 888, False, 'test message')
+
+    def test_save_messages_db(self):
+        test_messages = [(888, True, 'message 1'), (889, False, 'message 2')]
+        target_rows = [(888, 1, 'message 1'), (889, 0, 'message 2')]
+
+        mock_cursor = Mock()
+        save_messages_db(mock_cursor, test_messages)
 
-        self.assertEqual(test_expansion, test_abbreviation)
         self.assertEqual(
-            mock_cursor.execute.mock_calls[0][1][1], [test_abbreviation]
+            mock_cursor.executemany.mock_calls[0][1][1], target_rows
             )
-        mock_cursor.fetchone.assert_called_once()
 
-    def test_abbreviation_db_error(self):
-        test_abbreviation = 'tst'
+    def test_stream_plays_db(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchmany.side_effect = [['row 1', 'row 2'], ['row 3'], []]
+
+        test_batches = list(stream_plays_db(mock_cursor, 2))
 
+        self.assertListEqual(test_batches, [['row 1', 'row 2'], ['row 3']])
+        mock_cursor.execute.assert_called_once_with(PLAY_SELECT)
+
+    def test_stream_plays_db_error(self):
         mock_cursor = Mock()
         mock_cursor.execute.side_effect = DatabaseError()
 
         with self.assertLogs(level="ERROR"):
-            test_expansion = abbreviation_db(mock_cursor, test_abbreviation)
+            test_batches = list(stream_plays_db(mock_cursor, 2))
+
+        self.assertListEqual(test_batches, [])
+        mock_cursor.fetchmany.assert_not_called()
+
+    def test_book_db(self):
+        test_query = 'intitle:"test" inauthor:"test"'
+        mock_row = ('book url', 'image url', datetime.now())
+
+        mock_cursor = Mock()
+        mock_cursor.fetchone.return_value = mock_row
+
+        test_row = book_db(mock_cursor, test_query)
+
+        self.assertEqual(test_row, mock_row)
+        self.assertEqual(mock_cursor.execute.mock_calls[0][1][1], [test_query])
+
+    def test_book_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            test_row = book_db(mock_cursor, 'test query')
+
+        self.assertIsNone(test_row)
+
+    def test_save_book_db(self):
+        test_query = 'intitle:"test" inauthor:"test"'
+
+        mock_cursor = Mock()
+        save_book_db(mock_cursor, test_query, 'book url', 'image url')
 
-        self.assertEqual(test_expansion, test_abbreviation)
         self.assertEqual(
-            mock_cursor.execute.mock_calls[0][1][1], [test_abbreviation]
+            mock_cursor.execute.mock_calls[0][1][1][:3],
+            [test_query, 'book url', 'image url']
             )
-        mock_cursor.fetchone.assert_not_called()
+
+    def test_save_book_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            save_book_db(mock_cursor, 'test query', '', '')
 
     def test_play_db(self):
         test_query_string = 'query string'
@@ -138,6 +301,19 @@ class TestQuery(TestCase):
             )
         mock_cursor.fetchall.assert_called_once_with()
 
+    def test_play_db_terms(self):
+        mock_cursor = Mock()
+        mock_cursor.fetchall.return_value = self.mock_result
+
+        test_result = play_db(
+            mock_cursor, 'query string', '1818-10-15', '1818-10-01'
+            )
+
+        self.assertEqual(test_result, self.mock_result)
+        mock_cursor.execute.assert_called_once_with(
+            'query string', ['1818-10-15', '1818-10-01']
+            )
+
     def test_play_db_error(self):
         test_query_string = 'query string'
         test_lookup_term = 'lookup term'
@@ -181,6 +357,40 @@ class TestQuery(TestCase):
             mock_cursor, test_query_string, test_lookup_term
             )
 
+    def test_get_tweeted_condition(self):
+        self.assertEqual(get_tweeted_condition(), NOT_TWEETED_CONDITION)
+        self.assertEqual(get_tweeted_condition(True), '')
+
+    def test_get_wicks_query(self):
+        self.assertEqual(
+            get_wicks_query(True), '{}\nWHERE wicks = %s\n'.format(PLAY_SELECT)
+            )
+
+    def test_get_date_fallback_query(self):
+        target_query_string = (
+            '{0}\nWHERE (greg_date = %s OR id = (\n'
+            'SELECT id FROM spectacle_play WHERE greg_date = %s\n{1}\n'
+            'LIMIT 1))\n{1}'
+            ).format(PLAY_SELECT, NOT_TWEETED_CONDITION)
+
+        self.assertEqual(get_date_fallback_query(), target_query_string)
+
+    @patch('spectacles_xix.db_ops.query_play')
+    def test_query_by_date_with_fallback(self, mock_query):
+        mock_query.return_value = self.mock_result
+
+        test_result = query_by_date_with_fallback(
+            self.config, datetime(1818, 10, 15).date(), True
+            )
+
+        self.assertEqual(test_result, self.mock_result)
+        mock_query.assert_called_once_with(
+            self.config,
+            get_date_fallback_query(True),
+            '1818-10-15',
+            '1818-10-01'
+            )
+
     @patch('spectacles_xix.db_ops.query_play')
     def test_query_by_wicks_id(self, mock_query):
         test_wicks_id = 9999
@@ -216,54 +426,213 @@ class TestQuery(TestCase):
             )
 
     @patch('spectacles_xix.db_ops.query_play')
-    def test_query_by_date(self, mock_query):
-        test_date = self.date
-        target_query_string = '{}\nWHERE greg_date = %s\n{}\n'.format(
+    def test_query_by_id(self, mock_query):
+        test_play_id = 888
+        target_query_string = '{}\nWHERE id = %s\n{}'.format(
             PLAY_SELECT, NOT_TWEETED_CONDITION
             )
 
         mock_query.return_value = self.mock_result
 
-        test_result = query_by_date(self.config, test_date)
+        test_result = query_by_id(self.config, test_play_id)
 
         self.assertEqual(test_result, self.mock_result)
         mock_query.assert_called_once_with(
-            self.config, target_query_string, test_date.isoformat()
+            self.config, target_query_string, test_play_id
             )
 
-    @patch('spectacles_xix.db_ops.query_play')
-    def test_query_by_date_limit(self, mock_query):
-        test_date = self.date
-        target_query_string = '{}\nWHERE greg_date = %s\n{}\nLIMIT 1'.format(
-            PLAY_SELECT, NOT_TWEETED_CONDITION
+    def test_plan_slot_db(self):
+        test_slot = datetime(2018, 10, 17, 16)
+        mock_row = (888,)
+
+        mock_cursor = Mock()
+        mock_cursor.fetchone.return_value = mock_row
+
+        test_row = plan_slot_db(mock_cursor, test_slot)
+
+        self.assertEqual(test_row, mock_row)
+        self.assertEqual(
+            mock_cursor.execute.mock_calls[0][1][1], ['2018-10-17 16:00:00']
             )
 
-        mock_query.return_value = self.mock_result
+    def test_plan_slot_db_error(self):
+        test_slot = datetime(2018, 10, 17, 16)
 
-        test_result = query_by_date(self.config, test_date, limit=500)
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
 
-        self.assertEqual(test_result, self.mock_result)
-        mock_query.assert_called_once_with(
-            self.config, target_query_string, test_date.isoformat()
+        with self.assertLogs(level="ERROR"):
+            test_row = plan_slot_db(mock_cursor, test_slot)
+
+        self.assertIsNone(test_row)
+        mock_cursor.fetchone.assert_not_called()
+
+    def test_missed_plan_db(self):
+        test_slot = datetime(2018, 10, 17, 16)
+        mock_row = (777,)
+
+        mock_cursor = Mock()
+        mock_cursor.fetchone.return_value = mock_row
+
+        test_row = missed_plan_db(mock_cursor, test_slot)
+
+        self.assertEqual(test_row, mock_row)
+        self.assertEqual(
+            mock_cursor.execute.mock_calls[0][1][1],
+            ['2018-10-17 00:00:00', '2018-10-17 16:00:00']
             )
 
-    @patch('spectacles_xix.db_ops.query_play')
-    def test_query_by_date_tweeted(self, mock_query):
-        target_query_string = '{}\nWHERE greg_date = %s\n\n'.format(
-            PLAY_SELECT
+    def test_missed_plan_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            test_row = missed_plan_db(mock_cursor, datetime(2018, 10, 17, 16))
+
+        self.assertIsNone(test_row)
+        mock_cursor.fetchone.assert_not_called()
+
+    def test_prune_plan_db(self):
+        mock_cursor = Mock()
+        prune_plan_db(mock_cursor, datetime(2018, 10, 17, 16))
+
+        self.assertEqual(
+            mock_cursor.execute.mock_calls[0][1][1], ['2018-10-17 00:00:00']
             )
-        test_date = self.date
 
-        mock_query.return_value = self.mock_result
+    def test_prune_plan_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = DatabaseError()
 
-        test_result = query_by_date(
-            self.config, test_date, tweeted=True
+        with self.assertLogs(level="ERROR"):
+            prune_plan_db(mock_cursor, datetime(2018, 10, 17, 16))
+
+    def test_plan_db(self):
+        test_plan = [
+            (datetime(2018, 10, 17, 16), None),
+            (datetime(2018, 10, 17, 17), 888)
+            ]
+        target_rows = [
+            ('2018-10-17 16:00:00', None),
+            ('2018-10-17 17:00:00', 888)
+            ]
+
+        mock_cursor = Mock()
+        plan_db(mock_cursor, test_plan)
+
+        self.assertEqual(
+            mock_cursor.executemany.mock_calls[0][1][1], target_rows
             )
 
-        self.assertEqual(test_result, self.mock_result)
-        mock_query.assert_called_once_with(
-            self.config, target_query_string, test_date.isoformat()
+    def test_plan_db_error(self):
+        mock_cursor = Mock()
+        mock_cursor.executemany.side_effect = DatabaseError()
+
+        with self.assertLogs(level="ERROR"):
+            plan_db(mock_cursor, [])
+
+
+class TestCursor(TestCase):
+
+    def setUp(self):
+        self.config = {
+            'host': 'test host',
+            'user': 'test user',
+            'password': 'test password',
+            'db': 'test db'
+            }
+
+    @patch.dict('sys.modules', {'MySQLdb': Mock()})
+    def test_connect_db(self):
+        mock_connect = sys.modules['MySQLdb'].connect
+        mock_connection = Mock()
+        mock_connect.return_value = mock_connection
+
+        test_connection = connect_db(self.config)
+
+        self.assertEqual(test_connection, mock_connection)
+        mock_connect.assert_called_once_with(
+            'test host', 'test user', 'test password', 'test db',
+            charset='utf8'
+            )
+        self.assertEqual(
+            mock_connection.cursor.return_value.execute.call_count, 3
+            )
+
+    @patch('spectacles_xix.db_ops.get_mysql_cursorclass')
+    @patch('spectacles_xix.db_ops.get_pool')
+    def test_db_cursor(self, mock_get_pool, mock_get_class):
+        mock_pool = mock_get_pool.return_value
+        mock_connection = mock_pool.checkout.return_value
+        mock_cursorclass = Mock()
+
+        with db_cursor(self.config, cursorclass=mock_cursorclass) as cursor:
+            self.assertEqual(cursor, mock_connection.cursor.return_value)
+
+        mock_get_class.assert_called_once_with(mock_cursorclass)
+        mock_connection.cursor.assert_called_once_with(
+            mock_get_class.return_value
+            )
+        mock_connection.commit.assert_called_once_with()
+        mock_connection.rollback.assert_not_called()
+        cursor.close.assert_called_once_with()
+        mock_pool.checkin.assert_called_once_with(mock_connection)
+
+    @patch('spectacles_xix.db_ops.get_mysql_cursorclass')
+    def test_get_cursorclass(self, mock_get_class):
+        self.assertIs(
+            get_cursorclass({'backend': 'sqlite'}, DictCursor), DictCursor
+            )
+        mock_get_class.assert_not_called()
+
+        self.assertEqual(
+            get_cursorclass(self.config, DictCursor),
+            mock_get_class.return_value
             )
+        mock_get_class.assert_called_once_with(DictCursor)
+
+    @patch('spectacles_xix.db_ops.get_mysql_cursorclass')
+    @patch('spectacles_xix.db_ops.get_pool')
+    def test_db_cursor_error(self, mock_get_pool, mock_get_class):
+        mock_pool = mock_get_pool.return_value
+        mock_connection = mock_pool.checkout.return_value
+
+        with self.assertRaises(ValueError):
+            with db_cursor(self.config):
+                raise ValueError
+
+        mock_connection.commit.assert_not_called()
+        mock_connection.rollback.assert_called_once_with()
+        mock_pool.checkin.assert_called_once_with(mock_connection)
+
+    @patch('spectacles_xix.db_ops.get_mysql_cursorclass')
+    @patch('spectacles_xix.db_ops.get_pool')
+    def test_db_cursor_connection_error(self, mock_get_pool, mock_get_class):
+        mock_pool = mock_get_pool.return_value
+        mock_connection = mock_pool.checkout.return_value
+
+        with self.assertRaises(OperationalError):
+            with db_cursor(self.config):
+                raise OperationalError('gone away')
+
+        mock_connection.rollback.assert_called_once_with()
+        mock_connection.close.assert_called_once_with()
+        mock_pool.checkin.assert_not_called()
+
+    @patch('spectacles_xix.db_ops.get_mysql_cursorclass')
+    @patch('spectacles_xix.db_ops.get_pool')
+    def test_db_cursor_rollback_error(self, mock_get_pool, mock_get_class):
+        mock_pool = mock_get_pool.return_value
+        mock_connection = mock_pool.checkout.return_value
+        mock_connection.rollback.side_effect = OperationalError('gone away')
+
+        with self.assertRaises(ValueError):
+            with self.assertLogs(level="WARNING"):
+                with db_cursor(self.config):
+                    raise ValueError
+
+        mock_connection.close.assert_called_once_with()
+        mock_pool.checkin.assert_not_called()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,131 @@
+from sqlite3 import OperationalError
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.db_pool import(
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    POOLS,
+    ConnectionPool,
+    close_pools,
+    get_pool
+    )
+
+
+class TestConnectionPool(TestCase):
+
+    def setUp(self):
+        self.mock_connect = Mock()
+        self.pool = ConnectionPool(self.mock_connect, size=2, idle_timeout=10)
+
+    def test_checkout_new(self):
+        mock_connection = Mock()
+        self.mock_connect.return_value = mock_connection
+
+        test_connection = self.pool.checkout()
+
+        self.assertEqual(test_connection, mock_connection)
+        self.mock_connect.assert_called_once_with()
+
+    def test_checkout_reuse(self):
+        mock_connection = Mock()
+        self.pool.checkin(mock_connection)
+
+        test_connection = self.pool.checkout()
+
+        self.assertEqual(test_connection, mock_connection)
+        mock_connection.ping.assert_called_once_with()
+        self.mock_connect.assert_not_called()
+
+    def test_checkout_dead(self):
+        mock_dead = Mock()
+        mock_dead.ping.side_effect = OperationalError()
+        self.pool.checkin(mock_dead)
+
+        mock_connection = Mock()
+        self.mock_connect.return_value = mock_connection
+
+        with self.assertLogs(level="WARNING"):
+            test_connection = self.pool.checkout()
+
+        self.assertEqual(test_connection, mock_connection)
+        mock_dead.close.assert_called_once_with()
+
+    def test_checkin_full(self):
+        mock_connections = [Mock(), Mock(), Mock()]
+        for mock_connection in mock_connections:
+            self.pool.checkin(mock_connection)
+
+        self.assertEqual(len(self.pool.idle), 2)
+        mock_connections[0].close.assert_not_called()
+        mock_connections[2].close.assert_called_once_with()
+
+    @patch('spectacles_xix.db_pool.monotonic')
+    def test_evict_idle(self, mock_monotonic):
+        mock_old = Mock()
+        mock_new = Mock()
+
+        mock_monotonic.return_value = 100
+        self.pool.checkin(mock_old)
+        mock_monotonic.return_value = 105
+        self.pool.checkin(mock_new)
+
+        self.pool.evict_idle(now=112)
+
+        self.assertEqual([pair[0] for pair in self.pool.idle], [mock_new])
+        mock_old.close.assert_called_once_with()
+        mock_new.close.assert_not_called()
+
+    def test_close(self):
+        mock_connection = Mock()
+        self.pool.checkin(mock_connection)
+
+        self.pool.close()
+
+        self.assertEqual(len(self.pool.idle), 0)
+        mock_connection.close.assert_called_once_with()
+
+
+class TestGetPool(TestCase):
+
+    def tearDown(self):
+        close_pools()
+
+    def test_get_pool(self):
+        test_config = {'host': 'test host', 'user': 'test', 'db': 'test db'}
+        mock_connect = Mock()
+
+        test_pool = get_pool(test_config, mock_connect)
+
+        self.assertEqual(test_pool.connect, mock_connect)
+        self.assertEqual(test_pool.size, DEFAULT_POOL_SIZE)
+        self.assertEqual(test_pool.idle_timeout, DEFAULT_IDLE_TIMEOUT)
+        self.assertIs(get_pool(test_config, Mock()), test_pool)
+
+    def test_get_pool_config(self):
+        test_config = {
+            'host': 'test host',
+            'user': 'test',
+            'db': 'test db',
+            'pool_size': '7',
+            'pool_idle_timeout': '30'
+            }
+
+        test_pool = get_pool(test_config, Mock())
+
+        self.assertEqual(test_pool.size, 7)
+        self.assertEqual(test_pool.idle_timeout, 30)
+
+    def test_close_pools(self):
+        test_config = {'host': 'test host', 'user': 'test', 'db': 'test db'}
+        mock_connection = Mock()
+
+        get_pool(test_config, Mock()).checkin(mock_connection)
+        close_pools()
+
+        self.assertEqual(POOLS, {})
+        mock_connection.close.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    main()
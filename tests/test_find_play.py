@@ -1,16 +1,21 @@
+from datetime import date, datetime
 from unittest import TestCase, main
-from unittest.mock import MagicMock, Mock, call, patch
+from unittest.mock import MagicMock, Mock, patch
 
 from spectacles_xix.find_play import(
     INPUT_DATE_FORMAT,
     get_date_object,
     get_200_years_ago,
     check_by_date,
-    get_replacements,
     expand_abbreviation,
     get_play_list,
+    make_plan,
+    get_planned_play_list,
     get_play,
-    get_and_tweet
+    get_book_cache,
+    get_config_image_store,
+    get_and_tweet,
+    uses_plan
     )
 
 
@@ -29,91 +34,39 @@ class TestTime(TestCase):
             test_string, INPUT_DATE_FORMAT
             )
 
-    @patch('spectacles_xix.find_play.relativedelta')
-    def test_get_200_years_ago(self, mock_relativedelta):
-        mock_date = 2018
-        mock_local_now = Mock()
-        mock_local_now.date.return_value = mock_date
+    def test_get_200_years_ago(self):
+        test_now = datetime(2018, 10, 15, 12)
 
-        mock_delta = -200
-        mock_relativedelta.relativedelta.return_value = mock_delta
+        test_date = get_200_years_ago(test_now)
+        self.assertEqual(test_date, date(1818, 10, 15))
 
-        target_date = mock_date + mock_delta
-        test_date = get_200_years_ago(mock_local_now)
-
-        self.assertEqual(test_date, target_date)
-
-        mock_local_now.date.assert_called_once_with()
-        mock_relativedelta.relativedelta.assert_called_once_with(
-            years=mock_delta
+    def test_get_200_years_ago_leap_day(self):
+        self.assertEqual(
+            get_200_years_ago(datetime(2024, 2, 29, 12)), date(1824, 2, 29)
+            )
+        self.assertEqual(
+            get_200_years_ago(datetime(2000, 2, 29, 12)), date(1800, 2, 28)
             )
 
 
 class TestDb(TestCase):
 
-    def setUp(self):
-        self.abbrev_match_list = [
-            ('op', 'opéra'),
-            ('com', 'comique')
-            ]
-
-    @patch('spectacles_xix.find_play.abbreviation_db')
-    def test_get_replacements(self, mock_abbreviation_db):
-        mock_cursor = Mock()
-
-        match_list = []
-        call_list = []
-        expansion_list = []
-        for match_tuple in self.abbrev_match_list:
-            mock_match = Mock()
-            mock_match.group.return_value = match_tuple[0]
-            match_list.append(mock_match)
-
-            call_list.append(call(mock_cursor, match_tuple[0]))
-            expansion_list.append(match_tuple[1])
-
-        mock_abbreviation_db.side_effect = expansion_list
-
-        test_abbrev_match = get_replacements(mock_cursor, match_list)
-        self.assertEqual(test_abbrev_match, set(self.abbrev_match_list))
-
-        mock_abbreviation_db.assert_has_calls(call_list)
-
-    @patch('spectacles_xix.find_play.get_replacements')
-    @patch('spectacles_xix.find_play.finditer')
-    def test_expand_abbreviation(self, mock_finditer, mock_get):
+    @patch('spectacles_xix.find_play.ABBREVIATIONS')
+    def test_expand_abbreviation(self, mock_abbreviations):
         mock_cursor = Mock()
         mock_phrase = 'op.-com.'
         target_expansion = 'opéra-comique'
 
-        mock_abbrev_match = ['op', 'com']
-        mock_finditer.return_value = mock_abbrev_match
-
-        mock_replacements = set(self.abbrev_match_list)
-        mock_get.return_value = mock_replacements
+        mock_abbreviations.expand.return_value = target_expansion
 
         test_expansion = expand_abbreviation(mock_cursor, mock_phrase)
         self.assertEqual(test_expansion, target_expansion)
 
-        mock_finditer.assert_called_once_with(r'(\w+)\.', mock_phrase)
-        mock_get.assert_called_once_with(mock_cursor, mock_abbrev_match)
-
-    @patch('spectacles_xix.find_play.get_replacements')
-    @patch('spectacles_xix.find_play.finditer')
-    def test_expand_abbreviation_no_match(self, mock_finditer, mock_get):
-        mock_cursor = Mock()
-        mock_phrase = 'op.-com.'
-
-        mock_abbrev_match = []
-        mock_finditer.return_value = mock_abbrev_match
-
-        test_expansion = expand_abbreviation(mock_cursor, mock_phrase)
-        self.assertEqual(test_expansion, mock_phrase)
-
-        mock_finditer.assert_called_once_with(r'(\w+)\.', mock_phrase)
-        mock_get.assert_not_called()
+        mock_abbreviations.expand.assert_called_once_with(
+            mock_cursor, mock_phrase
+            )
 
-    @patch('spectacles_xix.find_play.query_by_date')
+    @patch('spectacles_xix.find_play.query_by_date_with_fallback')
     @patch('spectacles_xix.find_play.get_200_years_ago')
     @patch('spectacles_xix.find_play.get_date_object')
     def test_check_by_date(self, mock_get_date, mock_get_200, mock_query):
@@ -123,24 +76,27 @@ class TestDb(TestCase):
         test_config = {'test': 'config'}
         test_tweeted = True
 
-        mock_date_object = Mock()
-        mock_get_date.return_value = mock_date_object
+        mock_get_date.return_value = date(1818, 10, 12)
 
-        mock_list = ['play 1', 'play 2']
+        mock_list = [
+            {'id': 1, 'greg_date': date(1818, 10, 12)},
+            {'id': 2, 'greg_date': date(1818, 10, 12)},
+            {'id': 3, 'greg_date': date(1818, 10, 1)}
+            ]
         mock_query.return_value = mock_list
 
         test_list = check_by_date(
             test_config, test_now, test_date, test_tweeted
             )
-        self.assertEqual(test_list, mock_list)
+        self.assertEqual(test_list, mock_list[:2])
 
         mock_get_date.assert_called_once_with(test_date)
         mock_query.assert_called_once_with(
-            test_config, mock_date_object, test_tweeted
+            test_config, date(1818, 10, 12), test_tweeted
             )
         mock_get_200.assert_not_called()
 
-    @patch('spectacles_xix.find_play.query_by_date')
+    @patch('spectacles_xix.find_play.query_by_date_with_fallback')
     @patch('spectacles_xix.find_play.get_200_years_ago')
     @patch('spectacles_xix.find_play.get_date_object')
     def test_check_by_date_200(self, mock_get_date, mock_get_200, mock_query):
@@ -150,10 +106,9 @@ class TestDb(TestCase):
         test_config = {'test': 'config'}
         test_tweeted = True
 
-        mock_date_object = Mock()
-        mock_get_200.return_value = mock_date_object
+        mock_get_200.return_value = date(1818, 10, 12)
 
-        mock_list = ['play 1', 'play 2']
+        mock_list = [{'id': 1, 'greg_date': date(1818, 10, 12)}]
         mock_query.return_value = mock_list
 
         test_list = check_by_date(
@@ -163,11 +118,11 @@ class TestDb(TestCase):
 
         mock_get_200.assert_called_once_with(test_now)
         mock_query.assert_called_once_with(
-            test_config, mock_date_object, test_tweeted
+            test_config, date(1818, 10, 12), test_tweeted
             )
         mock_get_date.assert_not_called()
 
-    @patch('spectacles_xix.find_play.query_by_date')
+    @patch('spectacles_xix.find_play.query_by_date_with_fallback')
     @patch('spectacles_xix.find_play.get_200_years_ago')
     @patch('spectacles_xix.find_play.get_date_object')
     def test_check_by_date_first(self, mock_get_date, mock_get_200, mock_query):
@@ -177,18 +132,10 @@ class TestDb(TestCase):
         test_config = {'test': 'config'}
         test_tweeted = True
 
-        mock_date_object = Mock()
-        mock_first_object = Mock()
-        mock_date_object.replace.return_value = mock_first_object
-        mock_get_date.return_value = mock_date_object
+        mock_get_date.return_value = date(1818, 10, 12)
 
-        get_date_calls = [
-            call(test_config, mock_date_object, test_tweeted),
-            call(test_config, mock_first_object, test_tweeted, limit=1)
-            ]
-
-        mock_list = ['play 1', 'play 2']
-        mock_query.side_effect = [[], mock_list]
+        mock_list = [{'id': 3, 'greg_date': date(1818, 10, 1)}]
+        mock_query.return_value = mock_list
 
         with self.assertLogs(level="INFO"):
             test_list = check_by_date(
@@ -196,10 +143,206 @@ class TestDb(TestCase):
                 )
         self.assertEqual(test_list, mock_list)
 
-        mock_get_date.assert_called_once_with(test_date)
-        mock_query.assert_has_calls(get_date_calls)
+        mock_query.assert_called_once_with(
+            test_config, date(1818, 10, 12), test_tweeted
+            )
         mock_get_200.assert_not_called()
 
+    @patch('spectacles_xix.find_play.query_by_date_with_fallback')
+    @patch('spectacles_xix.find_play.snapshot_by_date_with_fallback')
+    @patch('spectacles_xix.find_play.get_snapshot')
+    @patch('spectacles_xix.find_play.get_date_object')
+    def test_check_by_date_snapshot(
+            self, mock_get_date, mock_get_snapshot, mock_snapshot_query,
+            mock_query
+            ):
+        test_config = {'snapshot': 'test path'}
+        mock_get_date.return_value = date(1818, 10, 12)
+
+        mock_list = [{'id': 1, 'greg_date': date(1818, 10, 12)}]
+        mock_snapshot_query.return_value = mock_list
+
+        test_list = check_by_date(test_config, Mock(), '12-10-1818', False)
+        self.assertEqual(test_list, mock_list)
+
+        mock_get_snapshot.assert_called_once_with(test_config)
+        mock_snapshot_query.assert_called_once_with(
+            test_config, mock_get_snapshot.return_value, date(1818, 10, 12),
+            False
+            )
+        mock_query.assert_not_called()
+
+    @patch('spectacles_xix.find_play.query_by_date_with_fallback')
+    @patch('spectacles_xix.find_play.get_date_object')
+    def test_check_by_date_none(self, mock_get_date, mock_query):
+        mock_get_date.return_value = date(1818, 10, 12)
+        mock_query.return_value = []
+
+        test_list = check_by_date({}, Mock(), '12-10-1818', False)
+        self.assertEqual(test_list, [])
+
+    def test_uses_plan(self):
+        test_args = Mock(plan=True, wicks=None, date=None, force=False)
+        self.assertTrue(uses_plan(test_args))
+
+        for test_override in ({'wicks': '1'}, {'date': '15-10-1818'},
+                              {'force': True}, {'plan': False}):
+            test_args = Mock(plan=True, wicks=None, date=None, force=False)
+            test_args.configure_mock(**test_override)
+            self.assertFalse(uses_plan(test_args))
+
+    def test_make_plan(self):
+        test_slot = datetime(2018, 10, 17, 20)
+        test_list = [{'id': 1}, {'id': 2}]
+        target_plan = [
+            (datetime(2018, 10, 17, 20), 1),
+            (datetime(2018, 10, 17, 21), 2),
+            (datetime(2018, 10, 17, 22), None),
+            (datetime(2018, 10, 17, 23), None)
+            ]
+
+        test_plan = make_plan(test_slot, test_list)
+        self.assertListEqual(test_plan, target_plan)
+
+    @patch('spectacles_xix.find_play.query_by_id')
+    @patch('spectacles_xix.find_play.check_by_date')
+    @patch('spectacles_xix.find_play.prune_plan_db')
+    @patch('spectacles_xix.find_play.plan_db')
+    @patch('spectacles_xix.find_play.missed_plan_db')
+    @patch('spectacles_xix.find_play.plan_slot_db')
+    @patch('spectacles_xix.find_play.db_cursor')
+    def test_get_planned_play_list(
+            self, mock_db, mock_slot, mock_missed, mock_plan, mock_prune,
+            mock_check, mock_query
+            ):
+        test_config = {'test': 'config'}
+        test_now = datetime(2018, 10, 17, 16, 5)
+        target_slot = datetime(2018, 10, 17, 16)
+
+        mock_slot.return_value = (888,)
+        mock_missed.return_value = None
+        mock_list = ['play 1']
+        mock_query.return_value = mock_list
+
+        test_list = get_planned_play_list(test_config, test_now, False)
+        self.assertEqual(test_list, mock_list)
+
+        mock_slot.assert_called_once_with(
+            mock_db.return_value.__enter__.return_value, target_slot
+            )
+        mock_missed.assert_called_once_with(
+            mock_db.return_value.__enter__.return_value, target_slot
+            )
+        mock_query.assert_called_once_with(test_config, 888, False)
+        mock_check.assert_not_called()
+        mock_plan.assert_not_called()
+
+    @patch('spectacles_xix.find_play.query_by_id')
+    @patch('spectacles_xix.find_play.check_by_date')
+    @patch('spectacles_xix.find_play.prune_plan_db')
+    @patch('spectacles_xix.find_play.plan_db')
+    @patch('spectacles_xix.find_play.missed_plan_db')
+    @patch('spectacles_xix.find_play.plan_slot_db')
+    @patch('spectacles_xix.find_play.db_cursor')
+    def test_get_planned_play_list_missed(
+            self, mock_db, mock_slot, mock_missed, mock_plan, mock_prune,
+            mock_check, mock_query
+            ):
+        test_config = {'test': 'config'}
+        test_now = datetime(2018, 10, 17, 16, 5)
+
+        mock_slot.return_value = (None,)
+        mock_missed.return_value = (777,)
+        mock_list = ['play 1']
+        mock_query.return_value = mock_list
+
+        with self.assertLogs(level="INFO"):
+            test_list = get_planned_play_list(test_config, test_now, False)
+        self.assertEqual(test_list, mock_list)
+
+        mock_query.assert_called_once_with(test_config, 777, False)
+        mock_check.assert_not_called()
+        mock_plan.assert_not_called()
+
+    @patch('spectacles_xix.find_play.query_by_id')
+    @patch('spectacles_xix.find_play.check_by_date')
+    @patch('spectacles_xix.find_play.prune_plan_db')
+    @patch('spectacles_xix.find_play.plan_db')
+    @patch('spectacles_xix.find_play.missed_plan_db')
+    @patch('spectacles_xix.find_play.plan_slot_db')
+    @patch('spectacles_xix.find_play.db_cursor')
+    def test_get_planned_play_list_tweeted(
+            self, mock_db, mock_slot, mock_missed, mock_plan, mock_prune,
+            mock_check, mock_query
+            ):
+        test_config = {'test': 'config'}
+        test_now = datetime(2018, 10, 17, 16, 5)
+
+        mock_slot.return_value = (888,)
+
+        get_planned_play_list(test_config, test_now, True)
+
+        mock_missed.assert_not_called()
+        mock_query.assert_called_once_with(test_config, 888, True)
+
+    @patch('spectacles_xix.find_play.query_by_id')
+    @patch('spectacles_xix.find_play.check_by_date')
+    @patch('spectacles_xix.find_play.prune_plan_db')
+    @patch('spectacles_xix.find_play.plan_db')
+    @patch('spectacles_xix.find_play.missed_plan_db')
+    @patch('spectacles_xix.find_play.plan_slot_db')
+    @patch('spectacles_xix.find_play.db_cursor')
+    def test_get_planned_play_list_empty_slot(
+            self, mock_db, mock_slot, mock_missed, mock_plan, mock_prune,
+            mock_check, mock_query
+            ):
+        test_config = {'test': 'config'}
+        test_now = datetime(2018, 10, 17, 16, 5)
+
+        mock_slot.return_value = (None,)
+        mock_missed.return_value = None
+
+        test_list = get_planned_play_list(test_config, test_now, False)
+        self.assertEqual(test_list, [])
+
+        mock_query.assert_not_called()
+        mock_check.assert_not_called()
+
+    @patch('spectacles_xix.find_play.query_by_id')
+    @patch('spectacles_xix.find_play.check_by_date')
+    @patch('spectacles_xix.find_play.prune_plan_db')
+    @patch('spectacles_xix.find_play.plan_db')
+    @patch('spectacles_xix.find_play.missed_plan_db')
+    @patch('spectacles_xix.find_play.plan_slot_db')
+    @patch('spectacles_xix.find_play.db_cursor')
+    def test_get_planned_play_list_new(
+            self, mock_db, mock_slot, mock_missed, mock_plan, mock_prune,
+            mock_check, mock_query
+            ):
+        test_config = {'test': 'config'}
+        test_now = datetime(2018, 10, 17, 23, 5)
+        target_plan = [(datetime(2018, 10, 17, 23), 888)]
+
+        mock_slot.return_value = None
+        mock_check.return_value = [{'id': 888}]
+        mock_list = ['play 1']
+        mock_query.return_value = mock_list
+
+        with self.assertLogs(level="INFO"):
+            test_list = get_planned_play_list(test_config, test_now, False)
+        self.assertEqual(test_list, mock_list)
+
+        mock_check.assert_called_once_with(test_config, test_now, None, False)
+        mock_missed.assert_not_called()
+        mock_prune.assert_called_once_with(
+            mock_db.return_value.__enter__.return_value,
+            datetime(2018, 10, 17, 23)
+            )
+        mock_plan.assert_called_once_with(
+            mock_db.return_value.__enter__.return_value, target_plan
+            )
+        mock_query.assert_called_once_with(test_config, 888, False)
+
     @patch('spectacles_xix.find_play.Play')
     @patch('spectacles_xix.find_play.expand_abbreviation')
     @patch('spectacles_xix.find_play.get_200_years_ago')
@@ -233,6 +376,53 @@ class TestDb(TestCase):
             test_expanded_genre
             )
 
+    @patch('spectacles_xix.find_play.save_message_db')
+    @patch('spectacles_xix.find_play.message_db')
+    @patch('spectacles_xix.find_play.expand_abbreviation')
+    @patch('spectacles_xix.find_play.get_200_years_ago')
+    def test_get_play_stored(
+            self, mock_get_200, mock_expand, mock_message, mock_save
+            ):
+        mock_cursor = Mock()
+        test_dict = {'id': 888, 'wicks': 9999, 'genre': 'op.'}
+        test_message = 'stored message'
+
+        mock_message.return_value = test_message
+
+        with self.assertLogs(level="INFO"):
+            test_play = get_play(mock_cursor, Mock(), test_dict, True)
+
+        self.assertEqual(str(test_play), test_message)
+        mock_message.assert_called_once_with(mock_cursor, 888, False)
+        mock_expand.assert_not_called()
+        mock_save.assert_not_called()
+
+    @patch('spectacles_xix.find_play.save_message_db')
+    @patch('spectacles_xix.find_play.message_db')
+    @patch('spectacles_xix.find_play.expand_abbreviation')
+    @patch('spectacles_xix.find_play.get_200_years_ago')
+    @patch('spectacles_xix.find_play.Play')
+    def test_get_play_store_new(
+            self, mock_play_class, mock_get_200, mock_expand, mock_message,
+            mock_save
+            ):
+        mock_cursor = Mock()
+        test_dict = {'genre': 'op.'}
+
+        mock_play = MagicMock(play_id=888, ce_jour_la=' #CeJourLà')
+        mock_play.__str__.return_value = 'rendered message'
+        mock_play_class.from_dict.return_value = mock_play
+        mock_message.return_value = None
+
+        with self.assertLogs(level="INFO"):
+            get_play(mock_cursor, Mock(), test_dict, True)
+
+        mock_message.assert_called_once_with(mock_cursor, 888, True)
+        mock_expand.assert_called_once_with(mock_cursor, 'op.')
+        mock_save.assert_called_once_with(
+            mock_cursor, 888, True, 'rendered message'
+            )
+
     @patch('spectacles_xix.find_play.check_by_date')
     @patch('spectacles_xix.find_play.query_by_wicks_id')
     def test_get_play_list(self, mock_query, mock_check):
@@ -256,6 +446,23 @@ class TestDb(TestCase):
             )
         mock_check.assert_not_called()
 
+    @patch('spectacles_xix.find_play.snapshot_by_wicks_id')
+    @patch('spectacles_xix.find_play.get_snapshot')
+    @patch('spectacles_xix.find_play.query_by_wicks_id')
+    def test_get_play_list_snapshot(
+            self, mock_query, mock_get_snapshot, mock_snapshot_query
+            ):
+        test_config = {'snapshot': 'test path'}
+        mock_now = Mock()
+
+        test_list = get_play_list(test_config, '101', mock_now, None, True)
+        self.assertEqual(test_list, mock_snapshot_query.return_value)
+
+        mock_snapshot_query.assert_called_once_with(
+            test_config, mock_get_snapshot.return_value, '101', True
+            )
+        mock_query.assert_not_called()
+
     @patch('spectacles_xix.find_play.check_by_date')
     @patch('spectacles_xix.find_play.query_by_wicks_id')
     def test_get_play_list_by_date(self, mock_query, mock_check):
@@ -300,11 +507,38 @@ class TestDb(TestCase):
             test_config, mock_now, test_date, test_tweeted
             )
 
-    @patch('spectacles_xix.find_play.send_tweet')
+    def test_get_book_cache(self):
+        mock_cursor = Mock()
+        test_config = {
+            'books': {'cache': 'yes', 'cache_days': '10'}
+            }
+
+        test_cache = get_book_cache(mock_cursor, test_config)
+
+        self.assertEqual(test_cache.cursor, mock_cursor)
+        self.assertEqual(test_cache.cache_days, 10)
+
+    def test_get_book_cache_off(self):
+        self.assertIsNone(get_book_cache(Mock(), {}))
+        self.assertIsNone(get_book_cache(Mock(), {'books': {'cache': 'no'}}))
+
+    @patch('spectacles_xix.find_play.get_image_store')
+    def test_get_config_image_store(self, mock_get_store):
+        test_config = {'books': {'image_cache_mb': '5'}}
+
+        test_store = get_config_image_store(test_config)
+
+        self.assertEqual(test_store, mock_get_store.return_value)
+        self.assertEqual(mock_get_store.call_args[0][1], 5 * 1024 * 1024)
+
+    @patch('spectacles_xix.find_play.get_config_image_store')
+    @patch('spectacles_xix.find_play.publish_play')
     @patch('spectacles_xix.find_play.check_books_api')
     @patch('spectacles_xix.find_play.get_play')
     @patch('spectacles_xix.find_play.db_cursor')
-    def test_get_and_tweet(self, mock_db, mock_get, mock_check, mock_send):
+    def test_get_and_tweet(
+            self, mock_db, mock_get, mock_check, mock_send, mock_store
+            ):
         test_book = True
         test_no_tweet = False
 
@@ -344,21 +578,25 @@ class TestDb(TestCase):
 
         mock_db.assert_called_with(test_config_db)
         mock_get.assert_called_once_with(
-            mock_cursor, mock_now, test_play_dict
+            mock_cursor, mock_now, test_play_dict, False
+            )
+        mock_check.assert_called_once_with(
+            test_book, test_path, mock_play, None
             )
-        mock_check.assert_called_once_with(test_book, test_path, mock_play)
         mock_result.get_better_book_url.assert_called_once_with()
-        mock_result.get_image_file.assert_called_once_with()
+        mock_result.get_image_file.assert_called_once_with(
+            mock_store.return_value
+            )
 
         mock_send.assert_called_once_with(
             mock_cursor,
-            test_config_twitter,
+            test_config,
             test_play_dict['id'],
             target_tweet,
             mock_image
             )
 
-    @patch('spectacles_xix.find_play.send_tweet')
+    @patch('spectacles_xix.find_play.publish_play')
     @patch('spectacles_xix.find_play.check_books_api')
     @patch('spectacles_xix.find_play.get_play')
     @patch('spectacles_xix.find_play.db_cursor')
@@ -401,9 +639,11 @@ class TestDb(TestCase):
 
         mock_db.assert_called_with(test_config_db)
         mock_get.assert_called_once_with(
-            mock_cursor, mock_now, test_play_dict
+            mock_cursor, mock_now, test_play_dict, False
+            )
+        mock_check.assert_called_once_with(
+            test_book, test_path, mock_play, None
             )
-        mock_check.assert_called_once_with(test_book, test_path, mock_play)
         mock_result.get_better_book_url.assert_not_called()
         mock_result.get_image_file.assert_not_called()
 
@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from spectacles_xix import french_date
+from spectacles_xix.french_date import (
+    build_year_table, format_date, format_date_uncached, get_year_table
+    )
+
+
+class TestFrenchDate(TestCase):
+
+    def test_format_date_uncached(self):
+        self.assertEqual(
+            format_date_uncached(date(1818, 10, 15)),
+            'jeudi le 15 octobre 1818'
+            )
+        self.assertEqual(
+            format_date_uncached(date(1830, 8, 1)),
+            'dimanche le 01 août 1830'
+            )
+        self.assertEqual(
+            format_date_uncached(datetime(1805, 2, 4, 20)),
+            'lundi le 04 février 1805'
+            )
+
+    def test_build_year_table(self):
+        self.assertEqual(len(build_year_table(1818)), 365)
+
+        test_table = build_year_table(1824)
+        self.assertEqual(len(test_table), 366)
+        self.assertEqual(test_table[0], 'jeudi le 01 janvier 1824')
+        self.assertEqual(test_table[59], 'dimanche le 29 février 1824')
+        self.assertEqual(test_table[-1], 'vendredi le 31 décembre 1824')
+
+    def test_format_date(self):
+        test_date = date(1824, 1, 1)
+        while test_date.year == 1824:
+            self.assertEqual(
+                format_date(test_date), format_date_uncached(test_date)
+                )
+            test_date += timedelta(days=1)
+
+    @patch.dict('spectacles_xix.french_date.YEAR_TABLES', clear=True)
+    @patch('spectacles_xix.french_date.build_year_table')
+    def test_get_year_table(self, mock_build):
+        mock_build.return_value = ('test table',)
+
+        self.assertEqual(get_year_table(1818), ('test table',))
+        self.assertEqual(get_year_table(1818), ('test table',))
+        mock_build.assert_called_once_with(1818)
+
+    @patch('spectacles_xix.french_date.get_year_table')
+    def test_format_date_outside_corpus(self, mock_get_table):
+        test_date = date(french_date.LAST_YEAR + 1, 10, 15)
+
+        self.assertEqual(
+            format_date(test_date), format_date_uncached(test_date)
+            )
+        mock_get_table.assert_not_called()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from spectacles_xix.http_session import TransportSession
+from spectacles_xix.transport import RETRY_STATUSES
+
+
+class TestTransportSession(TestCase):
+
+    def test_transport_session(self):
+        test_session = TransportSession(timeout=5, retries=2)
+        test_adapter = test_session.get_adapter('https://example.com')
+        test_retry = test_adapter.max_retries
+
+        self.assertEqual(test_session.timeout, 5)
+        self.assertEqual(test_retry.total, 2)
+        self.assertEqual(set(test_retry.status_forcelist), set(RETRY_STATUSES))
+
+    @patch('spectacles_xix.http_session.Session.request')
+    def test_request_timeout(self, mock_request):
+        test_session = TransportSession(timeout=5)
+
+        test_session.request('GET', 'https://example.com/')
+        test_session.request('GET', 'https://example.com/', timeout=1)
+
+        self.assertEqual(mock_request.call_args_list[0][1]['timeout'], 5)
+        self.assertEqual(mock_request.call_args_list[1][1]['timeout'], 1)
+
+
+if __name__ == '__main__':
+    main()
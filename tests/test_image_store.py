@@ -0,0 +1,184 @@
+from hashlib import sha256
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import MagicMock, patch
+
+from requests import ConnectionError as RequestsConnectionError, HTTPError
+
+from spectacles_xix.image_store import(
+    REVALIDATE_SECONDS, ImageStore, get_image_store
+    )
+
+TEST_URL = 'https://example.com/image?zoom=3'
+TEST_CONTENT = b'title page image'
+
+
+def mock_response(status_code=200, content=TEST_CONTENT, headers=None):
+    response = MagicMock(status_code=status_code, headers=headers or {})
+    response.__enter__.return_value = response
+    response.iter_content.return_value = [content[:5], content[5:]]
+    return response
+
+
+class TestImageStore(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.store = ImageStore(self.tmp_dir.name, max_bytes=1000)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_read(self, mock_session):
+        mock_get = mock_session.return_value.get
+        mock_get.return_value = mock_response(headers={'ETag': '"abc"'})
+
+        test_content = self.store.read(TEST_URL)
+
+        self.assertEqual(test_content, TEST_CONTENT)
+        self.assertEqual(
+            self.store.index[TEST_URL]['hash'],
+            sha256(TEST_CONTENT).hexdigest()
+            )
+        self.assertEqual(self.store.index[TEST_URL]['etag'], '"abc"')
+        mock_get.assert_called_once()
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_read_cached(self, mock_session):
+        mock_get = mock_session.return_value.get
+        mock_get.return_value = mock_response()
+
+        self.store.read(TEST_URL)
+        test_content = self.store.read(TEST_URL)
+
+        self.assertEqual(test_content, TEST_CONTENT)
+        mock_get.assert_called_once()
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_read_index_persisted(self, mock_session):
+        mock_get = mock_session.return_value.get
+        mock_get.return_value = mock_response()
+
+        self.store.read(TEST_URL)
+        test_store = ImageStore(self.tmp_dir.name)
+        test_content = test_store.read(TEST_URL)
+
+        self.assertEqual(test_content, TEST_CONTENT)
+        mock_get.assert_called_once()
+
+    @patch('spectacles_xix.image_store.time')
+    @patch('spectacles_xix.image_store.get_session')
+    def test_revalidate(self, mock_session, mock_time):
+        mock_get = mock_session.return_value.get
+        mock_time.return_value = 1000
+        mock_get.return_value = mock_response(headers={'ETag': '"abc"'})
+        self.store.read(TEST_URL)
+
+        mock_time.return_value = 1000 + REVALIDATE_SECONDS + 1
+        mock_get.return_value = mock_response(status_code=304)
+        test_content = self.store.read(TEST_URL)
+
+        self.assertEqual(test_content, TEST_CONTENT)
+        self.assertEqual(
+            mock_get.call_args[1]['headers'], {'If-None-Match': '"abc"'}
+            )
+        self.assertEqual(
+            self.store.index[TEST_URL]['checked'],
+            1000 + REVALIDATE_SECONDS + 1
+            )
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_deduplicate(self, mock_session):
+        mock_get = mock_session.return_value.get
+        mock_get.side_effect = [mock_response(), mock_response()]
+
+        self.store.read(TEST_URL)
+        self.store.read('https://example.com/other')
+
+        objects = list(Path(self.tmp_dir.name, 'objects').glob('*/*'))
+        self.assertEqual(len(objects), 1)
+        self.assertEqual(len(list(Path(self.tmp_dir.name).glob('tmp*'))), 0)
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_evict(self, mock_session):
+        mock_get = mock_session.return_value.get
+        self.store.max_bytes = 30
+        mock_get.side_effect = [
+            mock_response(content=b'a' * 20), mock_response(content=b'b' * 20)
+            ]
+
+        self.store.read(TEST_URL)
+        self.store.read('https://example.com/other')
+
+        self.assertNotIn(TEST_URL, self.store.index)
+        self.assertIn('https://example.com/other', self.store.index)
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_read_http_error(self, mock_session):
+        test_response = mock_response(status_code=404)
+        test_response.raise_for_status.side_effect = HTTPError('404')
+        mock_session.return_value.get.return_value = test_response
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.store.read(TEST_URL))
+
+        self.assertNotIn(TEST_URL, self.store.index)
+        self.assertEqual(len(list(Path(self.tmp_dir.name).glob('tmp*'))), 0)
+
+    @patch('spectacles_xix.image_store.time')
+    @patch('spectacles_xix.image_store.get_session')
+    def test_revalidate_error(self, mock_session, mock_time):
+        mock_get = mock_session.return_value.get
+        mock_time.return_value = 1000
+        mock_get.return_value = mock_response()
+        self.store.read(TEST_URL)
+
+        mock_time.return_value = 1000 + REVALIDATE_SECONDS + 1
+        mock_get.side_effect = RequestsConnectionError('no route')
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.store.read(TEST_URL))
+        self.assertEqual(len(self.store.pinned), 0)
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_read_releases(self, mock_session):
+        mock_session.return_value.get.return_value = mock_response()
+
+        self.store.read(TEST_URL)
+
+        self.assertEqual(len(self.store.pinned), 0)
+
+    @patch('spectacles_xix.image_store.get_session')
+    def test_evict_pinned(self, mock_session):
+        mock_get = mock_session.return_value.get
+        mock_get.side_effect = [
+            mock_response(content=b'a' * 20), mock_response(content=b'b' * 20)
+            ]
+        self.store.read(TEST_URL)
+        self.store.read('https://example.com/other')
+
+        # The older image is being read by another thread
+        test_path = self.store.fetch(TEST_URL)
+        self.store.max_bytes = 30
+        self.store.evict()
+
+        self.assertTrue(test_path.exists())
+        self.assertIn(TEST_URL, self.store.index)
+        self.assertNotIn('https://example.com/other', self.store.index)
+
+        self.store.release(test_path)
+        self.store.max_bytes = 10
+        self.store.evict()
+        self.assertFalse(test_path.exists())
+
+    def test_get_image_store(self):
+        test_store = get_image_store(self.tmp_dir.name, 500)
+
+        self.assertIs(get_image_store(self.tmp_dir.name, 600), test_store)
+        self.assertEqual(test_store.max_bytes, 600)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+from unittest import TestCase, main
+
+from util.import_db import get_changed_rows
+
+
+class TestChangedRows(TestCase):
+
+    def test_get_changed_rows(self):
+        test_rows = [
+            [1, 'unchanged', 'hash 1'],
+            [2, 'changed', 'new hash 2'],
+            [3, 'new', 'hash 3'],
+            [4, 'unchanged', 'hash 4']
+            ]
+        stored_hashes = {1: 'hash 1', 2: 'hash 2', 4: 'hash 4', 5: 'hash 5'}
+        counts = {'unchanged': 0}
+
+        self.assertListEqual(
+            list(get_changed_rows(test_rows, stored_hashes, counts)),
+            [[2, 'changed', 'new hash 2'], [3, 'new', 'hash 3']]
+            )
+        self.assertEqual(counts['unchanged'], 2)
+
+
+if __name__ == '__main__':
+    main()
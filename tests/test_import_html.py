@@ -0,0 +1,123 @@
+from datetime import datetime
+from io import StringIO
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from util.import_html import (
+    UPSERTQ,
+    add_row_hashes,
+    get_row_hash,
+    get_row_ranges,
+    parse_table,
+    parse_table_parallel
+    )
+
+TEST_HTML = """<html><body>
+<table border="1">
+<tr><th>ID</th><th>Wicks</th><th>Skip</th><th>Title</th></tr>
+<tr>
+<td>1</td><td>101</td><td>skipped</td><td>Arlequin &amp; Colombine</td>
+<td>Foo</td><td>com.</td><td>1</td><td>a</td><td></td><td>TF</td>
+<td>skipped</td><td>15-10-1818</td><td>Notes &eacute;crites</td>
+</tr>
+<tr>
+<td>2</td><td>102</td><td>skipped</td><td>Sans date</td>
+<td>Bar</td><td>vaud.</td><td>2</td><td>a</td><td></td><td>TF</td>
+<td>skipped</td><td></td><td></td>
+</tr>
+<tr>
+<td>3</td><td>103</td><td>skipped</td>
+<td>Le  <i>Barbier</i> de S&eacute;ville</td><td>Baz</td><td>op.</td>
+<td></td><td>tabl</td><td>Rossini</td><td>TI</td>
+<td>skipped</td><td>01-11-1824</td><td></td>
+</tr>
+</table>
+<table>
+<tr>
+<td>4</td><td>104</td><td>skipped</td><td>Second table</td>
+<td>Qux</td><td>com.</td><td>1</td><td>a</td><td></td><td>TF</td>
+<td>skipped</td><td>15-10-1818</td><td></td>
+</tr>
+</table>
+</body></html>
+"""
+
+TEST_ROWS = [
+    [
+        1, '101', 'Arlequin & Colombine', 'Foo', 'com.', 1, 'a', '', 'TF',
+        datetime(1818, 10, 15), 'Notes écrites'
+        ],
+    # The text fragments of a cell are stripped and joined without spaces
+    [
+        3, '103', 'LeBarbierde Séville', 'Baz', 'op.', 0, 'tabl', 'Rossini',
+        'TI', datetime(1824, 11, 1), ''
+        ]
+    ]
+
+
+class TestParseTable(TestCase):
+
+    @patch('util.import_html.CHUNK_SIZE', 7)
+    def test_parse_table(self):
+        self.assertListEqual(
+            list(parse_table(StringIO(TEST_HTML))), TEST_ROWS
+            )
+
+    def test_parse_table_one_chunk(self):
+        self.assertListEqual(
+            list(parse_table(StringIO(TEST_HTML))), TEST_ROWS
+            )
+
+
+    @patch('util.import_html.CHUNK_SIZE', 7)
+    def test_get_row_ranges(self):
+        test_ranges = list(get_row_ranges(StringIO(TEST_HTML), 100))
+
+        self.assertGreater(len(test_ranges), 1)
+        for test_range in test_ranges[1:]:
+            self.assertTrue(test_range.startswith('<tr'))
+        self.assertNotIn('Second table', ''.join(test_ranges))
+
+    @patch('util.import_html.CHUNK_SIZE', 7)
+    def test_parse_table_parallel(self):
+        self.assertListEqual(
+            list(parse_table_parallel(StringIO(TEST_HTML), 2, 100)),
+            list(parse_table(StringIO(TEST_HTML)))
+            )
+
+
+class TestRowHash(TestCase):
+
+    def test_get_row_hash(self):
+        test_row = list(TEST_ROWS[0])
+        test_hash = get_row_hash(test_row)
+
+        self.assertEqual(get_row_hash(list(test_row)), test_hash)
+        test_row[2] = 'Arlequin & Pierrot'
+        self.assertNotEqual(get_row_hash(test_row), test_hash)
+        test_row[2] = TEST_ROWS[0][2]
+        test_row[9] = datetime(1818, 10, 16)
+        self.assertNotEqual(get_row_hash(test_row), test_hash)
+
+    def test_add_row_hashes(self):
+        test_rows = list(add_row_hashes(TEST_ROWS))
+
+        self.assertListEqual(
+            [row[:-1] for row in test_rows], TEST_ROWS
+            )
+        self.assertListEqual(
+            [row[-1] for row in test_rows],
+            [get_row_hash(row) for row in TEST_ROWS]
+            )
+
+    def test_upsert_keeps_last_tweeted(self):
+        update_list = UPSERTQ.split('ON DUPLICATE KEY UPDATE')[1]
+
+        self.assertIn('row_hash = VALUES(row_hash)', update_list)
+        self.assertIn('title = VALUES(title)', update_list)
+        self.assertNotIn('last_tweeted', update_list)
+        self.assertNotIn('id = VALUES(id)', update_list)
+
+
+if __name__ == '__main__':
+    main()
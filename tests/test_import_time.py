@@ -0,0 +1,48 @@
+"""
+Imports of the command line entry point: a run that finds nothing to tweet
+should not load the Google, Twitter or HTTP libraries
+"""
+import json
+from pathlib import Path
+from subprocess import PIPE, run
+import sys
+from unittest import TestCase, main
+
+HEAVY_MODULES = [
+    'asyncio',
+    'dateutil',
+    'google.oauth2',
+    'googleapiclient',
+    'httplib2',
+    'requests',
+    'twitter'
+    ]
+
+IMPORT_SCRIPT = """import json, sys
+import spectacles_xix.__main__
+print(json.dumps(sorted(sys.modules)))
+"""
+
+
+class TestImportTime(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        result = run(
+            [sys.executable, '-c', IMPORT_SCRIPT],
+            stdout=PIPE,
+            stderr=PIPE,
+            universal_newlines=True,
+            cwd=str(Path(__file__).resolve().parents[1]),
+            check=True
+            )
+        cls.modules = set(json.loads(result.stdout))
+
+    def test_heavy_modules(self):
+        self.assertListEqual(
+            [module for module in HEAVY_MODULES if module in self.modules], []
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from util.import_tsv import UPSERTQ, get_row_hash, load_tsv
+
+
+class TestRowHash(TestCase):
+
+    def test_get_row_hash(self):
+        test_hash = get_row_hash(['op.', 'opéra', None])
+
+        self.assertEqual(get_row_hash(['op.', 'opéra', None]), test_hash)
+        self.assertNotEqual(
+            get_row_hash(['op.', 'opérette', None]), test_hash
+            )
+        self.assertNotEqual(
+            get_row_hash(['op.', 'opéra', 'note']), test_hash
+            )
+
+    def test_load_tsv(self):
+        with TemporaryDirectory() as tmp_dir:
+            path = Path(tmp_dir, 'abbreviations.tsv')
+            path.write_text('op.\topéra\nvaud.\tvaudeville\tnote\n')
+            test_rows = list(load_tsv(str(path)))
+
+        self.assertListEqual(
+            test_rows,
+            [
+                ['op.', 'opéra', None, get_row_hash(['op.', 'opéra', None])],
+                [
+                    'vaud.', 'vaudeville', 'note',
+                    get_row_hash(['vaud.', 'vaudeville', 'note'])
+                    ]
+                ]
+            )
+
+    def test_upsert_updates_hash(self):
+        for table_name, upsertq in UPSERTQ.items():
+            update_list = upsertq.split('ON DUPLICATE KEY UPDATE')[1]
+            self.assertIn('row_hash = VALUES(row_hash)', update_list)
+            self.assertNotIn('last_tweeted', update_list, table_name)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from spectacles_xix import metrics
+from spectacles_xix.metrics import (
+    NULL_SPAN,
+    RunRecorder,
+    format_prometheus,
+    get_textfile_path,
+    record_run,
+    span,
+    write_textfile
+    )
+
+TEST_RECORD = {
+    'started': '2018-10-15T12:00:00',
+    'seconds': 1.5,
+    'stages': {
+        'search_api': {'calls': 1, 'seconds': 0.25},
+        'upload_image': {'calls': 2, 'seconds': 0.5}
+        }
+    }
+
+
+class TestSpan(TestCase):
+
+    def test_span_disabled(self):
+        self.assertIsNone(metrics.RECORDER)
+        self.assertIs(span('test'), NULL_SPAN)
+
+        with span('test'):
+            pass
+
+    def test_recorder(self):
+        recorder = RunRecorder()
+        recorder.add('test', 0.5)
+        recorder.add('test', 0.25)
+        recorder.add('other', 1)
+        recorder.finish()
+
+        test_record = recorder.get_record()
+        self.assertDictEqual(test_record['stages'], {
+            'other': {'calls': 1, 'seconds': 1},
+            'test': {'calls': 2, 'seconds': 0.75}
+            })
+        self.assertGreaterEqual(test_record['seconds'], 0)
+
+    def test_record_run(self):
+        with self.assertLogs(level="INFO"):
+            with record_run(True, {}) as recorder:
+                with span('test'):
+                    pass
+                with span('test'):
+                    pass
+
+        self.assertIsNone(metrics.RECORDER)
+        self.assertEqual(recorder.get_record()['stages']['test']['calls'], 2)
+
+    def test_record_run_disabled(self):
+        with record_run(False, {}) as recorder:
+            self.assertIsNone(recorder)
+            self.assertIs(span('test'), NULL_SPAN)
+
+    @patch('spectacles_xix.metrics.write_textfile')
+    def test_record_run_error(self, mock_write):
+        test_config = {'metrics': {'textfile': 'test path'}}
+
+        with self.assertRaises(ValueError), self.assertLogs(level="INFO"):
+            with record_run(True, test_config):
+                with span('test'):
+                    raise ValueError
+
+        self.assertIsNone(metrics.RECORDER)
+        test_path, test_record = mock_write.call_args[0]
+        self.assertEqual(test_path, 'test path')
+        self.assertEqual(test_record['stages']['test']['calls'], 1)
+
+
+class TestPrometheus(TestCase):
+
+    def test_format_prometheus(self):
+        test_text = format_prometheus(TEST_RECORD, 1539604800)
+
+        self.assertIn('spectacles_xix_run_seconds 1.5\n', test_text)
+        self.assertIn(
+            'spectacles_xix_last_run_timestamp_seconds 1539604800.000\n',
+            test_text
+            )
+        self.assertIn(
+            'spectacles_xix_stage_seconds{stage="search_api"} 0.25\n',
+            test_text
+            )
+        self.assertIn(
+            'spectacles_xix_stage_calls{stage="upload_image"} 2\n', test_text
+            )
+        self.assertIn('# TYPE spectacles_xix_stage_calls gauge\n', test_text)
+
+    def test_write_textfile(self):
+        with TemporaryDirectory() as tmp_dir:
+            test_path = str(Path(tmp_dir, 'spectacles_xix.prom'))
+            write_textfile(test_path, TEST_RECORD)
+
+            self.assertIn(
+                'spectacles_xix_run_seconds 1.5',
+                Path(test_path).read_text()
+                )
+            self.assertListEqual(
+                [path.name for path in Path(tmp_dir).iterdir()],
+                ['spectacles_xix.prom']
+                )
+
+    def test_write_textfile_error(self):
+        with self.assertLogs(level="ERROR"):
+            write_textfile('/nonexistent/spectacles_xix.prom', TEST_RECORD)
+
+    def test_get_textfile_path(self):
+        self.assertIsNone(get_textfile_path({}))
+        self.assertEqual(
+            get_textfile_path({'metrics': {'textfile': 'test path'}}),
+            'test path'
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -104,6 +104,7 @@ class TestPlay(TestCase):
         out_dict['play_id'] = out_dict.pop('id')
         out_dict['play_format'] = out_dict.pop('format')
         out_dict['expanded_genre'] = ''
+        out_dict['description'] = None
         play = Play.from_dict(in_dict)
         self.assertDictEqual(play.__dict__, out_dict)
 
@@ -130,6 +131,12 @@ class TestPlay(TestCase):
 
         self.assertEqual(self.play.ce_jour_la, target_ce_jour_la)
 
+    def test_get_dict_date_string(self):
+        play = Play.from_dict(TEST_DICT)
+        self.assertEqual(
+            play.get_dict()['date_string'], 'jeudi le 01 janvier 1818'
+            )
+
     def test_get_genre_phrase_blank(self):
         self.play.play_format = ''
         target_genre_phrase = ''
@@ -299,6 +306,35 @@ class TestRepr(TestCase):
         self.assertEqual(test_description, target_description)
         mock_gp.assert_called_once_with()
 
+    @patch('spectacles_xix.play.Play.get_dict')
+    def test_repr_memoized(self, mock_get_dict):
+        mock_get_dict.return_value = self.test_dict
+
+        test_description = str(self.test_play)
+        self.assertEqual(str(self.test_play), test_description)
+        mock_get_dict.assert_called_once_with()
+
+    @patch('spectacles_xix.play.Play.get_dict')
+    def test_repr_invalidated(self, mock_get_dict):
+        mock_get_dict.return_value = self.test_dict
+
+        str(self.test_play)
+        self.test_play.set_today(TEST_DICT['greg_date'])
+        str(self.test_play)
+        self.test_play.set_expanded_genre('opéra-comique')
+        str(self.test_play)
+
+        self.assertEqual(mock_get_dict.call_count, 3)
+
+    @patch('spectacles_xix.play.Play.get_dict')
+    def test_repr_set_description(self, mock_get_dict):
+        test_description = 'Pre-rendered description'
+
+        self.test_play.set_description(test_description)
+
+        self.assertEqual(str(self.test_play), test_description)
+        mock_get_dict.assert_not_called()
+
 
 if __name__ == '__main__':
     main()
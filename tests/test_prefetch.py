@@ -0,0 +1,144 @@
+from datetime import datetime
+from unittest import TestCase, main
+from unittest.mock import Mock, call, patch
+
+from spectacles_xix.prefetch import(
+    RateLimiter, get_upcoming_plays, prefetch, prefetch_play
+    )
+
+TEST_CONFIG = {
+    'db': {'test': 'db'},
+    'path': {'google_service_account': '/path/to/service/account'},
+    'books': {'cache': 'yes'}
+    }
+
+
+class TestRateLimiter(TestCase):
+
+    @patch('spectacles_xix.prefetch.sleep')
+    @patch('spectacles_xix.prefetch.monotonic')
+    def test_wait(self, mock_monotonic, mock_sleep):
+        mock_monotonic.return_value = 100
+        limiter = RateLimiter(2)
+
+        limiter.wait()
+        mock_sleep.assert_not_called()
+
+        limiter.wait()
+        mock_sleep.assert_called_once_with(0.5)
+
+
+class TestPrefetch(TestCase):
+
+    @patch('spectacles_xix.prefetch.check_by_date')
+    def test_get_upcoming_plays(self, mock_check):
+        test_now = datetime(2018, 10, 17, 9)
+        mock_check.side_effect = [
+            [{'id': 1}, {'id': 2}], [{'id': 2}], [{'id': 3}]
+            ]
+
+        test_list = get_upcoming_plays(TEST_CONFIG['db'], test_now, 3)
+
+        self.assertListEqual(test_list, [{'id': 1}, {'id': 2}, {'id': 3}])
+        self.assertEqual(
+            mock_check.mock_calls[1],
+            call(TEST_CONFIG['db'], datetime(2018, 10, 18, 9), None, False)
+            )
+
+    @patch('spectacles_xix.prefetch.check_books_api')
+    @patch('spectacles_xix.prefetch.get_book_cache')
+    @patch('spectacles_xix.prefetch.db_cursor')
+    @patch('spectacles_xix.prefetch.Play')
+    def test_prefetch_play_cached(
+            self, mock_play, mock_db, mock_get_cache, mock_check
+            ):
+        mock_limiter = Mock()
+        mock_get_cache.return_value.get.return_value = Mock()
+
+        test_outcome = prefetch_play(TEST_CONFIG, mock_limiter, {'id': 1})
+
+        self.assertEqual(test_outcome, 'cached')
+        mock_limiter.wait.assert_not_called()
+        mock_check.assert_not_called()
+
+    @patch('spectacles_xix.prefetch.get_config_image_store')
+    @patch('spectacles_xix.prefetch.check_books_api')
+    @patch('spectacles_xix.prefetch.get_book_cache')
+    @patch('spectacles_xix.prefetch.db_cursor')
+    @patch('spectacles_xix.prefetch.Play')
+    def test_prefetch_play_found(
+            self, mock_play, mock_db, mock_get_cache, mock_check, mock_store
+            ):
+        mock_limiter = Mock()
+        mock_cache = mock_get_cache.return_value
+        mock_cache.get.return_value = None
+        mock_result = Mock(book_url='http://example.com/book')
+        mock_check.return_value = mock_result
+
+        test_outcome = prefetch_play(TEST_CONFIG, mock_limiter, {'id': 1})
+
+        self.assertEqual(test_outcome, 'found')
+        mock_limiter.wait.assert_called_once_with()
+        mock_check.assert_called_once_with(
+            True, '/path/to/service/account',
+            mock_play.from_dict.return_value, mock_cache
+            )
+        mock_store.assert_called_once_with(TEST_CONFIG)
+        mock_result.get_image_file.assert_called_once_with(
+            mock_store.return_value
+            )
+
+    @patch('spectacles_xix.prefetch.check_books_api')
+    @patch('spectacles_xix.prefetch.get_book_cache')
+    @patch('spectacles_xix.prefetch.db_cursor')
+    @patch('spectacles_xix.prefetch.Play')
+    def test_prefetch_play_not_found(
+            self, mock_play, mock_db, mock_get_cache, mock_check
+            ):
+        mock_get_cache.return_value.get.return_value = None
+        mock_result = Mock(book_url='')
+        mock_check.return_value = mock_result
+
+        test_outcome = prefetch_play(TEST_CONFIG, Mock(), {'id': 1})
+
+        self.assertEqual(test_outcome, 'not found')
+        mock_result.get_image_file.assert_not_called()
+
+    @patch('spectacles_xix.prefetch.prefetch_play')
+    @patch('spectacles_xix.prefetch.get_upcoming_plays')
+    @patch('spectacles_xix.prefetch.get_local_now')
+    def test_prefetch(self, mock_now, mock_upcoming, mock_prefetch_play):
+        mock_upcoming.return_value = [{'id': 1}, {'id': 2}, {'id': 3}]
+        mock_prefetch_play.side_effect = ['found', 'cached', 'found']
+
+        with self.assertLogs(level="INFO"):
+            test_outcomes = prefetch(TEST_CONFIG, days=2, workers=1)
+
+        self.assertDictEqual(dict(test_outcomes), {'found': 2, 'cached': 1})
+        mock_upcoming.assert_called_once_with(
+            TEST_CONFIG['db'], mock_now.return_value, 2
+            )
+
+    @patch('spectacles_xix.prefetch.prefetch_play')
+    @patch('spectacles_xix.prefetch.get_upcoming_plays')
+    @patch('spectacles_xix.prefetch.get_local_now')
+    def test_prefetch_error(self, mock_now, mock_upcoming, mock_prefetch_play):
+        mock_upcoming.return_value = [{'id': 1}, {'id': 2}, {'id': 3}]
+        mock_prefetch_play.side_effect = [
+            'found', ValueError('bad response'), 'not found'
+            ]
+
+        with self.assertLogs(level="INFO") as test_logs:
+            test_outcomes = prefetch(TEST_CONFIG, days=2, workers=1)
+
+        self.assertDictEqual(
+            dict(test_outcomes), {'found': 1, 'error': 1, 'not found': 1}
+            )
+        self.assertIn(
+            'Error prefetching play 2: bad response',
+            '\n'.join(test_logs.output)
+            )
+
+
+if __name__ == '__main__':
+    main()
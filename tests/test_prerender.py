@@ -0,0 +1,94 @@
+from datetime import date
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.prerender import(
+    PrerenderStats,
+    prerender,
+    render_batch,
+    render_variants
+    )
+
+TEST_TABLE = {'vaud': 'vaudeville'}
+
+TEST_ROW = {
+    'id': 999,
+    'wicks': 9999,
+    'author': 'Foo',
+    'title': 'Arlequin le Baz',
+    'acts': 1,
+    'format': 'a',
+    'music': None,
+    'genre': 'vaud.',
+    'theater_code': 'TMA',
+    'theater_name': 'Théâtre du Marais',
+    'greg_date': date(1818, 10, 17),
+    'rev_date': None
+    }
+
+
+class TestRender(TestCase):
+
+    def test_render_variants(self):
+        test_messages = render_variants(TEST_TABLE, TEST_ROW)
+
+        self.assertEqual(len(test_messages), 2)
+        self.assertEqual(test_messages[0][:2], (999, False))
+        self.assertEqual(test_messages[1][:2], (999, True))
+        self.assertNotIn('#CeJourLà', test_messages[0][2])
+        self.assertIn('#CeJourLà', test_messages[1][2])
+        self.assertIn(' vaudeville en 1 acte,', test_messages[0][2])
+
+    def test_render_batch(self):
+        test_messages = render_batch(TEST_TABLE, [TEST_ROW, TEST_ROW])
+        self.assertEqual(len(test_messages), 4)
+
+
+class TestPrerenderStats(TestCase):
+
+    def test_add(self):
+        stats = PrerenderStats()
+        stats.add([(1, False, 'short'), (2, True, 'x' * 281)])
+
+        self.assertEqual(stats.message_count, 2)
+        self.assertListEqual(stats.too_long, [(2, 281)])
+
+        with self.assertLogs(level="WARNING"):
+            stats.report()
+
+
+class TestPrerender(TestCase):
+
+    @patch('spectacles_xix.prerender.ProcessPoolExecutor')
+    @patch('spectacles_xix.prerender.save_messages_db')
+    @patch('spectacles_xix.prerender.stream_plays_db')
+    @patch('spectacles_xix.prerender.abbreviations_db')
+    @patch('spectacles_xix.prerender.db_cursor')
+    def test_prerender(
+            self, mock_db, mock_abbrev, mock_stream, mock_save, mock_executor
+            ):
+        test_config = {'test': 'config'}
+        test_batches = [['row 1', 'row 2'], ['row 3']]
+        mock_abbrev.return_value = {'op': 'opéra'}
+        mock_stream.return_value = iter(test_batches)
+
+        mock_pool = mock_executor.return_value.__enter__.return_value
+        mock_pool.submit.side_effect = lambda func, table, rows: Mock(
+            result=Mock(return_value=[(row, False, row) for row in rows])
+            )
+
+        with self.assertLogs(level="INFO"):
+            test_stats = prerender(test_config, workers=1, batch_size=2)
+
+        self.assertEqual(test_stats.message_count, 3)
+        mock_stream.assert_called_once_with(
+            mock_db.return_value.__enter__.return_value, 2
+            )
+        self.assertEqual(mock_pool.submit.call_count, 2)
+        self.assertEqual(mock_save.call_count, 2)
+        mock_executor.assert_called_once_with(max_workers=1)
+        self.assertEqual(mock_pool.submit.call_args[0][1], {'op': 'opéra'})
+
+
+if __name__ == '__main__':
+    main()
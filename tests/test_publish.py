@@ -0,0 +1,542 @@
+from threading import Barrier
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.publish import (
+    ALT_TEXT,
+    BlueskyPublisher,
+    MastodonPublisher,
+    Publisher,
+    TwitterPublisher,
+    get_image_type,
+    get_link_text,
+    get_pending_publishers,
+    get_policy,
+    get_publishers,
+    is_published,
+    mark_published,
+    post_all,
+    publish_all,
+    publish_play,
+    shorten_link,
+    upload_all
+    )
+
+TEST_MESSAGE = 'Arlequin, a débuté samedi le 01 janvier 1818 au Théâtre.'
+TEST_URL = 'https://books.google.com/books?id=abcdefghijklmnop&hl=fr'
+TEST_PNG = b'\x89PNG\r\n\x1a\n'
+
+MASTODON_CONFIG = {
+    'base_url': 'https://mastodon.example.com',
+    'access_token': 'test token'
+    }
+BLUESKY_CONFIG = {
+    'service': 'https://pds.example.com/',
+    'handle': 'spectacles.example.com',
+    'app_password': 'test password'
+    }
+
+
+def get_response(body, status_code=200):
+    """
+    Return a mock response with a JSON body
+    """
+    response = Mock(ok=status_code < 400, status_code=status_code)
+    response.json.return_value = body
+    return response
+
+
+class MockPublisher(Publisher):
+    """
+    Publisher that returns set values, for testing the shared code
+    """
+
+    def __init__(self, name, media_id='media', post_id='post'):
+        self.name = name
+        self.mock_upload = Mock(return_value=media_id)
+        self.mock_post = Mock(return_value=post_id)
+
+    def upload(self, title_image):
+        return self.mock_upload(title_image)
+
+    def post(self, message, media_id=None):
+        return self.mock_post(message, media_id)
+
+
+class TestHelpers(TestCase):
+
+    def test_get_image_type(self):
+        self.assertEqual(get_image_type(TEST_PNG), 'image/png')
+        self.assertEqual(get_image_type(b'GIF89a'), 'image/gif')
+        self.assertEqual(get_image_type(b'\xff\xd8\xff\xe0'), 'image/jpeg')
+        self.assertEqual(
+            get_image_type(b'test'), 'application/octet-stream'
+            )
+
+    def test_shorten_link(self):
+        self.assertEqual(
+            shorten_link('http://example.com/x'), 'example.com/x'
+            )
+        self.assertEqual(
+            shorten_link(TEST_URL), 'books.google.com/books?id=abc…'
+            )
+
+    def test_get_link_text(self):
+        test_text, test_facets = get_link_text(TEST_MESSAGE + ' ' + TEST_URL)
+
+        self.assertEqual(
+            test_text, TEST_MESSAGE + ' books.google.com/books?id=abc…'
+            )
+        self.assertEqual(len(test_facets), 1)
+
+        test_index = test_facets[0]['index']
+        test_bytes = test_text.encode('utf-8')
+        self.assertEqual(
+            test_bytes[test_index['byteStart']:test_index['byteEnd']],
+            'books.google.com/books?id=abc…'.encode('utf-8')
+            )
+        self.assertEqual(test_facets[0]['features'][0]['uri'], TEST_URL)
+
+    def test_get_link_text_no_links(self):
+        self.assertEqual(get_link_text(TEST_MESSAGE), (TEST_MESSAGE, []))
+
+
+class TestPolicy(TestCase):
+
+    def test_get_policy(self):
+        self.assertEqual(get_policy({}), 'any')
+        self.assertEqual(get_policy({'publish': {}}), 'any')
+        self.assertEqual(get_policy({'publish': {'require': ' All '}}), 'all')
+
+    def test_get_policy_names(self):
+        test_config = {
+            'twitter': {},
+            'mastodon': {},
+            'publish': {'require': 'Twitter, mastodon'}
+            }
+        self.assertEqual(get_policy(test_config), 'twitter, mastodon')
+
+    def test_get_policy_unknown_names(self):
+        test_config = {'twitter': {}, 'mastodon': {}, 'publish': {}}
+
+        for test_policy in ('twitter, mastadon', 'bluesky', ','):
+            test_config['publish']['require'] = test_policy
+            with self.assertLogs(level="ERROR"):
+                self.assertEqual(get_policy(test_config), 'any')
+
+    def test_is_published_any(self):
+        self.assertTrue(is_published('any', {'twitter': 1, 'bluesky': None}))
+        self.assertFalse(
+            is_published('any', {'twitter': None, 'bluesky': None})
+            )
+        self.assertFalse(is_published('any', {}))
+
+    def test_is_published_all(self):
+        self.assertTrue(is_published('all', {'twitter': 1, 'bluesky': 'x'}))
+        self.assertFalse(is_published('all', {'twitter': 1, 'bluesky': None}))
+        self.assertFalse(is_published('all', {}))
+
+    def test_is_published_names(self):
+        test_results = {'twitter': 1, 'mastodon': None, 'bluesky': 'x'}
+
+        self.assertTrue(is_published('twitter', test_results))
+        self.assertTrue(is_published('twitter, bluesky', test_results))
+        self.assertFalse(is_published('twitter,mastodon', test_results))
+        self.assertFalse(is_published(',', test_results))
+
+    @patch('spectacles_xix.publish.save_posts_db')
+    @patch('spectacles_xix.publish.tweet_db')
+    def test_mark_published(self, mock_tweet_db, mock_save):
+        mock_cursor = Mock()
+        test_config = {'publish': {'require': 'all'}}
+
+        self.assertTrue(
+            mark_published(mock_cursor, test_config, 888, {'twitter': 1})
+            )
+        mock_tweet_db.assert_called_once_with(mock_cursor, 888)
+        mock_save.assert_called_once_with(mock_cursor, 888, {'twitter': 1})
+
+        mock_tweet_db.reset_mock()
+        with self.assertLogs(level="ERROR"):
+            self.assertFalse(mark_published(
+                mock_cursor, test_config, 888, {'twitter': 1, 'bluesky': None}
+                ))
+        mock_tweet_db.assert_not_called()
+
+    @patch('spectacles_xix.publish.save_posts_db')
+    @patch('spectacles_xix.publish.tweet_db')
+    def test_mark_published_earlier_posts(self, mock_tweet_db, mock_save):
+        mock_cursor = Mock()
+        test_config = {'publish': {'require': 'all'}}
+
+        self.assertTrue(mark_published(
+            mock_cursor, test_config, 888, {'bluesky': 'uri'}, {'twitter': 1}
+            ))
+        mock_tweet_db.assert_called_once_with(mock_cursor, 888)
+        mock_save.assert_called_once_with(mock_cursor, 888, {'bluesky': 'uri'})
+
+    @patch('spectacles_xix.publish.get_publishers')
+    @patch('spectacles_xix.publish.posts_db')
+    def test_get_pending_publishers(self, mock_posts, mock_get):
+        mock_cursor = Mock()
+        mock_posts.return_value = {'twitter': '1'}
+        mock_get.return_value = [MockPublisher('twitter'), MockPublisher('b')]
+
+        test_publishers, test_posted = get_pending_publishers(
+            mock_cursor, 'config', 888
+            )
+
+        self.assertListEqual(
+            [publisher.name for publisher in test_publishers], ['b']
+            )
+        self.assertDictEqual(test_posted, {'twitter': '1'})
+        mock_posts.assert_called_once_with(mock_cursor, 888)
+        mock_get.assert_called_once_with('config')
+
+
+class TestPublisher(TestCase):
+
+    def test_abstract(self):
+        class UploadOnly(Publisher):
+            def upload(self, title_image):
+                return 'media'
+
+        with self.assertRaises(TypeError):
+            UploadOnly()
+
+    def test_publish(self):
+        publisher = MockPublisher('test')
+
+        with self.assertLogs(level="INFO"):
+            self.assertEqual(publisher.publish('message', b'image'), 'post')
+
+        publisher.mock_upload.assert_called_once_with(b'image')
+        publisher.mock_post.assert_called_once_with('message', 'media')
+
+    def test_publish_no_image(self):
+        publisher = MockPublisher('test')
+
+        with self.assertLogs(level="INFO"):
+            publisher.publish('message', None)
+
+        publisher.mock_upload.assert_not_called()
+        publisher.mock_post.assert_called_once_with('message', None)
+
+    def test_publish_connection_errors(self):
+        publisher = MockPublisher('test')
+        publisher.mock_upload.side_effect = OSError('upload')
+        publisher.mock_post.side_effect = OSError('post')
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(publisher.publish('message', b'image'))
+
+        publisher.mock_post.assert_called_once_with('message', None)
+
+    def test_publish_all_concurrent(self):
+        # Each post waits for the others, so this only finishes if the
+        # accounts are posted to at the same time
+        barrier = Barrier(3, timeout=5)
+
+        def post(*_):
+            barrier.wait()
+            return 'post'
+
+        publishers = [MockPublisher(name) for name in ('a', 'b', 'c')]
+        for publisher in publishers:
+            publisher.mock_post.side_effect = post
+
+        with self.assertLogs(level="INFO"):
+            test_results = publish_all(publishers, 'message', b'image')
+
+        self.assertDictEqual(
+            test_results, {'a': 'post', 'b': 'post', 'c': 'post'}
+            )
+
+    def test_publish_all_unexpected_error(self):
+        publishers = [MockPublisher('a'), MockPublisher('b')]
+        publishers[0].mock_post.side_effect = KeyError('id')
+
+        with self.assertLogs(level="ERROR"):
+            test_results = publish_all(publishers, 'message', None)
+
+        self.assertDictEqual(test_results, {'a': None, 'b': 'post'})
+
+    def test_upload_and_post_all(self):
+        publishers = [MockPublisher('a', 'media a'), MockPublisher('b', None)]
+
+        test_media = upload_all(publishers, b'image')
+        self.assertDictEqual(test_media, {'a': 'media a', 'b': None})
+
+        with self.assertLogs(level="INFO"):
+            test_results = post_all(publishers, 'message', test_media)
+
+        self.assertDictEqual(test_results, {'a': 'post', 'b': 'post'})
+        publishers[0].mock_post.assert_called_once_with('message', 'media a')
+        publishers[1].mock_post.assert_called_once_with('message', None)
+
+    def test_post_all_no_media(self):
+        publisher = MockPublisher('a')
+
+        with self.assertLogs(level="INFO"):
+            post_all([publisher], 'message', None)
+
+        publisher.mock_post.assert_called_once_with('message', None)
+
+    @patch('spectacles_xix.publish.get_oauth')
+    def test_get_publishers(self, mock_get_oauth):
+        test_config = {
+            'db': {},
+            'twitter': {'token': 'test token'},
+            'bluesky': BLUESKY_CONFIG
+            }
+
+        test_publishers = get_publishers(test_config)
+
+        self.assertListEqual(
+            [publisher.name for publisher in test_publishers],
+            ['twitter', 'bluesky']
+            )
+        mock_get_oauth.assert_called_once_with(test_config['twitter'])
+
+    @patch('spectacles_xix.publish.mark_published')
+    @patch('spectacles_xix.publish.publish_all')
+    @patch('spectacles_xix.publish.get_pending_publishers')
+    def test_publish_play(self, mock_get, mock_publish, mock_mark):
+        mock_cursor = Mock()
+        test_config = {'twitter': {}}
+        mock_publishers = [MockPublisher('mastodon')]
+        mock_get.return_value = (mock_publishers, {'twitter': '1'})
+        mock_publish.return_value = {'mastodon': '2'}
+
+        test_results = publish_play(
+            mock_cursor, test_config, 888, 'message', b'image'
+            )
+
+        self.assertDictEqual(test_results, {'twitter': '1', 'mastodon': '2'})
+        mock_get.assert_called_once_with(mock_cursor, test_config, 888)
+        mock_publish.assert_called_once_with(
+            mock_publishers, 'message', b'image'
+            )
+        mock_mark.assert_called_once_with(
+            mock_cursor, test_config, 888, {'mastodon': '2'}, {'twitter': '1'}
+            )
+
+    @patch('spectacles_xix.publish.mark_published')
+    @patch('spectacles_xix.publish.posts_db')
+    def test_publish_play_no_accounts(self, mock_posts, mock_mark):
+        mock_posts.return_value = {}
+
+        with self.assertLogs(level="ERROR"):
+            self.assertDictEqual(
+                publish_play(Mock(), {}, 888, 'message', None), {}
+                )
+        mock_mark.assert_not_called()
+
+
+class TestTwitterPublisher(TestCase):
+
+    def setUp(self):
+        with patch('spectacles_xix.publish.get_oauth') as mock_get_oauth:
+            self.publisher = TwitterPublisher({'token': 'test token'})
+        self.mock_oauth = mock_get_oauth.return_value
+
+    @patch('spectacles_xix.publish.upload_image')
+    def test_upload(self, mock_upload):
+        self.assertEqual(
+            self.publisher.upload(b'image'), mock_upload.return_value
+            )
+        mock_upload.assert_called_once_with(self.mock_oauth, b'image')
+
+    @patch('spectacles_xix.publish.update_status')
+    def test_post(self, mock_update):
+        mock_update.return_value = {'id': 1234}
+
+        self.assertEqual(self.publisher.post('message', 'media'), 1234)
+        mock_update.assert_called_once_with(
+            self.mock_oauth, 'message', 'media'
+            )
+
+    @patch('spectacles_xix.publish.update_status')
+    def test_post_error(self, mock_update):
+        mock_update.return_value = {'errors': ['bleah']}
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.publisher.post('message'))
+
+
+class TestMastodonPublisher(TestCase):
+
+    def setUp(self):
+        self.publisher = MastodonPublisher(MASTODON_CONFIG)
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_upload(self, mock_session):
+        mock_post = mock_session.return_value.post
+        mock_post.return_value = get_response({'id': '42'})
+
+        self.assertEqual(self.publisher.upload(TEST_PNG), '42')
+
+        target_url = 'https://mastodon.example.com/api/v2/media'
+        mock_post.assert_called_once_with(
+            target_url,
+            headers={'Authorization': 'Bearer test token'},
+            data={'description': ALT_TEXT},
+            files={'file': ('title', TEST_PNG, 'image/png')}
+            )
+
+    @patch('spectacles_xix.publish.sleep')
+    @patch('spectacles_xix.publish.get_session')
+    def test_upload_processing(self, mock_session, mock_sleep):
+        mock_session.return_value.post.return_value = get_response(
+            {'id': '42'}, 202
+            )
+        mock_get = mock_session.return_value.get
+        mock_get.side_effect = [
+            get_response({}, 206), get_response({'id': '42'})
+            ]
+
+        self.assertEqual(self.publisher.upload(TEST_PNG), '42')
+        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_with(
+            'https://mastodon.example.com/api/v1/media/42',
+            headers={'Authorization': 'Bearer test token'}
+            )
+
+    @patch('spectacles_xix.publish.sleep')
+    @patch('spectacles_xix.publish.get_session')
+    def test_upload_still_processing(self, mock_session, mock_sleep):
+        mock_session.return_value.post.return_value = get_response(
+            {'id': '42'}, 202
+            )
+        mock_session.return_value.get.return_value = get_response({}, 206)
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.publisher.upload(TEST_PNG))
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_post(self, mock_session):
+        mock_post = mock_session.return_value.post
+        mock_post.return_value = get_response({'id': '99'})
+
+        self.assertEqual(self.publisher.post('message', '42'), '99')
+        mock_post.assert_called_once_with(
+            'https://mastodon.example.com/api/v1/statuses',
+            headers={'Authorization': 'Bearer test token'},
+            data={
+                'status': 'message',
+                'visibility': 'public',
+                'language': 'fr',
+                'media_ids[]': '42'
+                }
+            )
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_post_error(self, mock_session):
+        mock_session.return_value.post.return_value = get_response(
+            {'error': 'Validation failed'}, 422
+            )
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.publisher.post('message'))
+
+
+@patch.dict('spectacles_xix.publish.BLUESKY_LOGINS', clear=True)
+class TestBlueskyPublisher(TestCase):
+
+    def setUp(self):
+        self.publisher = BlueskyPublisher(BLUESKY_CONFIG)
+        self.login_response = get_response(
+            {'did': 'did:plc:test', 'accessJwt': 'test jwt'}
+            )
+
+    def get_method(self, call):
+        """
+        Return the XRPC method of a call to the session's post method
+        """
+        return call[0][0].rsplit('/', 1)[-1]
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_login_cached(self, mock_session):
+        mock_post = mock_session.return_value.post
+        mock_post.return_value = self.login_response
+
+        self.assertEqual(self.publisher.login(), ('did:plc:test', 'test jwt'))
+        self.assertEqual(
+            BlueskyPublisher(BLUESKY_CONFIG).login(),
+            ('did:plc:test', 'test jwt')
+            )
+
+        mock_post.assert_called_once_with(
+            'https://pds.example.com/xrpc/com.atproto.server.createSession',
+            json={
+                'identifier': 'spectacles.example.com',
+                'password': 'test password'
+                }
+            )
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_login_error(self, mock_session):
+        mock_session.return_value.post.return_value = get_response(
+            {'error': 'AuthenticationRequired'}, 401
+            )
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(self.publisher.post('message'))
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_upload(self, mock_session):
+        test_blob = {'$type': 'blob', 'mimeType': 'image/png', 'size': 8}
+        mock_post = mock_session.return_value.post
+        mock_post.side_effect = [
+            self.login_response, get_response({'blob': test_blob})
+            ]
+
+        self.assertEqual(self.publisher.upload(TEST_PNG), test_blob)
+
+        test_call = mock_post.call_args_list[1]
+        self.assertEqual(
+            self.get_method(test_call), 'com.atproto.repo.uploadBlob'
+            )
+        self.assertDictEqual(test_call[1]['headers'], {
+            'Authorization': 'Bearer test jwt',
+            'Content-Type': 'image/png'
+            })
+        self.assertEqual(test_call[1]['data'], TEST_PNG)
+
+    @patch('spectacles_xix.publish.get_session')
+    def test_post(self, mock_session):
+        test_blob = {'$type': 'blob'}
+        test_uri = 'at://did:plc:test/app.bsky.feed.post/1'
+        mock_post = mock_session.return_value.post
+        mock_post.side_effect = [
+            self.login_response, get_response({'uri': test_uri})
+            ]
+
+        self.assertEqual(
+            self.publisher.post(TEST_MESSAGE + ' ' + TEST_URL, test_blob),
+            test_uri
+            )
+
+        test_call = mock_post.call_args_list[1]
+        self.assertEqual(
+            self.get_method(test_call), 'com.atproto.repo.createRecord'
+            )
+        test_body = test_call[1]['json']
+        self.assertEqual(test_body['repo'], 'did:plc:test')
+
+        test_record = test_body['record']
+        self.assertEqual(test_record['text'], get_link_text(
+            TEST_MESSAGE + ' ' + TEST_URL
+            )[0])
+        self.assertEqual(
+            test_record['facets'][0]['features'][0]['uri'], TEST_URL
+            )
+        self.assertEqual(
+            test_record['embed']['images'],
+            [{'alt': ALT_TEXT, 'image': test_blob}]
+            )
+        self.assertTrue(test_record['createdAt'].endswith('Z'))
+
+
+if __name__ == '__main__':
+    main()
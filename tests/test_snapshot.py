@@ -0,0 +1,200 @@
+from datetime import date
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+from unittest.mock import MagicMock, Mock, patch
+
+from spectacles_xix.snapshot import (
+    SNAPSHOTS,
+    Snapshot,
+    filter_tweeted,
+    get_snapshot,
+    get_wicks_key,
+    lower_bound,
+    snapshot_by_date_with_fallback,
+    snapshot_by_wicks_id,
+    write_snapshot
+    )
+
+
+def make_row(play_id, wicks, greg_date):
+    return {
+        'id': play_id,
+        'wicks': wicks,
+        'title': 'Titre {}'.format(play_id),
+        'author': 'Auteur',
+        'genre': 'com.',
+        'acts': 1,
+        'format': 'a',
+        'music': None,
+        'theater_code': 'TF',
+        'theater_name': 'Théâtre Français',
+        'greg_date': greg_date,
+        'rev_date': None
+        }
+
+
+class TestSnapshot(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.path = str(Path(self.tmp_dir.name, 'plays.snapshot'))
+        self.rows = [
+            make_row(3, '103', date(1818, 10, 15)),
+            make_row(1, '101', date(1818, 10, 1)),
+            make_row(2, '102', date(1818, 10, 15)),
+            make_row(4, '102', date(1819, 1, 1))
+            ]
+        self.assertEqual(write_snapshot(self.path, self.rows), 4)
+        self.snapshot = Snapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        SNAPSHOTS.clear()
+        self.tmp_dir.cleanup()
+
+    def test_lower_bound(self):
+        test_keys = [1, 3, 3, 5]
+        self.assertEqual(lower_bound(4, test_keys.__getitem__, 3), 1)
+        self.assertEqual(lower_bound(4, test_keys.__getitem__, 4), 3)
+        self.assertEqual(lower_bound(4, test_keys.__getitem__, 9), 4)
+        self.assertEqual(lower_bound(0, test_keys.__getitem__, 1), 0)
+
+    def test_get_wicks_key(self):
+        self.assertEqual(get_wicks_key('12a'), b'12a' + b'\0' * 13)
+        with self.assertRaises(ValueError):
+            get_wicks_key('1' * 17)
+
+    def test_plays_by_date(self):
+        test_list = self.snapshot.plays_by_date(date(1818, 10, 15))
+
+        self.assertListEqual(test_list, [self.rows[2], self.rows[0]])
+        self.assertEqual(test_list[0]['greg_date'], date(1818, 10, 15))
+        self.assertListEqual(
+            self.snapshot.plays_by_date(date(1818, 10, 16)), []
+            )
+
+    def test_plays_by_wicks(self):
+        self.assertListEqual(
+            self.snapshot.plays_by_wicks('102'), [self.rows[2], self.rows[3]]
+            )
+        self.assertListEqual(self.snapshot.plays_by_wicks('1021'), [])
+
+    @patch('spectacles_xix.snapshot.filter_tweeted')
+    def test_snapshot_by_wicks_id_too_long(self, mock_filter):
+        with self.assertLogs(level="WARNING"):
+            test_list = snapshot_by_wicks_id(
+                'config', self.snapshot, '1' * 17
+                )
+
+        self.assertListEqual(test_list, [])
+        mock_filter.assert_not_called()
+
+    def test_empty_snapshot(self):
+        write_snapshot(self.path, [])
+        test_snapshot = Snapshot(self.path)
+
+        self.assertListEqual(test_snapshot.plays_by_date(date(1818, 1, 1)), [])
+        self.assertListEqual(test_snapshot.plays_by_wicks('101'), [])
+        test_snapshot.close()
+
+    def test_get_snapshot(self):
+        test_snapshot = get_snapshot({'snapshot': self.path})
+
+        self.assertEqual(test_snapshot.count, 4)
+        self.assertIs(get_snapshot({'snapshot': self.path}), test_snapshot)
+        self.assertIsNone(get_snapshot({}))
+
+    def test_get_snapshot_bad_file(self):
+        Path(self.path).write_bytes(b'not a snapshot')
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(get_snapshot({'snapshot': self.path}))
+
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(get_snapshot({'snapshot': self.path + '.x'}))
+
+
+class TestTweeted(TestCase):
+
+    @patch('spectacles_xix.snapshot.tweeted_ids_db')
+    @patch('spectacles_xix.snapshot.db_cursor')
+    def test_filter_tweeted(self, mock_db_cursor, mock_tweeted_ids):
+        mock_cursor = Mock()
+        mock_db_cursor.return_value = MagicMock()
+        mock_db_cursor.return_value.__enter__.return_value = mock_cursor
+        mock_tweeted_ids.return_value = {2}
+
+        test_list = [{'id': 1}, {'id': 2}, {'id': 3}]
+        self.assertListEqual(
+            filter_tweeted('config', test_list), [{'id': 1}, {'id': 3}]
+            )
+        mock_tweeted_ids.assert_called_once_with(mock_cursor, [1, 2, 3])
+
+        mock_tweeted_ids.return_value = None
+        self.assertListEqual(filter_tweeted('config', test_list), [])
+
+    @patch('spectacles_xix.snapshot.db_cursor')
+    def test_filter_tweeted_wanted(self, mock_db_cursor):
+        test_list = [{'id': 1}]
+        self.assertListEqual(
+            filter_tweeted('config', test_list, True), test_list
+            )
+        self.assertListEqual(filter_tweeted('config', []), [])
+        mock_db_cursor.assert_not_called()
+
+    @patch('spectacles_xix.snapshot.filter_tweeted')
+    def test_snapshot_by_date_with_fallback(self, mock_filter):
+        mock_filter.side_effect = lambda config, play_list, tweeted: [
+            play_dict for play_dict in play_list if play_dict['id'] != 1
+            ]
+        mock_snapshot = Mock()
+        mock_snapshot.plays_by_date.side_effect = lambda greg_date: {
+            date(1818, 10, 15): [{'id': 1, 'greg_date': date(1818, 10, 15)}],
+            date(1818, 10, 1): [
+                {'id': 5, 'greg_date': date(1818, 10, 1)},
+                {'id': 6, 'greg_date': date(1818, 10, 1)}
+                ]
+            }[greg_date]
+
+        test_list = snapshot_by_date_with_fallback(
+            'config', mock_snapshot, date(1818, 10, 15)
+            )
+
+        self.assertListEqual(
+            test_list, [{'id': 5, 'greg_date': date(1818, 10, 1)}]
+            )
+        mock_filter.assert_called_once()
+
+    @patch('spectacles_xix.snapshot.filter_tweeted')
+    def test_snapshot_by_date_first_of_month(self, mock_filter):
+        mock_filter.side_effect = lambda config, play_list, tweeted: play_list
+        test_list = [
+            {'id': 5, 'greg_date': date(1818, 10, 1)},
+            {'id': 6, 'greg_date': date(1818, 10, 1)}
+            ]
+        mock_snapshot = Mock()
+        mock_snapshot.plays_by_date.return_value = test_list
+
+        self.assertListEqual(
+            snapshot_by_date_with_fallback(
+                'config', mock_snapshot, date(1818, 10, 1), True
+                ),
+            test_list
+            )
+        mock_snapshot.plays_by_date.assert_called_once_with(date(1818, 10, 1))
+
+    @patch('spectacles_xix.snapshot.filter_tweeted')
+    def test_snapshot_by_wicks_id(self, mock_filter):
+        mock_snapshot = Mock()
+
+        test_list = snapshot_by_wicks_id('config', mock_snapshot, '101', True)
+
+        self.assertEqual(test_list, mock_filter.return_value)
+        mock_snapshot.plays_by_wicks.assert_called_once_with('101')
+        mock_filter.assert_called_once_with(
+            'config', mock_snapshot.plays_by_wicks.return_value, True
+            )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+from datetime import date, datetime
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, main
+
+from spectacles_xix.db_api import DictCursor
+from spectacles_xix.db_ops import (
+    abbreviations_db,
+    book_db,
+    db_cursor,
+    message_db,
+    missed_plan_db,
+    plan_db,
+    plan_slot_db,
+    posts_db,
+    prune_plan_db,
+    query_by_date_with_fallback,
+    query_by_wicks_id,
+    save_book_db,
+    save_message_db,
+    save_posts_db,
+    tweet_db
+    )
+from spectacles_xix.db_pool import close_pools
+from spectacles_xix.schema import SCHEMA_VERSION
+from spectacles_xix.sqlite_db import (
+    connect_sqlite, convert_date, convert_datetime
+    )
+
+PLAYQ = """INSERT INTO spectacle_play
+    (id, wicks, title, author, genre, acts, theater_code, greg_date)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+
+class TestSQLiteBackend(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = TemporaryDirectory()
+        self.config = {
+            'backend': 'sqlite',
+            'path': str(Path(self.tmp_dir.name, 'spectacles.db'))
+            }
+
+        with db_cursor(self.config) as cursor:
+            cursor.execute(
+                "INSERT INTO spectacle_theater VALUES (%s, %s, %s, %s)",
+                ['TF', 'Théâtre Français', None, None]
+                )
+            cursor.execute(
+                "INSERT INTO spectacle_abbrev VALUES (%s, %s, %s, %s)",
+                ['Com', 'comédie', None, None]
+                )
+            cursor.executemany(PLAYQ, [
+                (1, '101', 'Titre 1', 'Auteur', 'com.', 3, 'TF', '1818-10-01'),
+                (2, '102', 'Titre 2', 'Auteur', 'com.', 1, 'TF', '1818-10-15'),
+                (3, '103', 'Titre 3', 'Auteur', 'com.', 2, 'XX', '1818-10-15')
+                ])
+
+    def tearDown(self):
+        close_pools()
+        self.tmp_dir.cleanup()
+
+    def test_schema(self):
+        connection = connect_sqlite(self.config)
+        cursor = connection.connection.execute('PRAGMA user_version')
+        self.assertEqual(cursor.fetchone()[0], SCHEMA_VERSION)
+
+        cursor = connection.connection.execute('PRAGMA journal_mode')
+        self.assertEqual(cursor.fetchone()[0], 'wal')
+        connection.close()
+
+    def test_schema_upgrade(self):
+        connection = connect_sqlite(self.config)
+        connection.connection.execute('DROP TABLE spectacle_post')
+        connection.connection.execute('PRAGMA user_version = 6')
+        connection.close()
+
+        with self.assertLogs(level="INFO"):
+            connection = connect_sqlite(self.config)
+        cursor = connection.connection.execute('PRAGMA user_version')
+        self.assertEqual(cursor.fetchone()[0], SCHEMA_VERSION)
+        connection.connection.execute('SELECT * FROM spectacle_post')
+        connection.close()
+
+    def test_query_by_date_with_fallback(self):
+        test_list = query_by_date_with_fallback(
+            self.config, date(1818, 10, 15)
+            )
+
+        self.assertEqual(
+            sorted(play['id'] for play in test_list), [1, 2, 3]
+            )
+        test_play = [play for play in test_list if play['id'] == 2][0]
+        self.assertEqual(test_play['greg_date'], date(1818, 10, 15))
+        self.assertEqual(test_play['theater_name'], 'Théâtre Français')
+        self.assertEqual(test_play['theater_code'], 'TF')
+
+    def test_query_by_wicks_id_tweeted(self):
+        with db_cursor(self.config) as cursor:
+            tweet_db(cursor, 2)
+
+        self.assertEqual(query_by_wicks_id(self.config, '102'), [])
+        self.assertEqual(
+            len(query_by_wicks_id(self.config, '102', tweeted=True)), 1
+            )
+
+    def test_abbreviations_db(self):
+        with db_cursor(self.config) as cursor:
+            self.assertEqual(abbreviations_db(cursor), {'com': 'comédie'})
+
+    def test_message_db(self):
+        with db_cursor(self.config) as cursor:
+            save_message_db(cursor, 2, True, 'test message')
+            save_message_db(cursor, 2, True, 'new message')
+
+        with db_cursor(self.config) as cursor:
+            self.assertEqual(message_db(cursor, 2, True), 'new message')
+            self.assertIsNone(message_db(cursor, 2, False))
+
+    def test_book_db(self):
+        with db_cursor(self.config) as cursor:
+            save_book_db(cursor, 'test query', 'book url', None)
+
+        with db_cursor(self.config) as cursor:
+            book_url, image_url, checked = book_db(cursor, 'test query')
+
+        self.assertEqual(book_url, 'book url')
+        self.assertIsNone(image_url)
+        self.assertIsInstance(checked, datetime)
+
+    def test_plan_db(self):
+        test_slot = datetime(2018, 10, 15, 20)
+        with db_cursor(self.config) as cursor:
+            plan_db(
+                cursor, [(test_slot, 2), (datetime(2018, 10, 15, 21), None)]
+                )
+
+        with db_cursor(self.config) as cursor:
+            self.assertEqual(plan_slot_db(cursor, test_slot), (2,))
+            self.assertIsNone(
+                plan_slot_db(cursor, datetime(2018, 10, 16, 20))
+                )
+
+    def test_missed_plan_db(self):
+        with db_cursor(self.config) as cursor:
+            plan_db(cursor, [
+                (datetime(2018, 10, 14, 20), 3),
+                (datetime(2018, 10, 15, 18), 1),
+                (datetime(2018, 10, 15, 19), 2),
+                (datetime(2018, 10, 15, 20), None)
+                ])
+            tweet_db(cursor, 1)
+
+        with db_cursor(self.config) as cursor:
+            self.assertEqual(
+                missed_plan_db(cursor, datetime(2018, 10, 15, 20)), (2,)
+                )
+            self.assertIsNone(
+                missed_plan_db(cursor, datetime(2018, 10, 15, 19))
+                )
+
+        with db_cursor(self.config) as cursor:
+            prune_plan_db(cursor, datetime(2018, 10, 15, 20))
+            self.assertIsNone(
+                plan_slot_db(cursor, datetime(2018, 10, 14, 20))
+                )
+            self.assertEqual(
+                plan_slot_db(cursor, datetime(2018, 10, 15, 18)), (1,)
+                )
+
+    def test_posts_db(self):
+        with db_cursor(self.config) as cursor:
+            save_posts_db(cursor, 1, {'twitter': 101, 'bluesky': None})
+            save_posts_db(cursor, 1, {'mastodon': '102'})
+
+        with db_cursor(self.config) as cursor:
+            self.assertDictEqual(
+                posts_db(cursor, 1), {'twitter': '101', 'mastodon': '102'}
+                )
+            self.assertDictEqual(posts_db(cursor, 2), {})
+
+    def test_database_error(self):
+        with db_cursor(self.config, cursorclass=DictCursor) as cursor:
+            cursor.execute("DROP TABLE spectacle_abbrev")
+            with self.assertLogs(level="ERROR"):
+                self.assertIsNone(abbreviations_db(cursor))
+
+
+class TestConverters(TestCase):
+
+    def test_convert_date(self):
+        self.assertEqual(convert_date(b'1818-10-15'), date(1818, 10, 15))
+
+    def test_convert_datetime(self):
+        self.assertEqual(
+            convert_datetime(b'2018-10-15 20:00:00'),
+            datetime(2018, 10, 15, 20)
+            )
+        self.assertEqual(
+            convert_datetime(b'2018-10-15 20:00:00.250000'),
+            datetime(2018, 10, 15, 20, 0, 0, 250000)
+            )
+
+
+if __name__ == '__main__':
+    main()
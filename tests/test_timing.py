@@ -0,0 +1,171 @@
+from unittest import TestCase, main
+from unittest.mock import Mock, patch
+
+from spectacles_xix.timing import(
+    get_hours_per_tweet,
+    get_next_tweet_hour,
+    is_good_time,
+    is_time_to_tweet,
+    plan_tweet_hours
+    )
+
+
+class TestTime(TestCase):
+
+    def test_get_hours_per_tweet(self):
+        test_hour = 22
+        test_play_count = 1
+        target_hours = 1
+
+        with self.assertLogs(level="INFO"):
+            test_hours = get_hours_per_tweet(test_hour, test_play_count)
+        self.assertEqual(test_hours, target_hours)
+
+    def test_get_hours_per_tweet_1_5(self):
+        test_hour = 20
+        test_play_count = 2
+        target_hours = 1.5
+
+        with self.assertLogs(level="INFO"):
+            test_hours = get_hours_per_tweet(test_hour, test_play_count)
+        self.assertEqual(test_hours, target_hours)
+
+    def test_is_good_time(self):
+        self.assertTrue(is_good_time(9, 1))
+        self.assertTrue(is_good_time(13, 2))
+        self.assertFalse(is_good_time(13, 3))
+        self.assertTrue(is_good_time(16, 3))
+        self.assertFalse(is_good_time(16, 3.5))
+
+    def test_get_next_tweet_hour(self):
+        test_hour = get_next_tweet_hour(9, 2)
+        self.assertEqual(test_hour, 17)
+
+    def test_get_next_tweet_hour_now(self):
+        test_hour = get_next_tweet_hour(9, 20)
+        self.assertEqual(test_hour, 9)
+
+    def test_get_next_tweet_hour_late(self):
+        test_hour = get_next_tweet_hour(23, 1)
+        self.assertEqual(test_hour, 23)
+
+    def test_plan_tweet_hours(self):
+        test_hours = plan_tweet_hours(0, 4)
+        self.assertListEqual(test_hours, [15, 16, 17, 20])
+
+    def test_plan_tweet_hours_busy(self):
+        test_hours = plan_tweet_hours(20, 5)
+        self.assertListEqual(test_hours, [20, 21, 22, 23])
+
+    def test_plan_tweet_hours_empty(self):
+        test_hours = plan_tweet_hours(9, 0)
+        self.assertListEqual(test_hours, [])
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet(self, mock_get):
+        mock_args = Mock(no_tweet=False, force=False)
+        test_hour = 9000
+        test_play_count = 1
+
+        test_hours_per_tweet = 1
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = True
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet_pm(self, mock_get):
+        mock_args = Mock(no_tweet=False, force=False)
+        test_hour = 13
+        test_play_count = 7
+
+        test_hours_per_tweet = 2
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = True
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet_pm_false(self, mock_get):
+        mock_args = Mock(no_tweet=False, force=False)
+        test_hour = 13
+        test_play_count = 5
+
+        test_hours_per_tweet = 3
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = False
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet_evening(self, mock_get):
+        mock_args = Mock(no_tweet=False, force=False)
+        test_hour = 19
+        test_play_count = 9
+
+        test_hours_per_tweet = 2
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = True
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet_evening_false(self, mock_get):
+        mock_args = Mock(no_tweet=False, force=False)
+        test_hour = 19
+        test_play_count = 4
+
+        test_hours_per_tweet = 5
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = False
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet_false_no_tweet(self, mock_get):
+        mock_args = Mock(no_tweet=True, force=False)
+        test_hour = 13
+        test_play_count = 6
+
+        test_hours_per_tweet = 3
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = True
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+    @patch('spectacles_xix.timing.get_hours_per_tweet')
+    def test_is_time_to_tweet_false_force(self, mock_get):
+        mock_args = Mock(no_tweet=False, force=True)
+        test_hour = 13
+        test_play_count = 4
+
+        test_hours_per_tweet = 3
+        mock_get.return_value = test_hours_per_tweet
+
+        target_time = True
+        test_time = is_time_to_tweet(mock_args, test_hour, test_play_count)
+
+        self.assertEqual(test_time, target_time)
+        mock_get.assert_called_once_with(test_hour, test_play_count)
+
+
+if __name__ == '__main__':
+    main()
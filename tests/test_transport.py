@@ -0,0 +1,49 @@
+from unittest import TestCase, main
+
+from spectacles_xix.transport import (
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT,
+    SESSIONS,
+    SETTINGS,
+    close_sessions,
+    configure,
+    get_session
+    )
+
+
+class TestTransport(TestCase):
+
+    def tearDown(self):
+        configure({})
+
+    def test_get_session(self):
+        test_session = get_session('https://example.com/a.png')
+
+        self.assertIs(get_session('https://example.com/b.png'), test_session)
+        self.assertIsNot(
+            get_session('https://example.org/a.png'), test_session
+            )
+        self.assertEqual(len(SESSIONS), 2)
+
+        close_sessions()
+        self.assertEqual(SESSIONS, {})
+
+    def test_configure(self):
+        test_session = get_session('https://example.com/')
+
+        configure({'http': {'timeout': '7.5', 'retries': '1'}})
+
+        self.assertEqual(SETTINGS, {'timeout': 7.5, 'retries': 1})
+        self.assertIsNot(get_session('https://example.com/'), test_session)
+        self.assertEqual(get_session('https://example.com/').timeout, 7.5)
+
+    def test_configure_default(self):
+        configure({'db': {}})
+
+        self.assertEqual(
+            SETTINGS, {'timeout': DEFAULT_TIMEOUT, 'retries': DEFAULT_RETRIES}
+            )
+
+
+if __name__ == '__main__':
+    main()
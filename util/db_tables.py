@@ -1,67 +1,204 @@
 """
-Script to import HTML table of plays and write it to a database
+Script to create and migrate the database tables, keeping track of the schema
+version, and to check that the bot's queries use indexes
+
+python -m util.db_tables [migrate|status|check]
 """
 
+from argparse import ArgumentParser
+from datetime import datetime
 import json
 from pathlib import Path
+import sys
 
 import MySQLdb
+from MySQLdb.cursors import DictCursor
 from _mysql_exceptions import DatabaseError
 
+from spectacles_xix.db_ops import (
+    BOOK_SELECT, MESSAGE_SELECT, MISSED_PLAN_SELECT, PLAN_SELECT, POST_SELECT,
+    get_date_fallback_query, get_id_query, get_wicks_query
+    )
+from spectacles_xix.schema import MIGRATIONS, VERSION_SQL
+
 CONFIG_PATH = 'spectacles_xix/config'
-CONFIG = {}
-
-
-# load config
-CONFIG_PATH = Path(Path.home(), CONFIG_PATH)
-for cfile in CONFIG_PATH.glob('*.json'):
-    config_name = cfile.stem
-    with cfile.open() as cfh:
-        CONFIG[config_name] = json.load(cfh)
-
-# create tables
-TABLE_SQL = {
-    'theater': """CREATE TABLE spectacle_theater (
-        theater_code varchar(10) NOT NULL,
-        theater_name varchar(40) NOT NULL,
-        notes text,
-        PRIMARY KEY (theater_code)
-    )""",
-    'abbrev': """CREATE TABLE spectacle_abbrev (
-        abbrev varchar(20) NOT NULL,
-        expansion varchar(100) NOT NULL,
-        notes text,
-        PRIMARY KEY (abbrev)
-    )""",
-    'play': """CREATE TABLE spectacle_play (
-        id int(10) NOT NULL,
-        wicks varchar(10) NOT NULL,
-        title varchar(100) NOT NULL,
-        author varchar(100),
-        genre varchar(40),
-        acts int(3) NOT NULL,
-        format varchar(10),
-        music varchar(100),
-        theater_code varchar(40),
-        rev_date varchar(20),
-        greg_date date NOT NULL,
-        notes text,
-        last_tweeted date,
-        PRIMARY KEY (id),
-        KEY greg_date (greg_date)
-    )"""
-}
-
-with MySQLdb.connect(
-        CONFIG['db']['host'],
-        CONFIG['db']['user'],
-        CONFIG['db']['password'],
-        CONFIG['db']['db']
-    ) as cursor:
-
-    for name, tableq in TABLE_SQL.items():
-        try:
-            print("Creating table {}".format(name))
-            cursor.execute(tableq)
-        except DatabaseError as err:
-            print("Error creating table {}: {}".format(name, err))
+
+# MySQL errors for tables, columns and keys that already exist (or are
+# already gone), which mean that a statement was applied before the schema
+# was versioned
+ALREADY_APPLIED_ERRORS = (1050, 1060, 1061, 1091)
+
+# The bot's lookup queries, with sample parameters for EXPLAIN
+CHECKED_QUERIES = [
+    ('play by Wicks ID', get_wicks_query(), ['1']),
+    ('play by Wicks ID, tweeted', get_wicks_query(True), ['1']),
+    ('play by ID', get_id_query(), [1]),
+    (
+        'plays by date, with fallback',
+        get_date_fallback_query(),
+        ['1818-10-15', '1818-10-01']
+        ),
+    (
+        'plays by date, with fallback, tweeted',
+        get_date_fallback_query(True),
+        ['1818-10-15', '1818-10-01']
+        ),
+    ('message', MESSAGE_SELECT, [1, 0]),
+    ('book', BOOK_SELECT, ['intitle:"Test"']),
+    ('plan', PLAN_SELECT, ['1818-10-15 12:00:00']),
+    (
+        'missed plan',
+        MISSED_PLAN_SELECT,
+        ['1818-10-15 00:00:00', '1818-10-15 12:00:00']
+        ),
+    ('posts', POST_SELECT, [1])
+    ]
+
+# EXPLAIN access types that read the whole table or index
+SCAN_TYPES = ('ALL', 'index')
+
+
+def load_config():
+    """
+    load config
+    """
+    config = {}
+    config_path = Path(Path.home(), CONFIG_PATH)
+    for cfile in config_path.glob('*.json'):
+        config_name = cfile.stem
+        with cfile.open() as cfh:
+            config[config_name] = json.load(cfh)
+
+    return config
+
+
+def get_version(cursor):
+    """
+    Create the schema version table if necessary and return the current
+    schema version
+    """
+    cursor.execute(VERSION_SQL)
+    cursor.execute("SELECT MAX(version) FROM spectacle_schema_version")
+    version = cursor.fetchone()[0]
+    return version or 0
+
+
+def run_statement(cursor, statement):
+    """
+    Run a migration statement, skipping it if it was already applied
+    """
+    try:
+        cursor.execute(statement)
+    except DatabaseError as err:
+        if err.args[0] not in ALREADY_APPLIED_ERRORS:
+            raise
+        print("Already applied: {}".format(err))
+
+
+def migrate(connection, cursor):
+    """
+    Apply the migrations newer than the current schema version, recording
+    each one
+    """
+    version = get_version(cursor)
+
+    for number, description, statements in MIGRATIONS:
+        if number <= version:
+            continue
+
+        print("Migrating to version {}: {}".format(number, description))
+        for statement in statements:
+            run_statement(cursor, statement)
+
+        cursor.execute(
+            """INSERT INTO spectacle_schema_version
+            (version, description, applied) VALUES (%s, %s, %s)""",
+            [number, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S")]
+            )
+        connection.commit()
+
+    print("Schema is at version {}".format(MIGRATIONS[-1][0]))
+
+
+def status(cursor):
+    """
+    Print the current schema version and the pending migrations
+    """
+    version = get_version(cursor)
+    print("Schema is at version {}".format(version))
+
+    for number, description, _ in MIGRATIONS:
+        if number > version:
+            print("Pending: {} {}".format(number, description))
+
+
+def get_scanned_tables(plan):
+    """
+    Given the rows of an EXPLAIN, return the tables that are read without an
+    index.  Tables that the optimizer has already eliminated have no name
+    """
+    return [
+        row['table'] for row in plan
+        if row['table'] and (row['type'] in SCAN_TYPES or not row['key'])
+        ]
+
+
+def check(cursor):
+    """
+    EXPLAIN each of the bot's queries and report the ones that read a table
+    without an index.  Return True if they all use indexes
+    """
+    all_indexed = True
+
+    for name, query, params in CHECKED_QUERIES:
+        cursor.execute('EXPLAIN ' + query, params)
+        scanned = get_scanned_tables(cursor.fetchall())
+
+        if scanned:
+            all_indexed = False
+            print("FULL SCAN  {}: {}".format(name, ', '.join(scanned)))
+        else:
+            print("indexed    {}".format(name))
+
+    return all_indexed
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(description='Manage the spectacles_xix schema')
+    parser.add_argument(
+        'command', nargs='?', default='migrate',
+        choices=('migrate', 'status', 'check')
+        )
+    return parser.parse_args()
+
+
+def main():
+    """
+    Connect to the database and run the command
+    """
+    args = parse_command_args()
+    config = load_config()
+
+    connection = MySQLdb.connect(
+        config['db']['host'],
+        config['db']['user'],
+        config['db']['password'],
+        config['db']['db']
+        )
+
+    try:
+        if args.command == 'migrate':
+            migrate(connection, connection.cursor())
+        elif args.command == 'status':
+            status(connection.cursor())
+        elif not check(connection.cursor(DictCursor)):
+            sys.exit(1)
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+"""
+Database helpers shared by the import scripts: loading the config, writing
+rows in batches or with LOAD DATA LOCAL INFILE, reading the stored row hashes
+for a sync, and clearing what was made from the old rows.  MySQLdb is only
+imported when a connection is opened
+"""
+from datetime import datetime
+from itertools import islice
+import json
+from os import unlink
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+
+from spectacles_xix.db_api import db_errors
+
+CONFIG_PATH = 'spectacles_xix/config'
+
+DEFAULT_BATCH_SIZE = 1000
+
+CLEARQ = "DELETE FROM spectacle_message"
+
+TSV_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n'})
+
+
+def load_config():
+    """
+    load config
+    """
+    config = {}
+    config_path = Path(Path.home(), CONFIG_PATH)
+    for cfile in config_path.glob('*.json'):
+        config_name = cfile.stem
+        with cfile.open() as cfh:
+            config[config_name] = json.load(cfh)
+
+    return config
+
+
+def connect(config, **kwargs):
+    """
+    Connect to the database and set the character set
+    """
+    import MySQLdb
+
+    connection = MySQLdb.connect(
+        config['db']['host'],
+        config['db']['user'],
+        config['db']['password'],
+        config['db']['db'],
+        charset='utf8',
+        **kwargs
+        )
+
+    cursor = connection.cursor()
+    cursor.execute('SET NAMES utf8;')
+    cursor.execute('SET CHARACTER SET utf8;')
+    cursor.execute('SET character_set_connection=utf8;')
+    return connection, cursor
+
+
+def get_batches(rows, batch_size):
+    """
+    Group an iterable of rows into lists of at most batch_size rows
+    """
+    rows = iter(rows)
+    batch = list(islice(rows, batch_size))
+    while batch:
+        yield batch
+        batch = list(islice(rows, batch_size))
+
+
+def save_to_db(config, tableq, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Save rows to db in batches, committing after each batch, and return the
+    number of rows saved
+    """
+    connection, cursor = connect(config)
+    row_count = 0
+
+    try:
+        for batch in get_batches(rows, batch_size):
+            try:
+                cursor.executemany(tableq, batch)
+                connection.commit()
+                row_count += len(batch)
+                print("Inserted {} rows".format(row_count))
+            except db_errors() as err:
+                connection.rollback()
+                print("Error inserting: {}".format(err))
+    finally:
+        connection.close()
+
+    return row_count
+
+
+def format_tsv_value(value):
+    """
+    Format a column value for LOAD DATA INFILE
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return str(value).translate(TSV_ESCAPES)
+
+
+def load_data_to_db(config, loadq, rows):
+    """
+    Write rows to a temporary TSV file in the format LOAD DATA expects, and
+    load it with LOAD DATA LOCAL INFILE in a single transaction.  Return the
+    number of rows, or None if the server does not allow it
+    """
+    row_count = 0
+    with NamedTemporaryFile(
+            'w', encoding='utf-8', suffix='.tsv', delete=False
+            ) as tsv_file:
+        for row in rows:
+            tsv_file.write('\t'.join(map(format_tsv_value, row)) + '\n')
+            row_count += 1
+
+    try:
+        connection, cursor = connect(config, local_infile=1)
+        try:
+            print("Loading {} rows".format(row_count))
+            cursor.execute(loadq, (tsv_file.name,))
+            connection.commit()
+        except db_errors():
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+    except db_errors() as err:
+        print("Error loading: {}".format(err))
+        row_count = None
+    finally:
+        unlink(tsv_file.name)
+
+    return row_count
+
+
+def load_row_hashes(config, hashq):
+    """
+    Return a dict of the stored row hash for each key
+    """
+    connection, cursor = connect(config)
+    try:
+        cursor.execute(hashq)
+        return dict(cursor.fetchall())
+    finally:
+        connection.close()
+
+
+def get_changed_rows(rows, stored_hashes, counts):
+    """
+    Yield the rows, each ending with its hash, that are new or whose hash
+    differs from the stored one, counting the unchanged rows
+    """
+    for row in rows:
+        if stored_hashes.get(row[0]) == row[-1]:
+            counts['unchanged'] += 1
+        else:
+            yield row
+
+
+def clear_messages(config):
+    """
+    Delete the stored messages, which were rendered from the old rows
+    """
+    connection, cursor = connect(config)
+    try:
+        cursor.execute(CLEARQ)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def remove_snapshot(config):
+    """
+    Remove the snapshot named in the db config, which holds the old rows, so
+    that the bot reads the database until the snapshot is exported again
+    """
+    path = config['db'].get('snapshot')
+    if not path:
+        return
+
+    try:
+        unlink(path)
+        print("Removed snapshot {}; export it again".format(path))
+    except FileNotFoundError:
+        pass
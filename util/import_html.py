@@ -1,133 +1,408 @@
 """
-Script to import HTML table of plays and write it to a database
+Script to import HTML table of plays and write it to a database.  The file is
+parsed as a stream and the rows are written in batches, so memory use does not
+grow with the size of the file.  With more than one worker, ranges of rows are
+parsed in parallel in a pool of processes.  In sync mode, only the rows that
+have changed since the last import are written
+
+python -m util.import_html /path/to/wicks.html [-s BATCH_SIZE] [-j WORKERS]
+    [-l | -y]
 """
 
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import json
-import sys
+from functools import lru_cache
+from hashlib import sha256
+from html.parser import HTMLParser
 from pathlib import Path
+import re
+from time import perf_counter
 
-import MySQLdb
-from _mysql_exceptions import DatabaseError
-from bs4 import BeautifulSoup
+from util.import_db import (
+    DEFAULT_BATCH_SIZE, clear_messages, format_tsv_value, get_changed_rows,
+    load_config, load_data_to_db, load_row_hashes, remove_snapshot, save_to_db
+    )
 
-CONFIG_PATH = 'spectacles_xix/config'
 DATE_REGEX = r'\d{4}-\d{1-2}-\d{1-2}'
 
-def load_config():
-    """
-    load config
-    """
-    config = {}
-    config_path = Path(Path.home(), CONFIG_PATH)
-    for cfile in config_path.glob('*.json'):
-        config_name = cfile.stem
-        with cfile.open() as cfh:
-            config[config_name] = json.load(cfh)
+CHUNK_SIZE = 64 * 1024
+DEFAULT_WORKERS = 1
+# Approximate number of characters of HTML in each range of rows
+RANGE_SIZE = 1024 * 1024
 
-    return config
+TABLE_START_RE = re.compile(r'<table[\s>]', re.I)
+TABLE_END_RE = re.compile(r'</table', re.I)
+ROW_START_RE = re.compile(r'<tr[\s>]', re.I)
 
-def save_to_db(config, list_data):
-    """
-    Save data to db
+# Ordinals of the td cells in each row
+SKIP_COLUMNS = (2, 10)
+INT_COLUMNS = (0, 6)
+DATE_COLUMN = 11
+
+TABLEQ = """INSERT INTO spectacle_play (
+    id, wicks, title, author, genre, acts, format, music, theater_code,
+    greg_date, notes, row_hash
+    ) VALUES (
+    %s, %s, %s, %s, %s, %s, %s, %s, %s,
+    %s, %s, %s
+    )
     """
 
-    tableq = """INSERT INTO spectacle_play (
-        id, wicks, title, author, genre, acts, format, music, theater_code,
-        greg_date, notes
-        ) VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s,
-        %s, %s
-        )
-        """
+COLUMNS = (
+    'id', 'wicks', 'title', 'author', 'genre', 'acts', 'format', 'music',
+    'theater_code', 'greg_date', 'notes', 'row_hash'
+    )
 
-    with MySQLdb.connect(
-            config['db']['host'],
-            config['db']['user'],
-            config['db']['password'],
-            config['db']['db'],
-            charset='utf8'
-        ) as cursor:
-
-        cursor.execute('SET NAMES utf8;')
-        cursor.execute('SET CHARACTER SET utf8;')
-        cursor.execute('SET character_set_connection=utf8;')
-        try:
-            print("Inserting {} rows".format(len(list_data)))
-            cursor.executemany(tableq, list_data)
-        except DatabaseError as err:
-            print("Error inserting: {}".format(err))
+# Every column except the key is updated, and last_tweeted is left alone
+UPSERTQ = TABLEQ + "ON DUPLICATE KEY UPDATE {}".format(', '.join(
+    '{0} = VALUES({0})'.format(column) for column in COLUMNS[1:]
+    ))
 
+HASHQ = "SELECT id, row_hash FROM spectacle_play"
 
-def load_html(filename):
-    """
-    Load HTML from file
-    """
-    return Path(filename).read_text()
+LOAD_DATA_SQL = """LOAD DATA LOCAL INFILE %s INTO TABLE spectacle_play
+    CHARACTER SET utf8
+    FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\'
+    LINES TERMINATED BY '\\n'
+    ({})
+    """.format(', '.join(COLUMNS))
 
 
+@lru_cache(maxsize=None)
 def datify(in_string):
     """
-    Turn a string into a datetime object, catching errors
+    Turn a DD-MM-YYYY string into a datetime object, catching errors.  Many
+    plays share a date, so the results are memoized
     """
     out_data = in_string
     if in_string:
         try:
-            out_data = datetime.strptime(in_string, "%d-%m-%Y")
+            day, month, year = in_string.split('-')
+            out_data = datetime(int(year), int(month), int(day))
         except ValueError as err:
             print("Invalid date ({}): {}".format(in_string, err))
-        except TypeError as err:
-            print("Invalid date ({}): {}".format(in_string, err))
     return out_data
 
 
+class TableParser(HTMLParser):
+    """
+    Incremental parser for the first table in an HTML document.  After each
+    call to feed(), `rows` holds the rows completed so far, each as a list of
+    the text fragments of its td cells
+    """
+
+    def __init__(self):
+        """
+        Initialize TableParser class
+        """
+        super().__init__(convert_charrefs=True)
+        self.table_depth = 0
+        self.table_done = False
+        self.cells = None
+        self.cell = None
+        self.in_data = False
+        self.rows = []
+
+    def close_cell(self):
+        """
+        Add the current cell, if there is one, to the current row
+        """
+        if self.cell is not None and self.cells is not None:
+            self.cells.append(self.cell)
+        self.cell = None
+
+    def handle_starttag(self, tag, attrs):
+        """
+        Start a table, row or cell
+        """
+        self.in_data = False
+        if self.table_done:
+            return
+
+        if tag == 'table':
+            self.table_depth += 1
+        elif self.table_depth and tag == 'tr':
+            self.cells = []
+        elif self.cells is not None and tag == 'td':
+            self.close_cell()
+            self.cell = []
+
+    def handle_endtag(self, tag):
+        """
+        Finish a cell, row or table
+        """
+        self.in_data = False
+        if self.table_done:
+            return
+
+        if tag == 'td':
+            self.close_cell()
+        elif tag == 'tr' and self.cells is not None:
+            self.close_cell()
+            self.rows.append(self.cells)
+            self.cells = None
+        elif tag == 'table' and self.table_depth:
+            self.table_depth -= 1
+            self.table_done = not self.table_depth
+
+    def handle_data(self, data):
+        """
+        Keep the text inside a cell, joining text that arrives in pieces
+        because it was split between chunks
+        """
+        if self.cell is None:
+            return
+
+        if self.in_data:
+            self.cell[-1] += data
+        else:
+            self.cell.append(data)
+        self.in_data = True
+
+
+def parse_int(fragments):
+    """
+    Turn the text of a cell into an int, or 0 if it is empty
+    """
+    text = ''.join(fragments).strip()
+    if not text:
+        return 0
+    try:
+        return int(text)
+    except ValueError as err:
+        print("Not a number {}: {}".format(text, err))
+        raise
+
+
 def parse_row(in_row):
     """
-    Iterate through the columns in a row and return a list
+    Given the text fragments of each cell in a row, return a list of column
+    values, or an empty list if the row has no date
     """
     row_data = []
-    for idx, col in enumerate(in_row.children):
-        if col.name == 'td':
-            if idx in (5, 21):
-                continue
-            if idx in (1, 13):
-                try:
-                    col_data = int(col.string)
-                except TypeError as err:
-                    col_data = 0
-                except ValueError as err:
-                    print("Not a number {}: {}".format(col.string, err))
-                    print(in_row)
-                    exit()
-            elif idx == 23:
-                col_data = datify(col.string)
-                if not col_data:
-                    return []
-            else:
-                col_data = ''.join(col.stripped_strings)
-            row_data.append(col_data)
+    for ordinal, fragments in enumerate(in_row):
+        if ordinal in SKIP_COLUMNS:
+            continue
+        if ordinal in INT_COLUMNS:
+            col_data = parse_int(fragments)
+        elif ordinal == DATE_COLUMN:
+            col_data = datify(''.join(fragments).strip() or None)
+            if not col_data:
+                return []
+        else:
+            col_data = ''.join(
+                fragment.strip() for fragment in fragments
+                )
+        row_data.append(col_data)
     return row_data
 
-def parse_table(in_html):
+
+def parse_table(html_file):
     """
-    Parse table
+    Read an HTML file in chunks and yield the parsed rows of its first table
     """
-    table_data = []
-    soup = BeautifulSoup(in_html, "html.parser")
+    parser = TableParser()
     tr_count = 0
-    for row in soup.table.children:
-        if row.name == 'tr':
+    row_count = 0
+
+    for chunk in iter(lambda: html_file.read(CHUNK_SIZE), ''):
+        parser.feed(chunk)
+        for in_row in parser.rows:
             tr_count += 1
-            row_data = parse_row(row)
+            row_data = parse_row(in_row)
             if row_data:
-                table_data.append(row_data)
-    print("Processed {} rows; returning {} items".format(tr_count, len(table_data)))
-    return table_data
+                row_count += 1
+                yield row_data
+        parser.rows.clear()
+
+    parser.close()
+    print("Processed {} rows; returning {} items".format(tr_count, row_count))
+
+
+def get_row_ranges(html_file, range_size=RANGE_SIZE):
+    """
+    Read an HTML file in chunks and yield the HTML of its first table in
+    pieces of about range_size characters, each made of whole rows
+    """
+    buffer = ''
+    in_table = False
+
+    for chunk in iter(lambda: html_file.read(CHUNK_SIZE), ''):
+        search_start = max(0, len(buffer) - len('</table'))
+        buffer += chunk
+
+        if not in_table:
+            match = TABLE_START_RE.search(buffer)
+            if not match:
+                buffer = buffer[-len('<table'):]
+                continue
+            in_table = True
+            buffer = buffer[match.end():]
+            search_start = 0
+
+        match = TABLE_END_RE.search(buffer, search_start)
+        if match:
+            yield buffer[:match.start()]
+            return
+
+        if len(buffer) >= range_size:
+            cut = 0
+            for match in ROW_START_RE.finditer(buffer):
+                cut = match.start()
+            if cut:
+                yield buffer[:cut]
+                buffer = buffer[cut:]
+
+    if in_table and buffer:
+        yield buffer
+
+
+def parse_range(html_range):
+    """
+    Worker function: parse a range of rows and return the parsed rows and the
+    number of rows in the range
+    """
+    parser = TableParser()
+    parser.feed('<table>' + html_range + '</table>')
+    parser.close()
+    return [
+        row_data for row_data in map(parse_row, parser.rows) if row_data
+        ], len(parser.rows)
+
+
+def parse_table_parallel(html_file, workers, range_size=RANGE_SIZE):
+    """
+    Split the first table of an HTML file into ranges of rows, parse them in
+    a pool of worker processes and yield the parsed rows in order
+    """
+    tr_count = 0
+    row_count = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Keep a bounded number of ranges in flight, so that memory does not
+        # grow with the size of the file
+        max_pending = 2 * workers
+        pending = deque()
+
+        def finish_range():
+            nonlocal tr_count, row_count
+            rows, range_tr_count = pending.popleft().result()
+            tr_count += range_tr_count
+            row_count += len(rows)
+            return rows
+
+        for html_range in get_row_ranges(html_file, range_size):
+            pending.append(executor.submit(parse_range, html_range))
+            if len(pending) >= max_pending:
+                yield from finish_range()
+
+        while pending:
+            yield from finish_range()
+
+    print("Processed {} rows; returning {} items".format(tr_count, row_count))
+
+
+def get_row_hash(row):
+    """
+    Return the SHA-256 hash of the column values of a row
+    """
+    return sha256(
+        '\t'.join(map(format_tsv_value, row)).encode('utf-8')
+        ).hexdigest()
+
+
+def add_row_hashes(rows):
+    """
+    Yield each row with its hash as an extra column
+    """
+    for row in rows:
+        yield row + [get_row_hash(row)]
+
+
+def get_rows(html_file, workers):
+    """
+    Parse the HTML file, sequentially or in parallel, and yield its rows with
+    their hashes
+    """
+    if workers > 1:
+        rows = parse_table_parallel(html_file, workers)
+    else:
+        rows = parse_table(html_file)
+    return add_row_hashes(rows)
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(description='Import the Wicks HTML table of plays')
+    parser.add_argument('html_file', type=str)
+    parser.add_argument(
+        '-s', '--batch_size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+    parser.add_argument('-j', '--workers', type=int, default=DEFAULT_WORKERS)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-l', '--load_data', action='store_true')
+    mode.add_argument('-y', '--sync', action='store_true')
+    return parser.parse_args()
+
+
+def import_html(config, html_file, batch_size, workers, load_data,
+                sync=False):
+    """
+    Parse the HTML file, sequentially or in parallel, save the rows with
+    LOAD DATA if asked and permitted and batched inserts otherwise (or, in
+    sync mode, upsert only the rows that have changed), clear what was made
+    from the old rows if any were written, and report the throughput
+    """
+    start = perf_counter()
+    row_count = None
+
+    if sync:
+        counts = {'unchanged': 0}
+        rows = get_changed_rows(
+            get_rows(html_file, workers),
+            load_row_hashes(config, HASHQ),
+            counts
+            )
+        row_count = save_to_db(config, UPSERTQ, rows, batch_size)
+        print("{} rows changed, {} unchanged".format(
+            row_count, counts['unchanged']
+            ))
+    elif load_data:
+        row_count = load_data_to_db(
+            config, LOAD_DATA_SQL, get_rows(html_file, workers)
+            )
+        if row_count is None:
+            print("Falling back to batched inserts")
+            html_file.seek(0)
+
+    if row_count is None:
+        row_count = save_to_db(
+            config, TABLEQ, get_rows(html_file, workers), batch_size
+            )
+
+    if row_count:
+        clear_messages(config)
+        remove_snapshot(config)
+
+    elapsed = perf_counter() - start
+    print("Imported {} rows in {:.1f} s ({:.0f} rows/s)".format(
+        row_count, elapsed, row_count / elapsed if elapsed else 0
+        ))
 
 
 if __name__ == '__main__':
-    IN_HTML = load_html(sys.argv[1])
+    ARGS = parse_command_args()
     CONFIG = load_config()
-    OUT_DATA = parse_table(IN_HTML)
-    # print(OUT_DATA[-5:])
-    save_to_db(CONFIG, OUT_DATA)
+    with Path(ARGS.html_file).open() as HTML_FILE:
+        import_html(
+            CONFIG,
+            HTML_FILE,
+            ARGS.batch_size,
+            ARGS.workers,
+            ARGS.load_data,
+            ARGS.sync
+            )
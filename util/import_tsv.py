@@ -1,82 +1,147 @@
 """
-Script to import TSV tables and write them to a database
+Script to import TSV tables and write them to a database.  The file is read as
+a stream and written in batches, or loaded with LOAD DATA LOCAL INFILE
+
+python -m util.import_tsv /path/to/abbreviations.tsv [-s BATCH_SIZE] [-l | -y]
 """
+from argparse import ArgumentParser
 import csv
-import json
-import sys
+from hashlib import sha256
 from pathlib import Path
+from time import perf_counter
 
-import MySQLdb
-from _mysql_exceptions import DatabaseError
+from util.import_db import (
+    DEFAULT_BATCH_SIZE, clear_messages, get_changed_rows, load_config,
+    load_data_to_db, load_row_hashes, remove_snapshot, save_to_db
+    )
 
-CONFIG_PATH = 'spectacles_xix/config'
 DATE_REGEX = r'\d{4}-\d{1-2}-\d{1-2}'
 
 SQLQ = {
     'abbreviations.tsv': """INSERT INTO spectacle_abbrev
-    ( abbrev, expansion, notes )
-    VALUES ( %s, %s, %s )
+    ( abbrev, expansion, notes, row_hash )
+    VALUES ( %s, %s, %s, %s )
     """,
     'theaters.tsv': """INSERT INTO spectacle_theater
-    ( theater_code, theater_name, notes )
-    VALUES ( %s, %s, %s )
+    ( theater_code, theater_name, notes, row_hash )
+    VALUES ( %s, %s, %s, %s )
     """
     }
 
-def load_config():
-    """
-    load config
+UPSERTQ = {
+    'abbreviations.tsv': SQLQ['abbreviations.tsv'] + """ON DUPLICATE KEY UPDATE
+    expansion = VALUES(expansion), notes = VALUES(notes),
+    row_hash = VALUES(row_hash)
+    """,
+    'theaters.tsv': SQLQ['theaters.tsv'] + """ON DUPLICATE KEY UPDATE
+    theater_name = VALUES(theater_name), notes = VALUES(notes),
+    row_hash = VALUES(row_hash)
     """
-    config = {}
-    config_path = Path(Path.home(), CONFIG_PATH)
-    for cfile in config_path.glob('*.json'):
-        config_name = cfile.stem
-        with cfile.open() as cfh:
-            config[config_name] = json.load(cfh)
+    }
 
-    return config
+HASHQ = {
+    'abbreviations.tsv': "SELECT abbrev, row_hash FROM spectacle_abbrev",
+    'theaters.tsv': "SELECT theater_code, row_hash FROM spectacle_theater"
+    }
 
-def save_to_db(config, tableq, list_data):
-    """
-    Save data to db
+LOADQ = {
+    'abbreviations.tsv': """LOAD DATA LOCAL INFILE %s
+    INTO TABLE spectacle_abbrev CHARACTER SET utf8
+    ( abbrev, expansion, notes, row_hash )
+    """,
+    'theaters.tsv': """LOAD DATA LOCAL INFILE %s
+    INTO TABLE spectacle_theater CHARACTER SET utf8
+    ( theater_code, theater_name, notes, row_hash )
     """
+    }
 
-    with MySQLdb.connect(
-            config['db']['host'],
-            config['db']['user'],
-            config['db']['password'],
-            config['db']['db'],
-            charset='utf8'
-        ) as cursor:
 
-        cursor.execute('SET NAMES utf8;')
-        cursor.execute('SET CHARACTER SET utf8;')
-        cursor.execute('SET character_set_connection=utf8;')
-        try:
-            print("Inserting {} rows".format(len(list_data)))
-            cursor.executemany(tableq, list_data)
-        except DatabaseError as err:
-            print("Error inserting: {}".format(err))
+def get_row_hash(row):
+    """
+    Return the SHA-256 hash of the column values of a row
+    """
+    return sha256(
+        '\t'.join('' if col is None else col for col in row).encode('utf-8')
+        ).hexdigest()
 
 
 def load_tsv(fname):
     """
-    Load data from tsv file
+    Read a tsv file as a stream and yield each row, padded to three columns,
+    with its hash
     """
-    list_out = []
     with Path(fname).open() as tsvin:
         tsv_reader = csv.reader(tsvin, delimiter="\t")
         for row in tsv_reader:
             row_list = list(row)
             if len(row_list) < 3:
                 row_list.append(None)
-            list_out.append(row_list)
+            row_list.append(get_row_hash(row_list))
+            yield row_list
+
 
-    return list_out
+def import_tsv(config, fname, batch_size, load_data, sync=False):
+    """
+    Load a TSV file into its table, with LOAD DATA if asked and permitted and
+    batched inserts otherwise (or, in sync mode, upsert only the rows that have
+    changed), clear what was made from the old rows if any were written, and
+    report the number of rows and the time taken
+    """
+    table_name = Path(fname).name
+    start = perf_counter()
+    row_count = None
+
+    if sync:
+        counts = {'unchanged': 0}
+        rows = get_changed_rows(
+            load_tsv(fname), load_row_hashes(config, HASHQ[table_name]), counts
+            )
+        row_count = save_to_db(
+            config, UPSERTQ[table_name], rows, batch_size
+            )
+        print("{} rows changed, {} unchanged".format(
+            row_count, counts['unchanged']
+            ))
+    elif load_data:
+        row_count = load_data_to_db(
+            config, LOADQ[table_name], load_tsv(fname)
+            )
+        if row_count is None:
+            print("Falling back to batched inserts")
+
+    if row_count is None:
+        row_count = save_to_db(
+            config, SQLQ[table_name], load_tsv(fname), batch_size
+            )
+
+    if row_count:
+        clear_messages(config)
+        remove_snapshot(config)
+
+    elapsed = perf_counter() - start
+    print("Imported {} rows into {} in {:.2f} s ({:.0f} rows/s)".format(
+        row_count, table_name, elapsed, row_count / elapsed if elapsed else 0
+        ))
+
+
+def parse_command_args():
+    """
+    Create argument parser and parse the command line arguments
+    """
+    parser = ArgumentParser(description='Import a TSV table')
+    parser.add_argument('tsv_file', type=str)
+    parser.add_argument(
+        '-s', '--batch_size', type=int, default=DEFAULT_BATCH_SIZE
+        )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-l', '--load_data', action='store_true')
+    mode.add_argument('-y', '--sync', action='store_true')
+    return parser.parse_args()
 
 
 if __name__ == '__main__':
-    IN_DATA = load_tsv(sys.argv[1])
-    CONFIG = load_config()
-    # print(IN_DATA)
-    save_to_db(CONFIG, SQLQ[sys.argv[1]], IN_DATA)
+    ARGS = parse_command_args()
+    import_tsv(
+        load_config(), ARGS.tsv_file, ARGS.batch_size, ARGS.load_data,
+        ARGS.sync
+        )